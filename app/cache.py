@@ -0,0 +1,117 @@
+# Cache de resultados de recomendação em processo (LRU + TTL)
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from .catalog_version import catalog_version
+from .weights import resolve_weights, weights_key
+
+
+class RecommendationCache:
+    """
+    Cache LRU com expiração por tempo, versionado pelo catálogo
+
+    Cada entrada guarda a versão do catálogo com que foi calculada; uma
+    leitura com versão diferente conta como invalidação e é tratada como miss.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, version: Optional[int] = None) -> Optional[Any]:
+        """Retorna o valor em cache ou None (miss)"""
+        version = catalog_version.value if version is None else version
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            entry_version, stored_at, value = entry
+            if entry_version != version:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, version: int):
+        """Armazena o valor calculado com a versão do catálogo informada"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas de uso do cache"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'catalog_version': catalog_version.value
+            }
+
+
+def campaign_components_key(campaign_data: Dict[str, Any]) -> Tuple:
+    """
+    Forma canônica dos campos da campanha que definem os componentes do score
+    (tags como conjunto ordenado; prazo, objetivo e pesos não entram)
+    """
+    audience_target = campaign_data.get('audience_target', {})
+    age_range = tuple(audience_target.get('age_range', [])[:2])
+    return (
+        tuple(sorted(set(campaign_data.get('tags_required', []) or []))),
+        audience_target.get('country', ''),
+        age_range,
+        campaign_data.get('budget_cents', 0)
+    )
+
+
+def campaign_cache_key(campaign_data: Dict[str, Any], top_k: int, **options: Any) -> Tuple:
+    """
+    Forma canônica dos campos da campanha que afetam o scoring: componentes
+    e o perfil de pesos efetivo (objetivos com o perfil padrão compartilham a chave)
+    """
+    return (
+        *campaign_components_key(campaign_data),
+        weights_key(resolve_weights(campaign_data)),
+        top_k,
+        tuple(sorted(options.items()))
+    )
+
+
+recommendation_cache = RecommendationCache(
+    max_size=int(os.getenv('RECOMMENDATION_CACHE_SIZE', '1024')),
+    ttl_seconds=float(os.getenv('RECOMMENDATION_CACHE_TTL', '60'))
+)
@@ -0,0 +1,198 @@
+# Recomendações materializadas das campanhas cadastradas (recalculadas em background)
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from .executor import run_scoring
+from .metrics import metrics
+from .models import Base, Campaign
+from .recommendation_engine import create_recommendation_engine
+from .serialization import dumps, response_payload
+from .snapshot import CatalogSnapshot, catalog_store, current_snapshot
+
+# Tamanho do top-k materializado e diversidade (mesmos padrões de /recommendations)
+CAMPAIGN_TOP_K = int(os.getenv('CAMPAIGN_TOP_K', '10'))
+CAMPAIGN_DIVERSITY = os.getenv('CAMPAIGN_DIVERSITY', 'true').lower() not in ('false', '0', 'no')
+
+# Intervalo máximo entre verificações do agendador (versão do catálogo e prazos)
+CAMPAIGN_REFRESH_SECONDS = float(os.getenv('CAMPAIGN_REFRESH_SECONDS', '5'))
+
+logger = logging.getLogger(__name__)
+
+
+def campaign_data(campaign: Campaign) -> Dict[str, Any]:
+    """Converte uma campanha cadastrada para o dict usado pelo engine"""
+    return {
+        'goal': campaign.goal,
+        'tags_required': campaign.tags_required or [],
+        'audience_target': campaign.audience_target or {},
+        'budget_cents': campaign.budget_cents,
+        'deadline': campaign.deadline.strftime('%Y-%m-%d') if campaign.deadline else None
+    }
+
+
+class MaterializedResult:
+    """Resposta já serializada de uma campanha e a versão do catálogo usada"""
+
+    def __init__(self, body: bytes, version: int):
+        self.body = body
+        self.version = version
+        self.computed_at = time.time()
+
+
+class CampaignResultStore:
+    """
+    Top-k pré-calculado por campanha, servido por uma consulta a um dict
+
+    O agendador mantém as campanhas com prazo em aberto: recalcula as
+    recém-criadas e, quando a versão do catálogo muda, todas elas; campanhas
+    com prazo vencido saem da agenda (e seus resultados são descartados).
+    Escritas de outros processos chegam pela atualização periódica do
+    snapshot, que incrementa a versão quando o catálogo combinado muda.
+    """
+
+    def __init__(self, top_k: int = CAMPAIGN_TOP_K, diversity: bool = CAMPAIGN_DIVERSITY):
+        self.top_k = top_k
+        self.diversity = diversity
+        self._results: Dict[int, MaterializedResult] = {}
+        self._schedule: Dict[int, Dict[str, Any]] = {}
+        self._deadlines: Dict[int, datetime] = {}
+        self._pending: set = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self.recomputations = 0
+
+    def get(self, campaign_id: int) -> Optional[MaterializedResult]:
+        return self._results.get(campaign_id)
+
+    def schedule(self, campaign: Campaign):
+        """Inclui (ou atualiza) uma campanha na agenda e acorda o agendador"""
+        with self._lock:
+            self._schedule[campaign.id] = campaign_data(campaign)
+            self._deadlines[campaign.id] = campaign.deadline
+            self._pending.add(campaign.id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def load_schedule(self, db: Session):
+        """Agenda todas as campanhas com prazo em aberto (inicialização)"""
+        campaigns = db.scalars(select(Campaign).where(Campaign.deadline >= datetime.utcnow())).all()
+        for campaign in campaigns:
+            if campaign.id not in self._schedule:
+                self.schedule(campaign)
+        self._loaded = True
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._schedule.clear()
+            self._deadlines.clear()
+            self._pending.clear()
+            self._loaded = False
+
+    def drop_expired(self, now: Optional[datetime] = None) -> int:
+        """Remove da agenda (e dos resultados) as campanhas com prazo vencido"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            expired = [cid for cid, deadline in self._deadlines.items() if deadline is not None and deadline < now]
+            for campaign_id in expired:
+                self._schedule.pop(campaign_id, None)
+                self._deadlines.pop(campaign_id, None)
+                self._results.pop(campaign_id, None)
+                self._pending.discard(campaign_id)
+        return len(expired)
+
+    def compute(self, campaign_id: int, snapshot: CatalogSnapshot) -> Optional[MaterializedResult]:
+        """Calcula e guarda o resultado de uma campanha agendada sobre o snapshot"""
+        data = self._schedule.get(campaign_id)
+        if data is None:
+            return None
+        engine = create_recommendation_engine(None, snapshot=snapshot, as_dicts=True)
+        recommendations = engine.get_recommendations(data, self.top_k, diversity=self.diversity)
+        result = MaterializedResult(
+            dumps(response_payload(recommendations, len(snapshot.catalog), engine.creators_scored)),
+            snapshot.version
+        )
+        with self._lock:
+            if campaign_id in self._schedule:
+                self._results[campaign_id] = result
+                self._pending.discard(campaign_id)
+        self.recomputations += 1
+        return result
+
+    def refresh(self, db: Session) -> int:
+        """
+        Uma passada do agendador: descarta vencidas e recalcula as pendentes
+        e as calculadas com outra versão do catálogo. Retorna quantas recalculou.
+        """
+        if not self._loaded:
+            self.load_schedule(db)
+        self.drop_expired()
+        snapshot = catalog_store().get(db)
+        with self._lock:
+            stale = {
+                campaign_id for campaign_id in self._schedule
+                if campaign_id in self._pending
+                or campaign_id not in self._results
+                or self._results[campaign_id].version != snapshot.version
+            }
+            self._pending -= stale
+        recomputed = 0
+        for campaign_id in sorted(stale):
+            # Falha de uma campanha não bloqueia as demais; ela segue desatualizada e volta na próxima passada
+            try:
+                self.compute(campaign_id, snapshot)
+                recomputed += 1
+            except Exception:
+                logger.exception("Falha ao materializar a campanha %s", campaign_id)
+                metrics.inc('background_errors_total', task='campaigns')
+        return recomputed
+
+    def refresh_with(self, session_factory: Callable[[], Session]) -> int:
+        """Passada do agendador abrindo uma sessão própria"""
+        db = session_factory()
+        try:
+            return self.refresh(db)
+        finally:
+            db.close()
+
+    async def run_scheduler(self, session_factory: Callable[[], Session],
+                            interval: float = CAMPAIGN_REFRESH_SECONDS):
+        """Agendador em background: acorda em novas campanhas ou a cada intervalo (falhas não encerram o laço)"""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await run_scoring(self.refresh_with, session_factory)
+            except Exception:
+                logger.exception("Falha na passada do agendador de campanhas")
+                metrics.inc('background_errors_total', task='campaigns')
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+campaign_results = CampaignResultStore()
+
+
+# Esquema recriado: campanhas e resultados deixam de existir
+@event.listens_for(Base.metadata, 'after_drop')
+def _clear_on_drop(target, connection, **kw):
+    campaign_results.clear()
+
+
+async def materialized_result(campaign: Campaign, db: Session) -> MaterializedResult:
+    """
+    Resultado de uma campanha fora da agenda em memória (recém-criada antes
+    da passada do agendador ou outro processo): calcula uma vez e agenda
+    """
+    campaign_results.schedule(campaign)
+    snapshot = await current_snapshot(db)
+    return await run_scoring(campaign_results.compute, campaign.id, snapshot)
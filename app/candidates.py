@@ -0,0 +1,112 @@
+# Geração de candidatos por restrições rígidas (antes do scoring)
+from typing import Any, Dict, Optional
+from sqlalchemy import event, insert, inspect, select
+from sqlalchemy.sql import Select
+from .models import Creator, creator_countries, creator_tags
+
+# Restrições suportadas e seus valores neutros (desativadas)
+FILTER_DEFAULTS = {
+    'require_country': False,
+    'require_tag_match': False,
+    'max_price_factor': None
+}
+
+
+def active_filters(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Normaliza as restrições; retorna None quando nenhuma está ativa"""
+    if not filters:
+        return None
+    normalized = {name: filters.get(name, default) for name, default in FILTER_DEFAULTS.items()}
+    if normalized == FILTER_DEFAULTS:
+        return None
+    return normalized
+
+
+def price_limit(campaign_data: Dict[str, Any], filters: Dict[str, Any]) -> Optional[float]:
+    """Maior price_min aceito (orçamento × fator) ou None sem restrição de preço"""
+    factor = filters.get('max_price_factor')
+    if factor is None:
+        return None
+    return campaign_data.get('budget_cents', 0) * factor
+
+
+def candidate_query(campaign_data: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> Select:
+    """
+    Consulta dos criadores viáveis para a campanha
+
+    Usa as tabelas normalizadas e indexadas creator_countries/creator_tags e o
+    índice de price_min, de forma que apenas candidatos saiam do banco.
+    A ordem (por id) é a mesma do catálogo, preservando os desempates.
+    """
+    query = select(Creator).order_by(Creator.id)
+    filters = active_filters(filters)
+    if filters is None:
+        return query
+
+    if filters['require_country']:
+        country = campaign_data.get('audience_target', {}).get('country', '')
+        query = query.where(Creator.id.in_(
+            select(creator_countries.c.creator_id).where(creator_countries.c.country == country)
+        ))
+
+    required = set(campaign_data.get('tags_required', []) or [])
+    if filters['require_tag_match'] and required:
+        query = query.where(Creator.id.in_(
+            select(creator_tags.c.creator_id).where(creator_tags.c.tag.in_(required))
+        ))
+
+    limit = price_limit(campaign_data, filters)
+    if limit is not None:
+        query = query.where(Creator.price_min <= limit)
+
+    return query
+
+
+def passes_filters(creator: Any, campaign_data: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """Mesmas restrições de candidate_query avaliadas em memória"""
+    filters = active_filters(filters)
+    if filters is None:
+        return True
+
+    if filters['require_country']:
+        country = campaign_data.get('audience_target', {}).get('country', '')
+        if country not in (creator.audience_location or []):
+            return False
+
+    required = set(campaign_data.get('tags_required', []) or [])
+    if filters['require_tag_match'] and required and not required.intersection(creator.tags or []):
+        return False
+
+    limit = price_limit(campaign_data, filters)
+    if limit is not None and (creator.price_min or 0) > limit:
+        return False
+
+    return True
+
+
+# Sincronização com a tabela creator_countries (mesma transação da escrita do criador)
+def _replace_creator_countries(connection, creator: Creator, delete_existing: bool):
+    if delete_existing:
+        connection.execute(creator_countries.delete().where(creator_countries.c.creator_id == creator.id))
+    countries = set(creator.audience_location or [])
+    if countries:
+        connection.execute(
+            insert(creator_countries),
+            [{'creator_id': creator.id, 'country': country} for country in countries]
+        )
+
+
+@event.listens_for(Creator, 'after_insert')
+def _creator_inserted(mapper, connection, target):
+    _replace_creator_countries(connection, target, delete_existing=False)
+
+
+@event.listens_for(Creator, 'after_update')
+def _creator_updated(mapper, connection, target):
+    if inspect(target).attrs.audience_location.history.has_changes():
+        _replace_creator_countries(connection, target, delete_existing=True)
+
+
+@event.listens_for(Creator, 'after_delete')
+def _creator_deleted(mapper, connection, target):
+    connection.execute(creator_countries.delete().where(creator_countries.c.creator_id == target.id))
@@ -0,0 +1,678 @@
+# Catálogo colunar de criadores para scoring vetorizado
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Iterator, NamedTuple, Optional, Tuple
+import numpy as np
+from .candidates import active_filters, price_limit
+from .features import AGE_MAX, FEATURE_VERSION, creator_features
+from .cache import campaign_components_key
+from .weights import COMPONENT_KEYS, weighted_total
+
+# Folga numérica somada aos limites superiores (ordem de soma difere do score exato)
+BOUND_EPSILON = 1e-9
+
+# Limite de elementos por matriz campanhas × criadores (controla memória no batch)
+MATRIX_CHUNK_ELEMENTS = 4_000_000
+
+# Memória máxima (em MB) das matrizes de componentes guardadas por catálogo
+# (5 floats por criador por campanha: ~40 MB por campanha com 1M criadores)
+COMPONENT_CACHE_MB = float(os.getenv('COMPONENT_CACHE_MB', '256'))
+
+# Vetores de pesos com limites superiores guardados por catálogo (3 arrays por criador cada)
+BOUND_CACHE_SIZE = int(os.getenv('BOUND_CACHE_SIZE', '8'))
+
+
+class CreatorRow(NamedTuple):
+    """Visão leve de um criador do catálogo (mesmos atributos usados pelo scoring)"""
+    id: int
+    tags: List[str]
+    audience_location: List[str]
+    avg_views: int
+    reliability_score: float
+    ctr: float
+    cvr: float
+    price_min: int
+    price_max: int
+    audience_age_cdf: List[int]
+    performance_feature: float
+    reliability_feature: float
+    feature_version: str
+
+
+def _vocabulary(values: Iterable[Iterable[str]], base: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Mapeia cada valor distinto para um id inteiro (ordem de primeira aparição),
+    estendendo um vocabulário existente sem alterar seus ids
+    """
+    vocab: Dict[str, int] = dict(base or {})
+    for items in values:
+        for item in items:
+            if item not in vocab:
+                vocab[item] = len(vocab)
+    return vocab
+
+
+def _pack_bits(rows: List[List[int]], n_bits: int) -> np.ndarray:
+    """Empacota listas de ids em bitsets (uma linha de palavras uint64 por criador)"""
+    n_words = max(1, (n_bits + 63) // 64)
+    bits = np.zeros((len(rows), n_words), dtype=np.uint64)
+    counts = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+    if counts.sum():
+        row_idx = np.repeat(np.arange(len(rows)), counts)
+        ids = np.concatenate([np.asarray(r, dtype=np.uint64) for r in rows if r])
+        np.bitwise_or.at(
+            bits,
+            (row_idx, (ids >> np.uint64(6)).astype(np.int64)),
+            np.left_shift(np.uint64(1), ids & np.uint64(63))
+        )
+    return bits
+
+
+def select_top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Posições dos k maiores valores em ordem decrescente, com empates
+    resolvidos pela posição (equivalente a um sort estável completo)
+
+    Usa seleção parcial (np.partition) em O(n) e ordena apenas os k escolhidos.
+    """
+    n = len(values)
+    k = min(max(k, 0), n)
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if k < n:
+        kth = np.partition(values, n - k)[n - k]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+
+    return candidates[np.lexsort((candidates, -values[candidates]))]
+
+
+def _compact_age_cdf(age_cdf: np.ndarray) -> np.ndarray:
+    """Contagens cabem em uint16 no caso comum (até 1000 idades por criador)"""
+    if not age_cdf.size or age_cdf[:, -1].max() <= np.iinfo(np.uint16).max:
+        return age_cdf.astype(np.uint16)
+    return age_cdf.astype(np.int64)
+
+
+def _widen_bits(bits: np.ndarray, n_words: int) -> np.ndarray:
+    """Completa um bitset com palavras zeradas até n_words"""
+    if bits.shape[1] >= n_words:
+        return bits
+    return np.hstack([bits, np.zeros((len(bits), n_words - bits.shape[1]), dtype=np.uint64)])
+
+
+class CreatorCatalog:
+    """
+    Catálogo de criadores em formato colunar
+
+    Cada atributo usado no scoring é um array NumPy alinhado por linha:
+    métricas numéricas, features materializadas de performance e
+    confiabilidade, bitsets de tags e países e a distribuição acumulada
+    de idades da audiência. Permite calcular os cinco componentes do score
+    para o catálogo inteiro com poucas operações de array.
+
+    reliability é a feature usada no score (misturada com o histórico de
+    deals); reliability_score é o valor cadastrado do criador.
+    """
+
+    def __init__(self, ids: np.ndarray, avg_views: np.ndarray, ctr: np.ndarray, cvr: np.ndarray,
+                 price_min: np.ndarray, price_max: np.ndarray, performance: np.ndarray,
+                 reliability: np.ndarray, reliability_score: np.ndarray,
+                 tag_vocab: Dict[str, int], tag_bits: np.ndarray, tag_counts: np.ndarray,
+                 country_vocab: Dict[str, int], country_bits: np.ndarray,
+                 age_cdf: np.ndarray):
+        self.ids = ids
+        self.avg_views = avg_views
+        self.ctr = ctr
+        self.cvr = cvr
+        self.price_min = price_min
+        self.price_max = price_max
+        self.performance = performance
+        self.reliability = reliability
+        self.reliability_score = reliability_score
+        self.tag_vocab = tag_vocab
+        self.tag_bits = tag_bits
+        self.tag_counts = tag_counts
+        self.country_vocab = country_vocab
+        self.country_bits = country_bits
+        self.age_cdf = age_cdf
+        self.tag_names = sorted(tag_vocab, key=tag_vocab.get)
+        self.country_names = sorted(country_vocab, key=country_vocab.get)
+        self._bounds: "OrderedDict[Tuple[Tuple[str, float], ...], Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._bounds_lock = threading.Lock()
+        self._tag_rows: Dict[int, np.ndarray] = {}
+        self._components: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._components_bytes = 0
+        self._components_lock = threading.Lock()
+
+    # Colunas alinhadas por linha (ordem do catálogo)
+    COLUMNS = ('ids', 'avg_views', 'ctr', 'cvr', 'price_min', 'price_max', 'performance', 'reliability',
+               'reliability_score', 'tag_bits', 'tag_counts', 'country_bits', 'age_cdf')
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_creators(cls, creators: List[Any], tag_vocab: Optional[Dict[str, int]] = None,
+                      country_vocab: Optional[Dict[str, int]] = None) -> "CreatorCatalog":
+        """
+        Constrói o catálogo a partir de objetos Creator (ORM) ou linhas com os
+        mesmos atributos. Vocabulários existentes podem ser estendidos para que
+        o resultado seja combinável com outro catálogo (ver merge).
+        """
+        tags = [list(dict.fromkeys(c.tags or [])) for c in creators]
+        locations = [list(dict.fromkeys(c.audience_location or [])) for c in creators]
+        tag_vocab = _vocabulary(tags, tag_vocab)
+        country_vocab = _vocabulary(locations, country_vocab)
+
+        age_cdf = np.zeros((len(creators), AGE_MAX + 1), dtype=np.int64)
+        for i, creator in enumerate(creators):
+            if creator.audience_age_cdf:
+                age_cdf[i] = creator.audience_age_cdf
+        age_cdf = _compact_age_cdf(age_cdf)
+
+        # Features materializadas (recalculadas apenas para linhas de versão antiga)
+        features = np.array([creator_features(c) for c in creators], dtype=np.float64).reshape(-1, 2)
+
+        return cls(
+            ids=np.array([c.id for c in creators], dtype=np.int64),
+            avg_views=np.array([c.avg_views or 0 for c in creators], dtype=np.float64),
+            ctr=np.array([c.ctr or 0.0 for c in creators], dtype=np.float64),
+            cvr=np.array([c.cvr or 0.0 for c in creators], dtype=np.float64),
+            price_min=np.array([c.price_min or 0 for c in creators], dtype=np.int64),
+            price_max=np.array([c.price_max or 0 for c in creators], dtype=np.int64),
+            performance=features[:, 0],
+            reliability=features[:, 1],
+            reliability_score=np.array([c.reliability_score or 0.0 for c in creators], dtype=np.float64),
+            tag_vocab=tag_vocab,
+            tag_bits=_pack_bits([[tag_vocab[t] for t in row] for row in tags], len(tag_vocab)),
+            tag_counts=np.array([len(row) for row in tags], dtype=np.int64),
+            country_vocab=country_vocab,
+            country_bits=_pack_bits([[country_vocab[c] for c in row] for row in locations],
+                                    len(country_vocab)),
+            age_cdf=age_cdf
+        )
+
+    def merge(self, delta: Optional["CreatorCatalog"] = None,
+              removed_ids: Optional[np.ndarray] = None) -> "CreatorCatalog":
+        """
+        Novo catálogo com as linhas de delta inseridas/substituídas (por id) e
+        os ids removidos descartados; o resultado fica ordenado por id.
+        delta deve ter sido construído estendendo os vocabulários deste catálogo.
+        """
+        replaced = np.zeros(0, dtype=np.int64)
+        if delta is not None:
+            replaced = delta.ids
+        if removed_ids is not None:
+            replaced = np.concatenate([replaced, np.asarray(removed_ids, dtype=np.int64)])
+        keep = ~np.isin(self.ids, replaced)
+
+        kept = CreatorCatalog(tag_vocab=self.tag_vocab, country_vocab=self.country_vocab,
+                              **{name: getattr(self, name)[keep] for name in self.COLUMNS})
+        merged = CreatorCatalog.concatenate([kept] if delta is None else [kept, delta])
+
+        order = np.argsort(merged.ids, kind='stable')
+        return CreatorCatalog(tag_vocab=merged.tag_vocab, country_vocab=merged.country_vocab,
+                              **{name: getattr(merged, name)[order] for name in self.COLUMNS})
+
+    def contains(self, delta: "CreatorCatalog") -> bool:
+        """
+        Todas as linhas de delta já estão neste catálogo com os mesmos valores?
+        (releituras do watermark sem mudança real). delta deve ter sido
+        construído estendendo os vocabulários deste catálogo.
+        """
+        positions = np.minimum(np.searchsorted(self.ids, delta.ids), max(len(self.ids) - 1, 0))
+        if not len(self.ids) or not np.array_equal(self.ids[positions], delta.ids):
+            return False
+        for name in self.COLUMNS:
+            old, new = getattr(self, name)[positions], getattr(delta, name)
+            if name in ('tag_bits', 'country_bits'):
+                words = max(old.shape[1], new.shape[1])
+                old, new = _widen_bits(old, words), _widen_bits(new, words)
+            if not np.array_equal(old, new):
+                return False
+        return True
+
+    @classmethod
+    def concatenate(cls, parts: List["CreatorCatalog"]) -> "CreatorCatalog":
+        """
+        Junta catálogos construídos em sequência (cada um estendendo os
+        vocabulários do anterior), mantendo a ordem das linhas
+        """
+        tag_words = max(p.tag_bits.shape[1] for p in parts)
+        country_words = max(p.country_bits.shape[1] for p in parts)
+
+        columns = {}
+        for name in cls.COLUMNS:
+            values = [getattr(p, name) for p in parts]
+            if name == 'tag_bits':
+                values = [_widen_bits(v, tag_words) for v in values]
+            elif name == 'country_bits':
+                values = [_widen_bits(v, country_words) for v in values]
+            columns[name] = np.concatenate(values)
+        columns['age_cdf'] = _compact_age_cdf(columns['age_cdf'])
+
+        return cls(tag_vocab=parts[-1].tag_vocab, country_vocab=parts[-1].country_vocab, **columns)
+
+    def shard(self, start: int, stop: int) -> "CreatorCatalog":
+        """Visão das linhas [start, stop) com os mesmos vocabulários (sem cópia)"""
+        columns = {name: getattr(self, name)[start:stop] for name in self.COLUMNS}
+        return CreatorCatalog(tag_vocab=self.tag_vocab, country_vocab=self.country_vocab, **columns)
+
+    def _mask(self, values: Iterable[str], vocab: Dict[str, int], n_words: int) -> np.ndarray:
+        """Bitset (uint64[n_words]) dos valores conhecidos no vocabulário"""
+        mask = np.zeros(n_words, dtype=np.uint64)
+        for value in values:
+            bit = vocab.get(value)
+            if bit is not None:
+                mask[bit >> 6] |= np.uint64(1) << np.uint64(bit & 63)
+        return mask
+
+    def _decode(self, bits: np.ndarray, names: List[str]) -> List[str]:
+        """Converte uma linha de bitset de volta para a lista de nomes (só os bits ligados)"""
+        decoded = []
+        for word_index, word in enumerate(bits.tolist()):
+            while word:
+                low = word & -word
+                decoded.append(names[(word_index << 6) + low.bit_length() - 1])
+                word ^= low
+        return decoded
+
+    def row_tags(self, i: int) -> List[str]:
+        """Tags de uma linha (sem montar a linha completa)"""
+        return self._decode(self.tag_bits[i], self.tag_names)
+
+    def row(self, i: int) -> CreatorRow:
+        """Retorna a visão de um único criador pela posição no catálogo"""
+        return CreatorRow(
+            id=int(self.ids[i]),
+            tags=self._decode(self.tag_bits[i], self.tag_names),
+            audience_location=self._decode(self.country_bits[i], self.country_names),
+            avg_views=int(self.avg_views[i]),
+            reliability_score=float(self.reliability_score[i]),
+            ctr=float(self.ctr[i]),
+            cvr=float(self.cvr[i]),
+            price_min=int(self.price_min[i]),
+            price_max=int(self.price_max[i]),
+            audience_age_cdf=self.age_cdf[i].tolist() if self.age_cdf[i, -1] else None,
+            performance_feature=float(self.performance[i]),
+            reliability_feature=float(self.reliability[i]),
+            feature_version=FEATURE_VERSION
+        )
+
+    def rows(self) -> List[CreatorRow]:
+        """Todas as linhas do catálogo como CreatorRow (para o caminho por criador)"""
+        return [self.row(i) for i in range(len(self))]
+
+    def tags_scores(self, required_tags: List[str], rows: Any = slice(None)) -> np.ndarray:
+        """Jaccard entre as tags de cada criador e as tags requeridas (via popcount)"""
+        required = set(required_tags or [])
+        tag_counts = self.tag_counts[rows]
+        if not required:
+            return np.ones(len(tag_counts), dtype=np.float64)
+
+        required_bits = self._mask(required, self.tag_vocab, self.tag_bits.shape[1])
+        intersection = np.bitwise_count(self.tag_bits[rows] & required_bits).sum(axis=1)
+        union = tag_counts + len(required) - intersection
+        return intersection / union
+
+    def audience_scores(self, target_country: str, target_age_range: List[int],
+                        rows: Any = slice(None)) -> np.ndarray:
+        """Média entre presença no país alvo e fração da audiência na faixa etária"""
+        country_bits = self.country_bits[rows]
+        bit = self.country_vocab.get(target_country)
+        if bit is None:
+            geo_score = np.zeros(len(country_bits), dtype=np.float64)
+        else:
+            word = country_bits[:, bit >> 6]
+            geo_score = ((word >> np.uint64(bit & 63)) & np.uint64(1)).astype(np.float64)
+
+        age_score = np.zeros(len(country_bits), dtype=np.float64)
+        if target_age_range and len(target_age_range) >= 2:
+            age_cdf = self.age_cdf[rows]
+            total = age_cdf[:, -1].astype(np.int64)
+            overlap = self._count_le(age_cdf, total, target_age_range[1]) - \
+                self._count_le(age_cdf, total, target_age_range[0] - 1)
+            np.divide(np.maximum(overlap, 0), total, out=age_score, where=total > 0)
+
+        return (geo_score + age_score) / 2
+
+    def _count_le(self, age_cdf: np.ndarray, total: np.ndarray, age: int) -> np.ndarray:
+        """Número de idades <= age em cada linha, via consulta O(1) na distribuição acumulada"""
+        if age < 0:
+            return np.zeros(len(total), dtype=np.int64)
+        if age >= AGE_MAX:
+            return total
+        return age_cdf[:, age].astype(np.int64)
+
+    def performance_scores(self, rows: Any = slice(None)) -> np.ndarray:
+        """Feature de performance materializada (independe da campanha)"""
+        return self.performance[rows]
+
+    def budget_scores(self, budget: int, rows: Any = slice(None)) -> np.ndarray:
+        """Adequação do orçamento à faixa de preço de cada criador"""
+        price_min = self.price_min[rows]
+        price_max = self.price_max[rows]
+
+        below = budget < price_min
+        above = budget > price_max
+        below_score = np.maximum(0.0, budget / np.where(below, price_min, 1))
+        above_score = np.minimum(1.0, price_max / (budget if budget else 1) + 0.2)
+
+        return np.where(below, below_score, np.where(above, above_score, 1.0))
+
+    def score(self, campaign_data: Dict[str, Any], weights: Dict[str, float],
+              rows: Any = slice(None)) -> Dict[str, np.ndarray]:
+        """
+        Calcula os componentes e o score total ponderado para as linhas indicadas
+        Retorna as mesmas chaves de RecommendationEngine.score_creator, como arrays
+        """
+        audience_target = campaign_data.get('audience_target', {})
+
+        tags_score = self.tags_scores(campaign_data.get('tags_required', []), rows)
+        audience_score = self.audience_scores(
+            audience_target.get('country', ''),
+            audience_target.get('age_range', []),
+            rows
+        )
+        performance_score = self.performance_scores(rows)
+        budget_score = self.budget_scores(campaign_data.get('budget_cents', 0), rows)
+        reliability_score = self.reliability[rows]
+
+        total_score = (
+            tags_score * weights['tags'] +
+            audience_score * weights['audience'] +
+            performance_score * weights['performance'] +
+            budget_score * weights['budget'] +
+            reliability_score * weights['reliability']
+        )
+
+        return {
+            'tags': tags_score,
+            'audience_overlap': audience_score,
+            'performance': performance_score,
+            'budget_fit': budget_score,
+            'reliability': reliability_score,
+            'total': total_score
+        }
+
+    def component_matrix(self, campaign_data: Dict[str, Any]) -> np.ndarray:
+        """
+        Componentes do score da campanha para o catálogo inteiro (linhas em
+        COMPONENT_KEYS), guardados por campanha canônica em um LRU limitado
+        pela memória das matrizes: outro vetor de pesos para a mesma campanha
+        vira só uma soma ponderada. Matrizes maiores que o limite não são guardadas.
+        """
+        key = campaign_components_key(campaign_data)
+        with self._components_lock:
+            matrix = self._components.get(key)
+            if matrix is not None:
+                self._components.move_to_end(key)
+                return matrix
+
+        audience_target = campaign_data.get('audience_target', {})
+        matrix = np.vstack([
+            self.tags_scores(campaign_data.get('tags_required', [])),
+            self.audience_scores(audience_target.get('country', ''), audience_target.get('age_range', [])),
+            self.performance_scores(),
+            self.budget_scores(campaign_data.get('budget_cents', 0)),
+            self.reliability
+        ])
+        max_bytes = int(COMPONENT_CACHE_MB * 1024 * 1024)
+        if matrix.nbytes <= max_bytes:
+            with self._components_lock:
+                if key not in self._components:
+                    self._components[key] = matrix
+                    self._components_bytes += matrix.nbytes
+                while self._components_bytes > max_bytes:
+                    _, evicted = self._components.popitem(last=False)
+                    self._components_bytes -= evicted.nbytes
+        return matrix
+
+    def clear_components(self):
+        """Descarta as matrizes de componentes guardadas"""
+        with self._components_lock:
+            self._components.clear()
+            self._components_bytes = 0
+
+    def cached_score(self, campaign_data: Dict[str, Any], weights: Dict[str, float],
+                     rows: Any = slice(None)) -> Dict[str, np.ndarray]:
+        """Mesmo resultado de score(), a partir da matriz de componentes da campanha"""
+        components = self.component_matrix(campaign_data)[:, rows]
+        scores = {key: components[i] for i, key in enumerate(COMPONENT_KEYS)}
+        scores['total'] = weighted_total(components, weights)
+        return scores
+
+    def upper_bounds(self, weights: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Limite superior do score total de cada criador, independente da campanha:
+        tags, audiência e orçamento valem no máximo 1; performance e
+        confiabilidade já são conhecidas. Guardado por vetor de pesos em um LRU
+        (perfis por requisição não crescem a memória sem limite).
+
+        Retorna (limites em ordem decrescente, linhas nessa ordem, rank de cada linha).
+        """
+        key = tuple(sorted(weights.items()))
+        with self._bounds_lock:
+            cached = self._bounds.get(key)
+            if cached is not None:
+                self._bounds.move_to_end(key)
+                return cached
+
+        bounds = (
+            weights['tags'] + weights['audience'] + weights['budget'] +
+            self.performance_scores() * weights['performance'] +
+            self.reliability * weights['reliability'] + BOUND_EPSILON
+        )
+        order = np.argsort(-bounds, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        cached = (bounds[order], order, rank)
+        if BOUND_CACHE_SIZE > 0:
+            with self._bounds_lock:
+                self._bounds[key] = cached
+                while len(self._bounds) > BOUND_CACHE_SIZE:
+                    self._bounds.popitem(last=False)
+        return cached
+
+    def tag_rows(self, tag: str) -> np.ndarray:
+        """Lista invertida: linhas dos criadores que possuem a tag"""
+        bit = self.tag_vocab.get(tag)
+        if bit is None:
+            return np.zeros(0, dtype=np.int64)
+        rows = self._tag_rows.get(bit)
+        if rows is None:
+            word = self.tag_bits[:, bit >> 6]
+            rows = np.flatnonzero((word >> np.uint64(bit & 63)) & np.uint64(1))
+            self._tag_rows[bit] = rows
+        return rows
+
+    def candidate_rows(self, campaign_data: Dict[str, Any],
+                       filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Linhas que satisfazem as restrições rígidas (ver candidates.py), em
+        ordem do catálogo; None quando nenhuma restrição está ativa
+        """
+        filters = active_filters(filters)
+        if filters is None:
+            return None
+
+        keep = np.ones(len(self), dtype=bool)
+        if filters['require_country']:
+            bit = self.country_vocab.get(campaign_data.get('audience_target', {}).get('country', ''))
+            if bit is None:
+                keep[:] = False
+            else:
+                word = self.country_bits[:, bit >> 6]
+                keep &= ((word >> np.uint64(bit & 63)) & np.uint64(1)).astype(bool)
+
+        required = set(campaign_data.get('tags_required', []) or [])
+        if filters['require_tag_match'] and required:
+            sharing = np.zeros(len(self), dtype=bool)
+            for tag in required:
+                sharing[self.tag_rows(tag)] = True
+            keep &= sharing
+
+        limit = price_limit(campaign_data, filters)
+        if limit is not None:
+            keep &= self.price_min <= limit
+
+        return np.flatnonzero(keep)
+
+    def top_k_threshold(self, campaign_data: Dict[str, Any], weights: Dict[str, float],
+                        top_k: int, block_size: int = 1024,
+                        candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, int]:
+        """
+        Top-k exato com poda por limite superior (estilo Threshold Algorithm/WAND)
+
+        Percorre os criadores em ordem decrescente de limite superior, em duas
+        listas: quem compartilha alguma tag requerida (limite estático) e quem
+        não compartilha nenhuma (tags = 0, limite reduzido do peso das tags).
+        Pontua blocos exatos e para assim que o k-ésimo melhor score já supera
+        o próximo limite. Retorna (linhas do top-k em ordem, criadores pontuados).
+        candidates restringe a busca às linhas indicadas (ver candidate_rows).
+        """
+        n = len(self)
+        top_k = min(max(top_k, 0), n if candidates is None else len(candidates))
+        if top_k == 0:
+            return np.zeros(0, dtype=np.int64), 0
+
+        sorted_bounds, order, rank = self.upper_bounds(weights)
+        allowed = None
+        if candidates is not None:
+            allowed = np.zeros(n, dtype=bool)
+            allowed[rank[candidates]] = True
+
+        required = set(campaign_data.get('tags_required', []) or [])
+        if required:
+            postings = [rank[self.tag_rows(tag)] for tag in required]
+            sharing = np.unique(np.concatenate(postings))
+        else:
+            sharing = np.arange(n)
+        if allowed is not None:
+            sharing = sharing[allowed[sharing]]
+
+        # Lista B (sem tags em comum) só existe se houver tags requeridas
+        tags_penalty = weights['tags']
+        a_pos = 0
+        b_next = 0 if required else n
+        b_pending = np.zeros(0, dtype=np.int64)
+
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float64)
+        scored = 0
+
+        while True:
+            # Reabastece a lista B com as próximas posições fora de "sharing"
+            while not len(b_pending) and b_next < n:
+                window = np.arange(b_next, min(n, b_next + block_size))
+                b_next = window[-1] + 1
+                idx = np.minimum(np.searchsorted(sharing, window), max(len(sharing) - 1, 0))
+                member = sharing[idx] == window if len(sharing) else np.zeros(len(window), dtype=bool)
+                b_pending = window[~member] if allowed is None else window[~member & allowed[window]]
+
+            head_a = sorted_bounds[sharing[a_pos]] if a_pos < len(sharing) else -np.inf
+            head_b = sorted_bounds[b_pending[0]] - tags_penalty if len(b_pending) else -np.inf
+            head = max(head_a, head_b)
+            if head == -np.inf:
+                break
+            if len(best_rows) == top_k and best_scores[-1] > round(float(head), 3):
+                break
+
+            if head_a >= head_b:
+                block = sharing[a_pos:a_pos + block_size]
+                a_pos += len(block)
+            else:
+                block = b_pending[:block_size]
+                b_pending = b_pending[block_size:]
+
+            rows = order[block]
+            totals = np.round(self.score(campaign_data, weights, rows)['total'], 3)
+            scored += len(rows)
+
+            candidates = np.concatenate([best_rows, rows])
+            values = np.concatenate([best_scores, totals])
+            keep = np.lexsort((candidates, -values))[:top_k]
+            best_rows, best_scores = candidates[keep], values[keep]
+
+        return best_rows, scored
+
+    def iter_score_matrix(self, campaigns: List[Dict[str, Any]],
+                          weights: List[Dict[str, float]]) -> Iterator[np.ndarray]:
+        """
+        Score total de várias campanhas (cada uma com seus pesos) contra o
+        catálogo inteiro como uma matriz campanhas × criadores, produzida em
+        blocos de linhas para limitar a memória. Performance e confiabilidade
+        são calculadas uma única vez; os demais componentes usam broadcasting.
+        """
+        n = len(self)
+        performance = self.performance_scores()
+        chunk = max(1, MATRIX_CHUNK_ELEMENTS // max(n, 1))
+
+        for start in range(0, len(campaigns), chunk):
+            batch = campaigns[start:start + chunk]
+            column = lambda key: np.array([w[key] for w in weights[start:start + chunk]])[:, None]
+            targets = [c.get('audience_target', {}) for c in batch]
+
+            tags_score = self._tags_matrix([c.get('tags_required', []) for c in batch])
+            audience_score = self._audience_matrix(
+                [t.get('country', '') for t in targets],
+                [t.get('age_range', []) for t in targets]
+            )
+            budget_score = self._budget_matrix(
+                np.array([c.get('budget_cents', 0) for c in batch], dtype=np.float64)[:, None]
+            )
+
+            yield (
+                tags_score * column('tags') +
+                audience_score * column('audience') +
+                performance * column('performance') +
+                budget_score * column('budget') +
+                self.reliability * column('reliability')
+            )
+
+    def _tags_matrix(self, required_lists: List[List[str]]) -> np.ndarray:
+        """Jaccard (campanhas × criadores) via popcount de bitsets"""
+        required_sets = [set(tags or []) for tags in required_lists]
+        masks = np.stack([self._mask(r, self.tag_vocab, self.tag_bits.shape[1]) for r in required_sets])
+        counts = np.array([len(r) for r in required_sets], dtype=np.int64)[:, None]
+
+        intersection = np.bitwise_count(self.tag_bits[None, :, :] & masks[:, None, :]).sum(axis=2)
+        union = self.tag_counts[None, :] + counts - intersection
+        scores = np.divide(intersection, union, out=np.zeros(union.shape), where=counts > 0)
+        scores[counts[:, 0] == 0] = 1.0
+        return scores
+
+    def _audience_matrix(self, countries: List[str], age_ranges: List[List[int]]) -> np.ndarray:
+        """Score de audiência (campanhas × criadores)"""
+        n = len(self)
+        geo_score = np.zeros((len(countries), n), dtype=np.float64)
+        for c, country in enumerate(countries):
+            bit = self.country_vocab.get(country)
+            if bit is not None:
+                word = self.country_bits[:, bit >> 6]
+                geo_score[c] = (word >> np.uint64(bit & 63)) & np.uint64(1)
+
+        age_score = np.zeros((len(countries), n), dtype=np.float64)
+        total = self.age_cdf[:, -1].astype(np.int64)
+        for c, age_range in enumerate(age_ranges):
+            if age_range and len(age_range) >= 2:
+                overlap = self._count_le(self.age_cdf, total, age_range[1]) - \
+                    self._count_le(self.age_cdf, total, age_range[0] - 1)
+                np.divide(np.maximum(overlap, 0), total, out=age_score[c], where=total > 0)
+
+        return (geo_score + age_score) / 2
+
+    def _budget_matrix(self, budgets: np.ndarray) -> np.ndarray:
+        """Adequação de orçamento (campanhas × criadores); budgets tem forma (C, 1)"""
+        below = budgets < self.price_min
+        above = budgets > self.price_max
+        below_score = np.maximum(0.0, budgets / np.where(below, self.price_min, 1))
+        above_score = np.minimum(1.0, self.price_max / np.where(budgets != 0, budgets, 1) + 0.2)
+
+        return np.where(below, below_score, np.where(above, above_score, 1.0))
@@ -0,0 +1,148 @@
+# Arquivo binário colunar do catálogo (memory-mapped, compartilhado entre workers)
+"""
+Formato (little-endian):
+    8 bytes   assinatura CATALOG_MAGIC
+    8 bytes   tamanho N do cabeçalho JSON (uint64)
+    N bytes   cabeçalho JSON: vocabulários, metadados e, para cada coluna,
+              dtype, shape e offset relativo ao início das colunas
+    ...       colunas de CreatorCatalog.COLUMNS a partir do primeiro múltiplo
+              de ALIGNMENT após o cabeçalho, cada uma alinhada a ALIGNMENT
+
+Uso (compila o catálogo a partir do banco):
+    python -m app.catalog_file --output catalog.bin
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from .catalog import CreatorCatalog
+
+CATALOG_MAGIC = b'RECOCAT2'
+ALIGNMENT = 64
+_HEADER = struct.Struct('<8sQ')
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_catalog_file(catalog: CreatorCatalog, path: str, metadata: Optional[Dict[str, Any]] = None):
+    """
+    Grava o catálogo no formato colunar e substitui o arquivo atomicamente
+    (escreve um temporário no mesmo diretório, fsync e rename por cima)
+    """
+    columns = {name: np.ascontiguousarray(getattr(catalog, name)) for name in CreatorCatalog.COLUMNS}
+
+    # Offsets relativos ao início da área de dados (primeiro múltiplo de ALIGNMENT após o cabeçalho)
+    layout = {}
+    offset = 0
+    for name, values in columns.items():
+        offset = _align(offset)
+        layout[name] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+        offset += values.nbytes
+
+    encoded = json.dumps({
+        'tag_vocab': catalog.tag_vocab,
+        'country_vocab': catalog.country_vocab,
+        'metadata': dict(metadata or {}, created_at=time.time(), creators=len(catalog)),
+        'columns': layout
+    }).encode('utf-8')
+    data_start = _align(_HEADER.size + len(encoded))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.catalog-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(CATALOG_MAGIC, len(encoded)))
+            f.write(encoded)
+            for name, values in columns.items():
+                f.write(b'\0' * (data_start + layout[name]['offset'] - f.tell()))
+                f.write(values.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_catalog_file(path: str) -> Tuple[CreatorCatalog, Dict[str, Any]]:
+    """
+    Abre o arquivo como memory map somente leitura; as colunas do catálogo
+    são views sobre o mapeamento (sem cópia, páginas compartilhadas entre
+    processos). Retorna (catálogo, metadados).
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, header_size = _HEADER.unpack_from(mapped, 0)
+    if magic != CATALOG_MAGIC:
+        raise ValueError(f"Arquivo de catálogo inválido: {path}")
+    header = json.loads(mapped[_HEADER.size:_HEADER.size + header_size])
+    data_start = _align(_HEADER.size + header_size)
+
+    columns = {}
+    for name, spec in header['columns'].items():
+        dtype = np.dtype(spec['dtype'])
+        shape = tuple(spec['shape'])
+        count = int(np.prod(shape))
+        if count:
+            columns[name] = np.frombuffer(mapped, dtype=dtype, count=count,
+                                          offset=data_start + spec['offset']).reshape(shape)
+        else:
+            columns[name] = np.zeros(shape, dtype=dtype)
+
+    catalog = CreatorCatalog(tag_vocab=header['tag_vocab'], country_vocab=header['country_vocab'], **columns)
+    return catalog, header['metadata']
+
+
+class MappedCatalog:
+    """
+    Catálogo servido a partir de um arquivo compilado
+
+    A cada verificação compara inode/mtime/tamanho do arquivo; quando um
+    novo arquivo foi renomeado por cima, mapeia-o e passa a servi-lo. O
+    mapeamento anterior continua válido para quem ainda o referencia.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.catalog: Optional[CreatorCatalog] = None
+        self.metadata: Dict[str, Any] = {}
+        self.loads = 0
+        self._file_key: Optional[Tuple[int, int, int]] = None
+
+    def reload_if_changed(self) -> bool:
+        """Mapeia o arquivo se ele mudou desde a última carga; True se recarregou"""
+        stat = os.stat(self.path)
+        file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_key == self._file_key:
+            return False
+        self.catalog, self.metadata = read_catalog_file(self.path)
+        self._file_key = file_key
+        self.loads += 1
+        return True
+
+
+if __name__ == "__main__":
+    import argparse
+    from .database import SessionLocal
+    from .snapshot import CATALOG_PATH, snapshot_store
+
+    parser = argparse.ArgumentParser(description="Compila o catálogo de criadores em arquivo binário")
+    parser.add_argument("--output", default=CATALOG_PATH or "catalog.bin")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = snapshot_store.refresh_with(SessionLocal)
+    write_catalog_file(snapshot.catalog, args.output, {
+        'watermark': snapshot.watermark.isoformat() if snapshot.watermark else None
+    })
+    print(f"{len(snapshot.catalog)} criadores gravados em {args.output} "
+          f"({os.path.getsize(args.output)} bytes, {time.perf_counter() - start:.2f}s)")
@@ -0,0 +1,69 @@
+# Contador de versão do catálogo (criadores e histórico de deals)
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .models import Base, Creator, PastDeal
+
+CATALOG_MODELS = (Creator, PastDeal)
+
+
+class CatalogVersion:
+    """
+    Versão monotônica do catálogo neste processo
+
+    É incrementada após o commit de qualquer escrita em Creator ou PastDeal
+    (inclusive updates/deletes em massa) e quando o esquema é recriado.
+    Caches derivados do catálogo guardam a versão com que foram calculados
+    e se invalidam ao detectar uma versão diferente.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def bump(self) -> int:
+        with self._lock:
+            self.value += 1
+            return self.value
+
+
+catalog_version = CatalogVersion()
+
+
+def _touches_catalog(instances) -> bool:
+    return any(isinstance(instance, CATALOG_MODELS) for instance in instances)
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_flush(session, flush_context):
+    if _touches_catalog(session.new) or _touches_catalog(session.dirty) or _touches_catalog(session.deleted):
+        session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_bulk_write(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in CATALOG_MODELS:
+            orm_execute_state.session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_on_commit(session):
+    if session.info.pop('catalog_changed', False):
+        catalog_version.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('catalog_changed', None)
+
+
+@event.listens_for(Base.metadata, 'after_create')
+def _bump_on_create(target, connection, **kw):
+    catalog_version.bump()
+
+
+@event.listens_for(Base.metadata, 'after_drop')
+def _bump_on_drop(target, connection, **kw):
+    catalog_version.bump()
@@ -0,0 +1,76 @@
+# Coalescência de requisições idênticas concorrentes (single-flight) com descarte de carga
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from .metrics import metrics
+
+# Cálculos distintos em andamento antes de recusar novas campanhas com 503
+MAX_IN_FLIGHT = int(os.getenv('MAX_IN_FLIGHT', '64'))
+
+
+class Overloaded(Exception):
+    """Fila de cálculos em andamento cheia"""
+
+
+class SingleFlight:
+    """
+    Um único cálculo por chave canônica em andamento: requisições que chegam
+    com a mesma chave aguardam o resultado do primeiro em vez de recalcular.
+    Chaves novas com max_in_flight cálculos em andamento são recusadas
+    (Overloaded) em vez de enfileirar sem limite no pool de scoring.
+
+    Roda no event loop (sem locks): registro e consulta não têm await entre si.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+        self.shed = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Resultado de func() para a chave, compartilhado entre as requisições concorrentes"""
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            metrics.inc('coalesced_requests_total')
+            # shield: o cancelamento de quem espera não cancela o cálculo compartilhado
+            return await asyncio.shield(future)
+
+        if len(self._calls) >= self.max_in_flight:
+            self.shed += 1
+            metrics.inc('shed_requests_total')
+            raise Overloaded(f"{len(self._calls)} cálculos em andamento")
+
+        future = asyncio.get_running_loop().create_future()
+        # Sem ninguém aguardando, a exceção não deve gerar aviso de "nunca lida"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': len(self._calls),
+            'max_in_flight': self.max_in_flight,
+            'coalesced': self.coalesced,
+            'shed': self.shed
+        }
+
+
+single_flight = SingleFlight()
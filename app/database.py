@@ -1,11 +1,19 @@
 # Configuração do banco de dados SQLite
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from .models import Base
+from .migrations import run_migrations
+from . import tag_index  # Registra a sincronização de creator_tags nas escritas de Creator
+from . import catalog_version  # Registra o versionamento do catálogo nas escritas
+from . import candidates  # Registra a sincronização de creator_countries nas escritas de Creator
+from .feature_store import recompute_features  # Registra a materialização das features nas escritas
+from .deal_stats import backfill_deal_stats  # Registra a atualização dos agregados de deals nas escritas
 import os
 
 # Usar SQLite para simplicidade
 DATABASE_URL = "sqlite:///./reco.db"
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./reco.db"
 
 engine = create_engine(
     DATABASE_URL, 
@@ -14,9 +22,17 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrono para o caminho das requisições (não bloqueia o event loop)
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def init_db():
-    """Inicializa o banco de dados criando todas as tabelas"""
+    """Inicializa o banco de dados criando todas as tabelas e aplicando migrações"""
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    backfill_deal_stats(engine)  # Só atua se houver deals e a tabela de agregados estiver vazia
+    recompute_features(engine)  # Só atua em linhas com versão de features desatualizada
 
 def get_db():
     """Dependency para obter sessão do banco de dados"""
@@ -24,4 +40,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """Dependency para obter sessão assíncrona do banco de dados"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,223 @@
+# Agregados do histórico de deals por criador, mantidos incrementalmente
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+import numpy as np
+from sqlalchemy import delete, event, inspect, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+from .features import DEAL_DECAY
+from .feature_store import recompute_features, refresh_reliability_feature
+from .models import Creator, CreatorDealStats, PastDeal
+
+# Deals lidos por lote na reconstrução em massa
+DEAL_CHUNK_SIZE = 100000
+
+stats_table = CreatorDealStats.__table__
+deals_table = PastDeal.__table__
+
+
+class DealStatsAccumulator:
+    """
+    Agregados densos (indexados por creator_id) calculados com NumPy
+
+    Os deals devem chegar em ordem de inserção (id crescente). A média
+    decaída compõe entre lotes: um segmento de m deals mais novos multiplica
+    a soma e o peso acumulados por DEAL_DECAY^m antes de somar os seus.
+    """
+
+    def __init__(self, size: int = 0, decay: float = DEAL_DECAY):
+        self.decay = decay
+        self.deal_count = np.zeros(size, dtype=np.int64)
+        self.on_time_count = np.zeros(size, dtype=np.int64)
+        self.decayed_sum = np.zeros(size)
+        self.decayed_weight = np.zeros(size)
+
+    def _grow(self, size: int):
+        if size <= len(self.deal_count):
+            return
+        extra = max(size, 2 * len(self.deal_count)) - len(self.deal_count)
+        self.deal_count = np.concatenate([self.deal_count, np.zeros(extra, dtype=np.int64)])
+        self.on_time_count = np.concatenate([self.on_time_count, np.zeros(extra, dtype=np.int64)])
+        self.decayed_sum = np.concatenate([self.decayed_sum, np.zeros(extra)])
+        self.decayed_weight = np.concatenate([self.decayed_weight, np.zeros(extra)])
+
+    def add(self, creator_ids: np.ndarray, on_time: np.ndarray, performance: np.ndarray):
+        """Acrescenta um lote de deals (arrays alinhados, em ordem de inserção)"""
+        if not len(creator_ids):
+            return
+        creator_ids = np.asarray(creator_ids, dtype=np.int64)
+        self._grow(int(creator_ids.max()) + 1)
+
+        # Agrupa por criador mantendo a ordem de inserção dentro de cada grupo
+        order = np.argsort(creator_ids, kind='stable')
+        ids = creator_ids[order]
+        creators, starts, counts = np.unique(ids, return_index=True, return_counts=True)
+        rank = np.arange(len(ids)) - np.repeat(starts, counts)
+        weights = self.decay ** (np.repeat(counts, counts) - 1 - rank)  # Deal mais novo pesa 1
+
+        factor = self.decay ** counts
+        self.decayed_sum[creators] = self.decayed_sum[creators] * factor + \
+            np.add.reduceat(np.asarray(performance, dtype=float)[order] * weights, starts)
+        self.decayed_weight[creators] = self.decayed_weight[creators] * factor + np.add.reduceat(weights, starts)
+        self.deal_count[creators] += counts
+        self.on_time_count[creators] += np.add.reduceat(np.asarray(on_time, dtype=np.int64)[order], starts)
+
+    def history(self, creator_id: int) -> Tuple[int, int, Optional[float]]:
+        """(deals, entregas no prazo, média decaída) no formato de reliability_feature"""
+        if creator_id >= len(self.deal_count) or not self.deal_count[creator_id]:
+            return 0, 0, None
+        return (
+            int(self.deal_count[creator_id]),
+            int(self.on_time_count[creator_id]),
+            float(self.decayed_sum[creator_id] / self.decayed_weight[creator_id])
+        )
+
+    def rows(self) -> Iterator[dict]:
+        """Linhas de creator_deal_stats dos criadores com deals"""
+        now = datetime.utcnow()
+        for creator_id in np.flatnonzero(self.deal_count):
+            yield {
+                'creator_id': int(creator_id),
+                'deal_count': int(self.deal_count[creator_id]),
+                'on_time_count': int(self.on_time_count[creator_id]),
+                'decayed_sum': float(self.decayed_sum[creator_id]),
+                'decayed_weight': float(self.decayed_weight[creator_id]),
+                'updated_at': now
+            }
+
+
+def record_deal(connection: Connection, creator_id: int, delivered_on_time: Optional[bool],
+                performance_score: Optional[float]):
+    """Atualiza os agregados do criador com um novo deal (upsert O(1))"""
+    on_time = 1 if delivered_on_time is None or delivered_on_time else 0
+    statement = sqlite_insert(stats_table).values(
+        creator_id=creator_id, deal_count=1, on_time_count=on_time,
+        decayed_sum=performance_score or 0.0, decayed_weight=1.0, updated_at=datetime.utcnow()
+    )
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[stats_table.c.creator_id],
+        set_={
+            'deal_count': stats_table.c.deal_count + 1,
+            'on_time_count': stats_table.c.on_time_count + statement.excluded.on_time_count,
+            'decayed_sum': stats_table.c.decayed_sum * DEAL_DECAY + statement.excluded.decayed_sum,
+            'decayed_weight': stats_table.c.decayed_weight * DEAL_DECAY + 1.0,
+            'updated_at': statement.excluded.updated_at
+        }
+    ))
+
+
+def rebuild_creator_stats(connection: Connection, creator_id: int):
+    """Recalcula os agregados de um criador a partir dos seus deals (alterações e remoções)"""
+    rows = connection.execute(
+        select(deals_table.c.delivered_on_time, deals_table.c.performance_score)
+        .where(deals_table.c.creator_id == creator_id)
+        .order_by(deals_table.c.id)
+    ).fetchall()
+    connection.execute(delete(stats_table).where(stats_table.c.creator_id == creator_id))
+    if not rows:
+        return
+
+    decayed_sum = decayed_weight = 0.0
+    for row in rows:
+        decayed_sum = decayed_sum * DEAL_DECAY + (row.performance_score or 0.0)
+        decayed_weight = decayed_weight * DEAL_DECAY + 1.0
+    connection.execute(insert(stats_table).values(
+        creator_id=creator_id, deal_count=len(rows),
+        on_time_count=sum(1 for row in rows if row.delivered_on_time is None or row.delivered_on_time),
+        decayed_sum=decayed_sum, decayed_weight=decayed_weight, updated_at=datetime.utcnow()
+    ))
+
+
+@event.listens_for(PastDeal, 'after_insert')
+def _deal_inserted(mapper, connection, target):
+    if target.creator_id is not None:
+        record_deal(connection, target.creator_id, target.delivered_on_time, target.performance_score)
+        refresh_reliability_feature(connection, target.creator_id)
+
+
+@event.listens_for(PastDeal, 'after_update')
+def _deal_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes()
+               for name in ('creator_id', 'delivered_on_time', 'performance_score')):
+        return
+    affected = {target.creator_id, *state.attrs.creator_id.history.deleted}
+    for creator_id in affected - {None}:
+        rebuild_creator_stats(connection, creator_id)
+        refresh_reliability_feature(connection, creator_id)
+
+
+@event.listens_for(PastDeal, 'after_delete')
+def _deal_deleted(mapper, connection, target):
+    if target.creator_id is not None:
+        rebuild_creator_stats(connection, target.creator_id)
+        refresh_reliability_feature(connection, target.creator_id)
+
+
+def aggregate_deals(engine: Engine, chunk_size: int = DEAL_CHUNK_SIZE) -> DealStatsAccumulator:
+    """
+    Lê past_deals em ordem de id (paginação por chave) e agrega com NumPy
+
+    Usa o cursor DBAPI diretamente: com milhões de linhas, montar um Row do
+    SQLAlchemy por deal custa mais que a própria leitura do SQLite.
+    """
+    accumulator = DealStatsAccumulator()
+    last_id = 0
+    with engine.connect() as conn:
+        cursor = conn.connection.cursor()
+        try:
+            while True:
+                rows = cursor.execute(
+                    "SELECT id, creator_id, COALESCE(delivered_on_time, 1), COALESCE(performance_score, 0.0) "
+                    "FROM past_deals WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, chunk_size)
+                ).fetchall()
+                if not rows:
+                    return accumulator
+
+                # Deals sem criador viram NaN e são descartados (filtrar no SQL faria o
+                # SQLite trocar a varredura pela chave primária pelo índice de creator_id)
+                columns = np.array(rows, dtype=float)
+                columns = columns[~np.isnan(columns[:, 1])]
+                accumulator.add(columns[:, 1].astype(np.int64), columns[:, 2] != 0, columns[:, 3])
+                last_id = rows[-1][0]
+        finally:
+            cursor.close()
+
+
+def rebuild_deal_stats(engine: Engine, chunk_size: int = DEAL_CHUNK_SIZE) -> int:
+    """
+    Reconstrói creator_deal_stats a partir de todo o histórico e recalcula
+    a confiabilidade materializada dos criadores. Retorna o número de linhas.
+    """
+    accumulator = aggregate_deals(engine, chunk_size)
+    rows = list(accumulator.rows())
+
+    # Criadores com histórico antes ou depois têm a confiabilidade recalculada
+    with_history = Creator.__table__.c.id.in_(select(stats_table.c.creator_id))
+    with engine.begin() as conn:
+        conn.execute(update(Creator.__table__).where(with_history).values(feature_version=None))
+        conn.execute(delete(stats_table))
+        for start in range(0, len(rows), chunk_size):
+            conn.execute(insert(stats_table), rows[start:start + chunk_size])
+        conn.execute(update(Creator.__table__).where(with_history).values(feature_version=None))
+
+    recompute_features(engine)
+    return len(rows)
+
+
+def backfill_deal_stats(engine: Engine) -> int:
+    """Preenche creator_deal_stats em bancos que já tinham deals antes da tabela existir"""
+    if not inspect(engine).has_table('past_deals') or not inspect(engine).has_table('creator_deal_stats'):
+        return 0
+    with engine.connect() as conn:
+        if conn.execute(select(stats_table.c.creator_id).limit(1)).first() or \
+                not conn.execute(select(deals_table.c.id).limit(1)).first():
+            return 0
+    return rebuild_deal_stats(engine)
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    print(f"Agregados de deals reconstruídos para {rebuild_deal_stats(engine)} criadores")
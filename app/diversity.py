@@ -0,0 +1,86 @@
+# Re-ranking por diversidade (Maximal Marginal Relevance)
+import os
+from typing import Optional
+import numpy as np
+from .catalog import CreatorCatalog
+
+# Peso da relevância frente à similaridade com os já escolhidos (1 = sem diversidade)
+DIVERSITY_LAMBDA = float(os.getenv('DIVERSITY_LAMBDA', '0.7'))
+
+# Quantos melhores candidatos (por score) entram no re-ranking
+DIVERSITY_POOL_SIZE = int(os.getenv('DIVERSITY_POOL_SIZE', '200'))
+
+
+def pool_size(top_k: int, pool: Optional[int] = None) -> int:
+    """Tamanho do conjunto de candidatos re-ranqueado (nunca menor que top_k)"""
+    return max(top_k, DIVERSITY_POOL_SIZE if pool is None else pool)
+
+
+def _jaccard(bits: np.ndarray, counts: np.ndarray, j: int) -> np.ndarray:
+    """Jaccard entre o bitset da linha j e todas as linhas"""
+    intersection = np.bitwise_count(bits & bits[j]).sum(axis=1)
+    union = counts + counts[j] - intersection
+    result = np.zeros(len(bits), dtype=np.float64)
+    np.divide(intersection, union, out=result, where=union > 0)
+    return result
+
+
+class SimilarityPool:
+    """
+    Atributos do conjunto de candidatos usados na similaridade entre criadores
+
+    Similaridade = média entre Jaccard de tags e similaridade de audiência
+    (média entre Jaccard de países e interseção das distribuições de idade).
+    """
+
+    def __init__(self, catalog: CreatorCatalog, rows: np.ndarray):
+        self.tag_bits = catalog.tag_bits[rows]
+        self.tag_counts = catalog.tag_counts[rows]
+        self.country_bits = catalog.country_bits[rows]
+        self.country_counts = np.bitwise_count(self.country_bits).sum(axis=1).astype(np.int64)
+
+        age_cdf = catalog.age_cdf[rows].astype(np.float64)
+        total = age_cdf[:, -1:]
+        counts = np.diff(age_cdf, axis=1, prepend=0.0)
+        self.age_pdf = np.zeros_like(counts)
+        np.divide(counts, total, out=self.age_pdf, where=total > 0)
+
+    def similarity_to(self, j: int) -> np.ndarray:
+        """Similaridade de todos os candidatos com o candidato j (O(n))"""
+        tags = _jaccard(self.tag_bits, self.tag_counts, j)
+        countries = _jaccard(self.country_bits, self.country_counts, j)
+        ages = np.minimum(self.age_pdf, self.age_pdf[j]).sum(axis=1)
+        return (tags + (countries + ages) / 2) / 2
+
+
+def mmr_rerank(catalog: CreatorCatalog, rows: np.ndarray, relevance: np.ndarray,
+               top_k: int, lam: Optional[float] = None) -> np.ndarray:
+    """
+    Seleciona top_k posições de rows maximizando
+    lam · relevância − (1 − lam) · maior similaridade com os já escolhidos
+
+    A maior similaridade de cada candidato é atualizada incrementalmente a
+    cada escolha (uma linha de similaridade por passo), custo O(k·n).
+    Empates favorecem a ordem de rows. Retorna as posições na ordem escolhida.
+    """
+    lam = DIVERSITY_LAMBDA if lam is None else lam
+    n = len(rows)
+    top_k = min(max(top_k, 0), n)
+    if top_k == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    pool = SimilarityPool(catalog, rows)
+    relevance = lam * np.asarray(relevance, dtype=np.float64)
+    max_similarity = np.zeros(n, dtype=np.float64)
+    available = np.ones(n, dtype=bool)
+    selected = np.empty(top_k, dtype=np.int64)
+
+    for step in range(top_k):
+        marginal = np.where(available, relevance - (1 - lam) * max_similarity, -np.inf)
+        j = int(np.argmax(marginal))
+        selected[step] = j
+        available[j] = False
+        if step + 1 < top_k:
+            np.maximum(max_similarity, pool.similarity_to(j), out=max_similarity)
+
+    return selected
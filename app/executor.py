@@ -0,0 +1,20 @@
+# Executor dedicado ao scoring (CPU) fora do event loop
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+# Tamanho fixo do pool: limita quantos scorings rodam em paralelo
+SCORING_WORKERS = int(os.getenv('SCORING_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+scoring_executor = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix='scoring')
+
+
+async def run_scoring(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Executa uma função de scoring no pool dedicado sem bloquear o event loop
+    (as operações NumPy liberam o GIL durante o cálculo)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(scoring_executor, partial(func, *args, **kwargs))
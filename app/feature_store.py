@@ -0,0 +1,133 @@
+# Materialização das features de criadores independentes de campanha
+from typing import Any, Optional, Tuple
+from sqlalchemy import bindparam, event, inspect, or_, select, update
+from sqlalchemy.engine import Connection, Engine
+from .catalog_version import catalog_version
+from .features import FEATURE_VERSION, performance_feature, reliability_feature
+from .models import Creator, CreatorDealStats
+
+BATCH_SIZE = 1000
+
+# Atributos de Creator dos quais as features dependem
+FEATURE_INPUTS = ('avg_views', 'ctr', 'cvr', 'reliability_score')
+
+stats_table = CreatorDealStats.__table__
+
+
+def deal_history(stats: Optional[Any]) -> Tuple[int, int, Optional[float]]:
+    """(deals, entregas no prazo, média decaída) de uma linha de creator_deal_stats (ou None)"""
+    if stats is None or not stats.deal_count:
+        return 0, 0, None
+    mean = stats.decayed_sum / stats.decayed_weight if stats.decayed_weight else 0.0
+    return stats.deal_count, stats.on_time_count, mean
+
+
+def _deal_stats(connection: Connection, creator_id: Optional[int]) -> Optional[Any]:
+    if creator_id is None:
+        return None
+    return connection.execute(
+        select(stats_table.c.deal_count, stats_table.c.on_time_count,
+               stats_table.c.decayed_sum, stats_table.c.decayed_weight)
+        .where(stats_table.c.creator_id == creator_id)
+    ).first()
+
+
+def materialize_features(creator: Creator, stats: Optional[Any] = None):
+    """Grava no objeto as features calculadas com as constantes atuais (e o histórico de deals)"""
+    creator.performance_feature = performance_feature(creator.avg_views, creator.ctr, creator.cvr)
+    creator.reliability_feature = reliability_feature(creator.reliability_score, *deal_history(stats))
+    creator.feature_version = FEATURE_VERSION
+
+
+@event.listens_for(Creator, 'before_insert')
+def _creator_inserted(mapper, connection, target):
+    materialize_features(target)
+
+
+@event.listens_for(Creator, 'before_update')
+def _creator_updated(mapper, connection, target):
+    state = inspect(target)
+    if target.feature_version != FEATURE_VERSION or any(
+        state.attrs[name].history.has_changes() for name in FEATURE_INPUTS
+    ):
+        materialize_features(target, _deal_stats(connection, target.id))
+
+
+def refresh_reliability_feature(connection: Connection, creator_id: int):
+    """
+    Regrava a confiabilidade materializada de um criador após mudança no seu
+    histórico de deals (atualiza updated_at para o snapshot reler a linha)
+    """
+    table = Creator.__table__
+    creator = connection.execute(
+        select(table.c.reliability_score).where(table.c.id == creator_id)
+    ).first()
+    if creator is None:
+        return
+    connection.execute(
+        update(table)
+        .where(table.c.id == creator_id, table.c.feature_version == FEATURE_VERSION)
+        .values(reliability_feature=reliability_feature(
+            creator.reliability_score, *deal_history(_deal_stats(connection, creator_id))
+        ))
+    )
+
+
+def recompute_features(engine: Engine, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Recalcula em lote as features das linhas gravadas com outra versão
+    (constantes de normalização alteradas, bancos migrados ou updates em
+    massa que zeraram feature_version). Atualiza updated_at para que os
+    snapshots em memória releiam as linhas. Retorna o número de linhas.
+    """
+    if not inspect(engine).has_table('creators'):
+        return 0
+
+    table = Creator.__table__
+    stale = or_(table.c.feature_version.is_(None), table.c.feature_version != FEATURE_VERSION)
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam('_id'))
+        .values(
+            performance_feature=bindparam('_performance'),
+            reliability_feature=bindparam('_reliability'),
+            feature_version=FEATURE_VERSION
+        )
+    )
+
+    updated = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(table.c.id, table.c.avg_views, table.c.ctr, table.c.cvr, table.c.reliability_score,
+                       stats_table.c.deal_count, stats_table.c.on_time_count,
+                       stats_table.c.decayed_sum, stats_table.c.decayed_weight)
+                .outerjoin(stats_table, stats_table.c.creator_id == table.c.id)
+                .where(stale, table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).fetchall()
+            if not rows:
+                break
+
+            conn.execute(statement, [
+                {
+                    '_id': row.id,
+                    '_performance': performance_feature(row.avg_views, row.ctr, row.cvr),
+                    '_reliability': reliability_feature(row.reliability_score, *deal_history(row))
+                }
+                for row in rows
+            ])
+            updated += len(rows)
+            last_id = rows[-1].id
+
+    if updated:
+        catalog_version.bump()
+    return updated
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    print(f"Features ({FEATURE_VERSION}) recalculadas para {recompute_features(engine)} criadores")
@@ -0,0 +1,115 @@
+# Features pré-computadas dos criadores
+import math
+from typing import Any, List, Optional, Tuple
+
+# Idades acima de AGE_MAX (ou abaixo de 0) são agrupadas nas extremidades
+AGE_MAX = 100
+
+# Constantes de normalização da performance (valores típicos do mercado)
+VIEWS_MIDPOINT = 100000  # 100k views = 0.5
+CTR_MIDPOINT = 0.03  # 3% CTR = 0.5
+CVR_MIDPOINT = 0.02  # 2% CVR = 0.5
+
+# Histórico de deals na confiabilidade
+DEAL_DECAY = 0.9  # Peso de cada deal decai por este fator a cada deal mais recente
+DEAL_PRIOR_WEIGHT = 5  # Com 5 deals o histórico pesa metade (o score estático, a outra metade)
+
+# Versão das features materializadas: muda junto com as constantes acima,
+# marcando as linhas gravadas com valores antigos para o recálculo em lote
+FEATURE_VERSION = f"v2:{VIEWS_MIDPOINT}:{CTR_MIDPOINT}:{CVR_MIDPOINT}:{DEAL_DECAY}:{DEAL_PRIOR_WEIGHT}"
+
+
+def build_age_cdf(ages: Optional[List[int]]) -> Optional[List[int]]:
+    """
+    Converte a lista bruta de idades da audiência em distribuição acumulada
+    de tamanho fixo: cdf[a] = número de pessoas com idade <= a
+    """
+    if not ages:
+        return None
+
+    counts = [0] * (AGE_MAX + 1)
+    for age in ages:
+        counts[min(max(int(age), 0), AGE_MAX)] += 1
+
+    cdf = []
+    total = 0
+    for count in counts:
+        total += count
+        cdf.append(total)
+    return cdf
+
+
+def ages_from_cdf(cdf: Optional[List[int]]) -> List[int]:
+    """Reconstrói as idades (ordenadas) a partir da distribuição acumulada"""
+    ages = []
+    previous = 0
+    for age, total in enumerate(cdf or []):
+        ages.extend([age] * (total - previous))
+        previous = total
+    return ages
+
+
+def count_ages_le(cdf: List[int], age: int) -> int:
+    """Número de pessoas com idade <= age (consulta O(1))"""
+    if age < 0:
+        return 0
+    return cdf[min(age, AGE_MAX)]
+
+
+def age_overlap_fraction(cdf: Optional[List[int]], age_min: int, age_max: int) -> float:
+    """Fração da audiência com idade em [age_min, age_max] via soma de prefixos"""
+    if not cdf or not cdf[-1]:
+        return 0.0
+    overlap = count_ages_le(cdf, age_max) - count_ages_le(cdf, age_min - 1)
+    return max(overlap, 0) / cdf[-1]
+
+
+def sigmoid(value: float, midpoint: float) -> float:
+    """Função sigmoid para normalização suave"""
+    return 1 / (1 + math.exp(-(value - midpoint) / (midpoint * 0.5)))
+
+
+def performance_feature(avg_views: Optional[float], ctr: Optional[float], cvr: Optional[float]) -> float:
+    """
+    Score de performance histórica (independe da campanha)
+    Média ponderada de views, CTR e CVR normalizados por sigmoid
+    """
+    return (
+        sigmoid(avg_views or 0, VIEWS_MIDPOINT) * 0.4 +
+        sigmoid(ctr or 0.0, CTR_MIDPOINT) * 0.3 +
+        sigmoid(cvr or 0.0, CVR_MIDPOINT) * 0.3
+    )
+
+
+def reliability_feature(reliability_score: Optional[float], deal_count: int = 0,
+                        on_time_count: int = 0, decayed_performance: Optional[float] = None) -> float:
+    """
+    Score de confiabilidade (independe da campanha)
+
+    Sem deals é o reliability_score estático. Com histórico, mistura-o com a
+    taxa de entrega no prazo e a média decaída de performance dos deals,
+    dando ao histórico o peso deal_count / (deal_count + DEAL_PRIOR_WEIGHT).
+    """
+    static = reliability_score or 0.0
+    if not deal_count:
+        return static
+
+    history = 0.5 * on_time_count / deal_count + 0.5 * (decayed_performance or 0.0)
+    weight = deal_count / (deal_count + DEAL_PRIOR_WEIGHT)
+    return (1 - weight) * static + weight * history
+
+
+def creator_features(creator: Any) -> Tuple[float, float]:
+    """
+    Features (performance, confiabilidade) de um criador ou linha equivalente
+
+    Lê os valores materializados quando foram gravados com a versão atual;
+    caso contrário (linha ainda não recalculada) calcula na hora, sem o
+    histórico de deals, até o recálculo em lote.
+    """
+    if getattr(creator, 'feature_version', None) == FEATURE_VERSION:
+        return creator.performance_feature, creator.reliability_feature
+    return (
+        performance_feature(creator.avg_views, creator.ctr, creator.cvr),
+        reliability_feature(creator.reliability_score)
+    )
@@ -1,12 +1,33 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from .routers import recommendations
-from .database import init_db
+from .database import init_db, SessionLocal
+from .snapshot import catalog_store
+from .sharding import get_shard_scorer
+from .campaign_results import campaign_results
+from .metrics import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Constrói o snapshot do catálogo na inicialização e o mantém atualizado"""
+    store = catalog_store()
+    await run_in_threadpool(store.refresh_with, SessionLocal)
+    refresher = asyncio.create_task(store.run_periodic_refresh(SessionLocal))
+    # Top-k materializado das campanhas cadastradas
+    scheduler = asyncio.create_task(campaign_results.run_scheduler(SessionLocal))
+    yield
+    refresher.cancel()
+    scheduler.cancel()
+    get_shard_scorer().shutdown()
 
 app = FastAPI(
     title="Sistema de Recomendação de Criadores",
     description="API para recomendar criadores para campanhas",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -18,6 +39,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latência por requisição (mais externo: inclui serialização e CORS)
+app.add_middleware(MetricsMiddleware)
+
 # Initialize database
 init_db()
 
@@ -31,4 +55,9 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Histogramas de latência e contadores no formato de texto do Prometheus"""
+    return Response(content=metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,172 @@
+# Métricas em processo: spans de latência por estágio, histogramas e contadores
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Desliga a coleta (spans viram no-op) com METRICS_ENABLED=false
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() not in ('false', '0', 'no')
+
+# Limites superiores (segundos) dos buckets de latência
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Histograma de buckets fixos (contagens não acumuladas; acumuladas na exportação)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Registro de contadores e histogramas com rótulos
+
+    Cada observação custa um lock e algumas operações aritméticas, então os
+    spans podem ficar sempre ligados. render() exporta no formato de texto
+    do Prometheus (endpoint /metrics).
+    """
+
+    def __init__(self, prefix: str = 'reco', enabled: bool = METRICS_ENABLED):
+        self.prefix = prefix
+        self.enabled = enabled
+        self._descriptions: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, help_text: str):
+        """Declara uma métrica (counter ou histogram) e seu texto de ajuda"""
+        self._descriptions[name] = (kind, help_text)
+        store = self._counters if kind == 'counter' else self._histograms
+        store.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Mede a duração de um estágio do pipeline em stage_duration_seconds"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_duration_seconds', time.perf_counter() - start, stage=stage)
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters[name].get(tuple(sorted(labels.items())), 0)
+
+    def histogram(self, name: str, **labels: str) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms[name].get(tuple(sorted(labels.items())))
+
+    def reset(self):
+        """Zera todas as séries (mantém as descrições)"""
+        with self._lock:
+            for series in list(self._counters.values()) + list(self._histograms.values()):
+                series.clear()
+
+    @staticmethod
+    def _labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(key) + ([extra] if extra else [])
+        if not pairs:
+            return ''
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self) -> str:
+        """Exporta todas as séries no formato de texto do Prometheus"""
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help_text) in self._descriptions.items():
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                if kind == 'counter':
+                    for key, value in sorted(self._counters[name].items()):
+                        lines.append(f"{full_name}{self._labels(key)} {value:g}")
+                    continue
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{full_name}_bucket{self._labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                    lines.append(f"{full_name}_bucket{self._labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{full_name}_sum{self._labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{full_name}_count{self._labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+metrics.describe('requests_total', 'counter', 'Requisições de recomendação por endpoint')
+metrics.describe('creators_scored_total', 'counter', 'Criadores pontuados pelo engine')
+metrics.describe('cache_lookups_total', 'counter', 'Consultas ao cache de recomendações por resultado')
+metrics.describe('coalesced_requests_total', 'counter', 'Requisições atendidas pelo cálculo idêntico em andamento')
+metrics.describe('shed_requests_total', 'counter', 'Requisições recusadas com 503 (fila de cálculos cheia)')
+metrics.describe('background_errors_total', 'counter', 'Falhas das tarefas em background por tarefa')
+metrics.describe('stage_duration_seconds', 'histogram', 'Duração de cada estágio do pipeline')
+metrics.describe('http_request_duration_seconds', 'histogram', 'Duração das requisições HTTP por handler')
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede cada requisição HTTP (rotulada pelo handler da rota)"""
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = {'code': 500}
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            endpoint = scope.get('endpoint')
+            self.registry.observe(
+                'http_request_duration_seconds', time.perf_counter() - start,
+                handler=getattr(endpoint, '__name__', 'unmatched'), status=str(status['code'])
+            )
@@ -0,0 +1,212 @@
+# Migrações de esquema e dados aplicadas na inicialização do banco
+import json
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from .features import build_age_cdf
+
+BATCH_SIZE = 1000
+
+
+def _columns(engine: Engine, table: str) -> set:
+    return {column['name'] for column in inspect(engine).get_columns(table)}
+
+
+def migrate_audience_age_to_cdf(engine: Engine) -> int:
+    """
+    Converte a coluna legada creators.audience_age (lista bruta de idades)
+    em creators.audience_age_cdf (distribuição acumulada de tamanho fixo)
+
+    Processa em lotes, remove a coluna legada ao final e retorna o número
+    de linhas convertidas. É idempotente: bancos novos não fazem nada.
+    """
+    if not inspect(engine).has_table('creators'):
+        return 0
+
+    columns = _columns(engine, 'creators')
+    if 'audience_age_cdf' not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE creators ADD COLUMN audience_age_cdf JSON"))
+
+    if 'audience_age' not in columns:
+        return 0
+
+    converted = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT id, audience_age FROM creators "
+                     "WHERE id > :last_id AND audience_age IS NOT NULL "
+                     "ORDER BY id LIMIT :limit"),
+                {'last_id': last_id, 'limit': BATCH_SIZE}
+            ).fetchall()
+            if not rows:
+                break
+
+            conn.execute(
+                text("UPDATE creators SET audience_age_cdf = :cdf WHERE id = :id"),
+                [
+                    {'id': row.id, 'cdf': json.dumps(build_age_cdf(json.loads(row.audience_age)))}
+                    for row in rows
+                ]
+            )
+            converted += len(rows)
+            last_id = rows[-1].id
+
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE creators DROP COLUMN audience_age"))
+
+    return converted
+
+
+def migrate_creator_tags(engine: Engine) -> int:
+    """
+    Garante os índices da tabela creator_tags e a preenche a partir de
+    creators.tags quando ainda estiver vazia (bancos criados antes do índice
+    invertido). Retorna o número de associações inseridas.
+    """
+    if not inspect(engine).has_table('creator_tags'):
+        return 0
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_creator_tags_creator_id ON creator_tags (creator_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_creator_tags_tag ON creator_tags (tag)"))
+        if conn.execute(text("SELECT 1 FROM creator_tags LIMIT 1")).first():
+            return 0
+
+    inserted = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT id, tags FROM creators WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {'last_id': last_id, 'limit': BATCH_SIZE}
+            ).fetchall()
+            if not rows:
+                break
+
+            pairs = [
+                {'creator_id': row.id, 'tag': tag}
+                for row in rows
+                for tag in set(json.loads(row.tags) if row.tags else [])
+            ]
+            if pairs:
+                conn.execute(text("INSERT INTO creator_tags (creator_id, tag) VALUES (:creator_id, :tag)"), pairs)
+            inserted += len(pairs)
+            last_id = rows[-1].id
+
+    return inserted
+
+
+def migrate_creator_updated_at(engine: Engine) -> bool:
+    """
+    Adiciona creators.updated_at (watermark do snapshot em memória),
+    preenchendo com created_at. Retorna True se a coluna foi criada.
+    """
+    if not inspect(engine).has_table('creators') or 'updated_at' in _columns(engine, 'creators'):
+        return False
+
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE creators ADD COLUMN updated_at DATETIME"))
+        conn.execute(text("UPDATE creators SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_creators_updated_at ON creators (updated_at)"))
+    return True
+
+
+def migrate_creator_features(engine: Engine) -> bool:
+    """
+    Adiciona as colunas das features materializadas (performance_feature,
+    reliability_feature e feature_version). As linhas ficam sem versão e são
+    preenchidas pelo recálculo em lote (feature_store.recompute_features).
+    Retorna True se as colunas foram criadas.
+    """
+    if not inspect(engine).has_table('creators') or 'feature_version' in _columns(engine, 'creators'):
+        return False
+
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE creators ADD COLUMN performance_feature FLOAT"))
+        conn.execute(text("ALTER TABLE creators ADD COLUMN reliability_feature FLOAT"))
+        conn.execute(text("ALTER TABLE creators ADD COLUMN feature_version VARCHAR(64)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_creators_feature_version ON creators (feature_version)"))
+    return True
+
+
+def migrate_candidate_indexes(engine: Engine) -> int:
+    """
+    Índices usados pela geração de candidatos: B-tree em price_min/price_max
+    e tabela creator_countries (preenchida a partir de creators.audience_location
+    quando ainda estiver vazia). Retorna o número de associações inseridas.
+    """
+    if not inspect(engine).has_table('creators') or not inspect(engine).has_table('creator_countries'):
+        return 0
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_creators_price_min ON creators (price_min)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_creators_price_max ON creators (price_max)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_creator_countries_creator_id ON creator_countries (creator_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_creator_countries_country ON creator_countries (country)"))
+        if conn.execute(text("SELECT 1 FROM creator_countries LIMIT 1")).first():
+            return 0
+
+    inserted = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT id, audience_location FROM creators WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {'last_id': last_id, 'limit': BATCH_SIZE}
+            ).fetchall()
+            if not rows:
+                break
+
+            pairs = [
+                {'creator_id': row.id, 'country': country}
+                for row in rows
+                for country in set(json.loads(row.audience_location) if row.audience_location else [])
+            ]
+            if pairs:
+                conn.execute(
+                    text("INSERT INTO creator_countries (creator_id, country) VALUES (:creator_id, :country)"),
+                    pairs
+                )
+            inserted += len(pairs)
+            last_id = rows[-1].id
+
+    return inserted
+
+
+def migrate_deal_stats_index(engine: Engine) -> bool:
+    """
+    Índice em past_deals.creator_id, usado ao recalcular os agregados de um
+    criador (creator_deal_stats é criada pelo create_all e preenchida por
+    deal_stats.backfill_deal_stats). Retorna True se o índice foi criado.
+    """
+    if not inspect(engine).has_table('past_deals'):
+        return False
+    if any(index['name'] == 'ix_past_deals_creator_id' for index in inspect(engine).get_indexes('past_deals')):
+        return False
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX ix_past_deals_creator_id ON past_deals (creator_id)"))
+    return True
+
+
+def run_migrations(engine: Engine):
+    """Executa todas as migrações pendentes"""
+    migrate_audience_age_to_cdf(engine)
+    migrate_creator_tags(engine)
+    migrate_creator_updated_at(engine)
+    migrate_creator_features(engine)
+    migrate_candidate_indexes(engine)
+    migrate_deal_stats_index(engine)
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    print(f"Convertidas {migrate_audience_age_to_cdf(engine)} linhas de audience_age")
+    print(f"Inseridas {migrate_creator_tags(engine)} associações em creator_tags")
+    print(f"Coluna updated_at criada: {migrate_creator_updated_at(engine)}")
+    print(f"Colunas de features criadas: {migrate_creator_features(engine)}")
+    print(f"Inseridas {migrate_candidate_indexes(engine)} associações em creator_countries")
+    print(f"Índice de deals por criador criado: {migrate_deal_stats_index(engine)}")
@@ -5,6 +5,7 @@ from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import List, Optional
 import json
+from .features import build_age_cdf, ages_from_cdf
 
 Base = declarative_base()
 
@@ -12,8 +13,16 @@ Base = declarative_base()
 creator_tags = Table(
     'creator_tags',
     Base.metadata,
-    Column('creator_id', Integer, ForeignKey('creators.id')),
-    Column('tag', String(50))
+    Column('creator_id', Integer, ForeignKey('creators.id'), index=True),
+    Column('tag', String(50), index=True)  # Índice invertido tag → criadores
+)
+
+# Países da audiência de cada criador (normalizado para filtros por país)
+creator_countries = Table(
+    'creator_countries',
+    Base.metadata,
+    Column('creator_id', Integer, ForeignKey('creators.id'), index=True),
+    Column('country', String(10), index=True)
 )
 
 # Tabela de associação para tags de campanhas
@@ -30,19 +39,33 @@ class Creator(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     tags = Column(JSON)  # Lista de tags como JSON
-    audience_age = Column(JSON)  # Lista de idades como JSON [18, 25, 30, ...]
+    audience_age_cdf = Column(JSON)  # Distribuição acumulada de idades: cdf[a] = nº de pessoas com idade <= a
     audience_location = Column(JSON)  # Lista de países como JSON ["BR", "US", ...]
     avg_views = Column(Integer, default=0)
     ctr = Column(Float, default=0.0)  # Click Through Rate
     cvr = Column(Float, default=0.0)  # Conversion Rate
-    price_min = Column(Integer, default=0)  # Preço mínimo em centavos
-    price_max = Column(Integer, default=0)  # Preço máximo em centavos
+    price_min = Column(Integer, default=0, index=True)  # Preço mínimo em centavos
+    price_max = Column(Integer, default=0, index=True)  # Preço máximo em centavos
     reliability_score = Column(Float, default=0.0)  # Score de confiabilidade (0-1)
+    performance_feature = Column(Float)  # Score de performance materializado (ver features.py)
+    reliability_feature = Column(Float)  # Score de confiabilidade materializado
+    feature_version = Column(String(64), index=True)  # Versão das constantes usadas nas features
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # Watermark do snapshot
     
     # Relacionamentos
     deals = relationship("PastDeal", back_populates="creator")
 
+    @property
+    def audience_age(self) -> List[int]:
+        """Idades da audiência reconstruídas a partir da distribuição acumulada"""
+        return ages_from_cdf(self.audience_age_cdf)
+
+    @audience_age.setter
+    def audience_age(self, ages: Optional[List[int]]):
+        """Aceita a lista bruta de idades e armazena apenas a distribuição acumulada"""
+        self.audience_age_cdf = build_age_cdf(ages)
+
 class Campaign(Base):
     __tablename__ = "campaigns"
     
@@ -62,7 +85,7 @@ class PastDeal(Base):
     __tablename__ = "past_deals"
     
     id = Column(Integer, primary_key=True, index=True)
-    creator_id = Column(Integer, ForeignKey("creators.id"))
+    creator_id = Column(Integer, ForeignKey("creators.id"), index=True)
     campaign_id = Column(Integer, ForeignKey("campaigns.id"))
     delivered_on_time = Column(Boolean, default=True)
     performance_score = Column(Float, default=0.0)  # Score de performance (0-1)
@@ -70,4 +93,24 @@ class PastDeal(Base):
     
     # Relacionamentos
     creator = relationship("Creator", back_populates="deals")
-    campaign = relationship("Campaign", back_populates="deals")
\ No newline at end of file
+    campaign = relationship("Campaign", back_populates="deals")
+
+class CreatorDealStats(Base):
+    """Agregados do histórico de deals por criador (mantidos a cada deal, ver deal_stats.py)"""
+    __tablename__ = "creator_deal_stats"
+    
+    creator_id = Column(Integer, ForeignKey("creators.id"), primary_key=True)
+    deal_count = Column(Integer, nullable=False, default=0)
+    on_time_count = Column(Integer, nullable=False, default=0)
+    decayed_sum = Column(Float, nullable=False, default=0.0)  # Σ performance_score * DEAL_DECAY^(deals mais novos)
+    decayed_weight = Column(Float, nullable=False, default=0.0)  # Σ DEAL_DECAY^(deals mais novos)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def on_time_rate(self) -> float:
+        return self.on_time_count / self.deal_count if self.deal_count else 0.0
+
+    @property
+    def decayed_performance(self) -> float:
+        """Média de performance com peso maior para os deals mais recentes"""
+        return self.decayed_sum / self.decayed_weight if self.decayed_weight else 0.0
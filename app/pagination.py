@@ -0,0 +1,134 @@
+# Paginação por cursor sobre o ranking completo de uma campanha
+import base64
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+# Memória máxima dos rankings guardados (em MB) e validade de cada um
+RANKING_CACHE_MB = float(os.getenv('RANKING_CACHE_MB', '64'))
+RANKING_TTL = float(os.getenv('RANKING_TTL', '600'))
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado"""
+
+
+class RankingHandle:
+    """
+    Ranking completo de uma campanha em arrays compactos: linhas do catálogo
+    (na versão em que foi calculado) e scores totais, em ordem decrescente.
+    O tamanho da página fica no handle (validado na primeira requisição),
+    não no cursor.
+    """
+
+    def __init__(self, campaign_data: Dict[str, Any], rows: np.ndarray, scores: np.ndarray,
+                 version: int, total_creators: int, creators_scored: int, page_size: int):
+        self.campaign_data = campaign_data
+        self.rows = rows.astype(np.int32)
+        self.scores = scores.astype(np.float32)
+        self.version = version
+        self.total_creators = total_creators
+        self.creators_scored = creators_scored
+        self.page_size = page_size
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.scores.nbytes
+
+    def page(self, offset: int) -> np.ndarray:
+        """Linhas de uma página: fatia O(page_size) do array"""
+        return self.rows[offset:offset + self.page_size]
+
+
+class RankingCache:
+    """
+    Rankings por id de handle, LRU limitado pela memória dos arrays
+
+    Como no cache de recomendações, um handle lido com outra versão do
+    catálogo ou com outro tamanho de catálogo (as linhas apontam para o
+    catálogo antigo) é descartado.
+    """
+
+    def __init__(self, max_bytes: int = int(RANKING_CACHE_MB * 1024 * 1024),
+                 ttl_seconds: float = RANKING_TTL):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, RankingHandle]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.invalidations = 0
+
+    def put(self, handle: RankingHandle) -> Optional[str]:
+        """Guarda o handle e retorna seu id (None se não cabe no cache)"""
+        if handle.nbytes > self.max_bytes:
+            return None
+        handle_id = secrets.token_urlsafe(12)
+        with self._lock:
+            self._entries[handle_id] = (time.monotonic(), handle)
+            self._bytes += handle.nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+        return handle_id
+
+    def get(self, handle_id: str, version: int, catalog_size: int) -> Optional[RankingHandle]:
+        """Handle ainda válido para o catálogo atual (versão e tamanho), ou None"""
+        with self._lock:
+            entry = self._entries.get(handle_id)
+            if entry is None:
+                return None
+            stored_at, handle = entry
+            expired = time.monotonic() - stored_at > self.ttl_seconds
+            if expired or handle.version != version or handle.total_creators != catalog_size:
+                del self._entries[handle_id]
+                self._bytes -= handle.nbytes
+                if not expired:
+                    self.invalidations += 1
+                return None
+            self._entries.move_to_end(handle_id)
+            return handle
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+def encode_cursor(handle_id: str, offset: int) -> str:
+    """Cursor opaco para a próxima página"""
+    return base64.urlsafe_b64encode(f"{handle_id}:{offset}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """(handle_id, offset) de um cursor; InvalidCursor se malformado"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        handle_id, offset = raw.split(':')
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(str(e))
+    if offset < 0:
+        raise InvalidCursor(cursor)
+    return handle_id, offset
+
+
+ranking_cache = RankingCache()
@@ -0,0 +1,309 @@
+# Seleção de portfólio de criadores sob orçamento (mochila 0-1 com limites por tag)
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Tempo máximo da fase de melhoria (trocas) após o guloso, em ms
+PORTFOLIO_TIME_BUDGET_MS = float(os.getenv('PORTFOLIO_TIME_BUDGET_MS', '50'))
+
+# Melhores candidatos por score (fora do portfólio) considerados nas trocas
+PORTFOLIO_SWAP_POOL = int(os.getenv('PORTFOLIO_SWAP_POOL', '1000'))
+
+
+# Itens convertidos para listas Python por vez na passada gulosa com limites por tag
+FILL_CHUNK = 256
+
+# Tamanho inicial do trecho ordenado por score por centavo (o resto só é ordenado se o orçamento sobrar)
+DENSITY_HEAD = 4096
+
+
+def density_order(values: np.ndarray, prices: np.ndarray,
+                  eligible: Optional[Callable[[], np.ndarray]] = None,
+                  head: int = DENSITY_HEAD) -> Iterator[np.ndarray]:
+    """
+    Posições em ordem decrescente de score por centavo, em trechos que
+    crescem 4x por seleção parcial: quem consome só o começo da ordem não
+    paga a ordenação completa. eligible() (máscara) filtra o restante antes
+    de cada trecho.
+    """
+    density = values / np.maximum(prices, 1)
+    remaining = np.arange(len(values))
+    size = head
+    while len(remaining):
+        if eligible is not None:
+            remaining = remaining[eligible()[remaining]]
+        if len(remaining) <= size:
+            yield remaining[np.lexsort((remaining, -density[remaining]))]
+            return
+        split = np.argpartition(-density[remaining], size - 1)
+        top, remaining = remaining[split[:size]], remaining[split[size:]]
+        yield top[np.lexsort((top, -density[top]))]
+        size *= 4
+
+
+def fractional_bound(values: np.ndarray, prices: np.ndarray, budget: int) -> float:
+    """
+    Limite superior do score total (relaxação linear da mochila, sem os
+    limites por tag): ótimo fracionário por score por centavo
+    """
+    bound, left = 0.0, budget
+    for segment in density_order(values, prices):
+        spent = np.cumsum(prices[segment])
+        whole = int(np.searchsorted(spent, left, side='right'))
+        bound += float(values[segment[:whole]].sum())
+        if whole < len(segment):
+            left -= int(spent[whole - 1]) if whole else 0
+            return bound + float(values[segment[whole]]) * left / max(int(prices[segment[whole]]), 1)
+        left -= int(spent[-1])
+    return bound
+
+
+def top_positions(values: np.ndarray, k: int) -> np.ndarray:
+    """As k posições de maior valor, em ordem decrescente (empates pela posição)"""
+    if k < len(values):
+        top = np.argpartition(-values, k - 1)[:k]
+        return top[np.lexsort((top, -values[top]))]
+    return np.argsort(-values, kind='stable')
+
+
+class TagCaps:
+    """Limite de criadores por tag: por tag explícita ou um padrão para todas"""
+
+    def __init__(self, caps: Optional[Dict[str, int]] = None, default: Optional[int] = None):
+        self.caps = caps or {}
+        self.default = default
+
+    def __bool__(self) -> bool:
+        return bool(self.caps) or self.default is not None
+
+    def limit(self, tag: str) -> Optional[int]:
+        return self.caps.get(tag, self.default)
+
+
+class PortfolioSolver:
+    """
+    Maximiza a soma dos scores dos criadores escolhidos com a soma dos
+    price_min dentro do orçamento e no máximo N criadores por tag
+
+    1. Guloso por score por centavo, pulando quem não cabe ou estouraria um
+       limite de tag (tags saturadas bloqueiam seus criadores em lote)
+    2. Melhoria: troca um escolhido por um candidato de score maior que caiba
+       na folga, depois completa o orçamento restante; repete até não haver
+       ganho ou o tempo da fase acabar
+    3. Compara com o melhor criador isolado (garante ao menos metade do ótimo)
+
+    Posições se referem aos arrays values/prices; tags_of(posição) devolve as
+    tags do criador e positions_with(tag) as posições que a possuem.
+    """
+
+    def __init__(self, values: np.ndarray, prices: np.ndarray, budget: int,
+                 caps: Optional[TagCaps] = None,
+                 tags_of: Optional[Callable[[int], Sequence[str]]] = None,
+                 positions_with: Optional[Callable[[str], np.ndarray]] = None,
+                 time_budget_ms: float = PORTFOLIO_TIME_BUDGET_MS,
+                 swap_pool: int = PORTFOLIO_SWAP_POOL):
+        self.values = values
+        self.prices = prices
+        self.budget = budget
+        self.caps = caps or TagCaps()
+        self.tags_of = tags_of
+        self.positions_with = positions_with
+        self.time_budget = time_budget_ms / 1000
+        self.swap_pool = swap_pool
+        self._tags: Dict[int, Sequence[str]] = {}
+        self.swaps = 0
+        self.upper_bound = 0.0
+        self.blocked = np.zeros(len(values), dtype=bool)
+
+    def item_tags(self, position: int) -> Sequence[str]:
+        tags = self._tags.get(position)
+        if tags is None:
+            tags = self._tags[position] = [t for t in self.tags_of(position) if self.caps.limit(t) is not None]
+        return tags
+
+    def fits_caps(self, position: int, counts: Dict[str, int], removing: Optional[int] = None) -> bool:
+        """Adicionar position (retirando removing) respeita os limites por tag?"""
+        if not self.caps:
+            return True
+        freed = self.item_tags(removing) if removing is not None else ()
+        for tag in self.item_tags(position):
+            if counts.get(tag, 0) - (tag in freed) + 1 > self.caps.limit(tag):
+                return False
+        return True
+
+    def _blocked(self, counts: Dict[str, int]) -> np.ndarray:
+        """Posições bloqueadas por alguma tag já no limite (ou com limite 0)"""
+        blocked = np.zeros(len(self.values), dtype=bool)
+        if self.caps and self.positions_with is not None:
+            for tag in set(self.caps.caps) | set(counts):
+                if counts.get(tag, 0) >= self.caps.limit(tag):
+                    blocked[self.positions_with(tag)] = True
+        return blocked
+
+    def _add(self, position: int, counts: Dict[str, int], blocked: np.ndarray) -> bool:
+        """Conta as tags do escolhido; True se alguma tag atingiu o limite"""
+        saturated = False
+        for tag in (self.item_tags(position) if self.caps else ()):
+            counts[tag] = counts.get(tag, 0) + 1
+            if counts[tag] >= self.caps.limit(tag):
+                blocked[self.positions_with(tag)] = True
+                saturated = True
+        return saturated
+
+    def _fill(self, order: np.ndarray, selected: np.ndarray, spent: int, counts: Dict[str, int]) -> int:
+        """
+        Passada gulosa na ordem dada adicionando quem cabe; retorna o gasto.
+        Sem limites por tag, cada rodada aceita em lote o maior prefixo que
+        cabe (soma acumulada) e descarta o primeiro que não coube; com limites,
+        aceita um a um até uma tag saturar e então refiltra os bloqueados.
+        """
+        prices = self.prices
+        blocked = self.blocked = self._blocked(counts)
+        while len(order):
+            left = self.budget - spent
+            order = order[(prices[order] <= left) & ~selected[order] & ~blocked[order]]
+            if not len(order):
+                break
+            if not self.caps:
+                spent_prefix = np.cumsum(prices[order])
+                taken = int(np.searchsorted(spent_prefix, left, side='right'))
+                selected[order[:taken]] = True
+                spent += int(spent_prefix[taken - 1]) if taken else 0
+                order = order[taken + 1:]
+                continue
+            saturated = False
+            for start in range(0, len(order), FILL_CHUNK):
+                window = order[start:start + FILL_CHUNK]
+                for index, (position, price) in enumerate(zip(window.tolist(), prices[window].tolist())):
+                    if price > self.budget - spent:
+                        continue
+                    selected[position] = True
+                    spent += price
+                    if self._add(position, counts, blocked):
+                        order = order[start + index + 1:]
+                        saturated = True
+                        break
+                if saturated:
+                    break
+            if not saturated:
+                break
+        return spent
+
+    def _swap_candidate(self, out: int, slack: int, pool: np.ndarray, pool_keys: np.ndarray,
+                        selected: np.ndarray, counts: Dict[str, int]) -> Optional[int]:
+        """
+        Melhor candidato do pool (ordenado por score, pool_keys = -score) que
+        substitui out com ganho
+        """
+        better = int(np.searchsorted(pool_keys, -self.values[out], side='left'))
+        head = pool[:better]
+        fitting = head[(self.prices[head] <= slack) & ~selected[head]]
+        if not self.caps:
+            return int(fitting[0]) if len(fitting) else None
+        # Tags no limite que continuam no limite sem out: o candidato não pode tê-las
+        saturated = {tag for tag in set(self.caps.caps) | set(counts) if counts.get(tag, 0) >= self.caps.limit(tag)}
+        forbidden = saturated.difference(self.item_tags(out))
+        for candidate in fitting.tolist():
+            if forbidden.isdisjoint(self.item_tags(candidate)):
+                return candidate
+        return None
+
+    def solve(self) -> List[int]:
+        """Posições escolhidas, em ordem decrescente de score"""
+        started = time.perf_counter()
+        values, prices = self.values, self.prices
+        selected = np.zeros(len(values), dtype=bool)
+        counts: Dict[str, int] = {}
+
+        # Ordem por score por centavo em trechos; os seguintes só com orçamento
+        # sobrando e já sem escolhidos, bloqueados ou caros demais
+        cheapest = int(prices.min()) if len(prices) else 0
+        eligible = lambda: ~selected & ~self.blocked & (prices <= self.budget - spent)
+        segments: List[np.ndarray] = []
+        spent = 0
+        for segment in density_order(values, prices, eligible):
+            segments.append(segment)
+            spent = self._fill(segment, selected, spent, counts)
+            if self.budget - spent < cheapest:
+                break
+        self.upper_bound = fractional_bound(values, prices, self.budget)
+
+        # Melhoria: troca 1-por-1 com os melhores candidatos por score
+        chosen = np.flatnonzero(selected)
+        pool = top_positions(values, self.swap_pool + len(chosen))
+        pool_keys = -values[pool]
+        improved = True
+        while improved and time.perf_counter() - started < self.time_budget:
+            improved = False
+            for out in chosen[np.argsort(values[chosen], kind='stable')].tolist():
+                if time.perf_counter() - started >= self.time_budget:
+                    break
+                candidate = self._swap_candidate(out, self.budget - spent + int(prices[out]),
+                                                 pool, pool_keys, selected, counts)
+                if candidate is None:
+                    continue
+                selected[out], selected[candidate] = False, True
+                spent += int(prices[candidate]) - int(prices[out])
+                for tag in (self.item_tags(out) if self.caps else ()):
+                    counts[tag] -= 1
+                for tag in (self.item_tags(candidate) if self.caps else ()):
+                    counts[tag] = counts.get(tag, 0) + 1
+                self.swaps += 1
+                improved = True
+            if improved:
+                for segment in segments:
+                    spent = self._fill(segment, selected, spent, counts)
+                chosen = np.flatnonzero(selected)
+
+        # Melhor criador isolado que caiba (o guloso sozinho pode ficar longe do ótimo)
+        chosen = np.flatnonzero(selected)
+        affordable = np.flatnonzero(prices <= self.budget)
+        if len(affordable):
+            best = int(affordable[np.argmax(values[affordable])])
+            if values[best] > values[chosen].sum() and self.fits_caps(best, {}):
+                chosen = np.array([best])
+
+        return chosen[np.lexsort((chosen, -values[chosen]))].tolist()
+
+
+def exact_portfolio(values: Sequence[float], prices: Sequence[int], budget: int,
+                    tags: Optional[Sequence[Sequence[str]]] = None,
+                    caps: Optional[TagCaps] = None) -> Tuple[float, List[int]]:
+    """
+    Ótimo exato por branch and bound (para instâncias pequenas: referência
+    de qualidade do PortfolioSolver nos testes e benchmarks)
+    """
+    caps = caps or TagCaps()
+    tags = tags or [()] * len(values)
+    order = sorted(range(len(values)), key=lambda i: -values[i] / max(prices[i], 1))
+    best = [0.0, []]
+
+    def bound(index: int, value: float, left: int) -> float:
+        for i in order[index:]:
+            if prices[i] <= left:
+                value += values[i]
+                left -= prices[i]
+            else:
+                return value + values[i] * left / max(prices[i], 1)
+        return value
+
+    def search(index: int, value: float, left: int, chosen: List[int], counts: Dict[str, int]):
+        if value > best[0]:
+            best[0], best[1] = value, list(chosen)
+        if index == len(order) or bound(index, value, left) <= best[0]:
+            return
+        i = order[index]
+        limited = [t for t in tags[i] if caps.limit(t) is not None]
+        if prices[i] <= left and all(counts.get(t, 0) < caps.limit(t) for t in limited):
+            for t in limited:
+                counts[t] = counts.get(t, 0) + 1
+            chosen.append(i)
+            search(index + 1, value + values[i], left - prices[i], chosen, counts)
+            chosen.pop()
+            for t in limited:
+                counts[t] -= 1
+        search(index + 1, value, left, chosen, counts)
+
+    search(0, 0.0, budget, [], {})
+    return best[0], sorted(best[1])
@@ -1,11 +1,33 @@
 # Sistema de scoring e recomendação
-import math
-from typing import List, Dict, Any
+import heapq
+from collections import namedtuple
+from itertools import takewhile
+import os
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
+import numpy as np
 from sqlalchemy.orm import Session
 from .models import Creator, Campaign, PastDeal
 from .schemas import CreatorRecommendation, FitBreakdown, RecommendationMetadata
+from .catalog import CreatorCatalog, select_top_k
+from .features import age_overlap_fraction, creator_features
+from .candidates import active_filters, candidate_query, passes_filters
+from .diversity import mmr_rerank, pool_size
+from .metrics import metrics
+from .sharding import ShardedScorer, get_shard_scorer
+from .tag_index import tag_index
+from .weights import resolve_weights
+from .portfolio import PortfolioSolver, TagCaps
 import json
 
+# Campos de CreatorRecommendation, na ordem da resposta
+RECOMMENDATION_FIELDS = ('creator_id', 'score', 'fit_breakdown', 'why')
+
+# Referência mínima a um criador quando só o id é necessário
+CreatorRef = namedtuple('CreatorRef', ['id'])
+
+# Linhas pontuadas por vez ao ordenar o catálogo inteiro (limita os arrays temporários)
+RANKING_BLOCK_SIZE = 65536
+
 class RecommendationEngine:
     """
     Sistema de scoring determinístico para recomendação de criadores
@@ -26,8 +48,19 @@ class RecommendationEngine:
         'reliability': 0.05
     }
     
-    def __init__(self, db: Session):
+    # Com as_dicts as recomendações saem como dicts simples (mesma estrutura de
+    # CreatorRecommendation), prontos para a serialização rápida sem validação
+    as_dicts = False
+    
+    def __init__(self, db: Optional[Session], creators: Optional[List[Creator]] = None):
         self.db = db
+        self.creators = creators
+        self.creators_scored = 0
+        self._tag_queries: Dict[Tuple[str, ...], Tuple[int, int, Set[int]]] = {}
+    
+    def weights_for(self, campaign_data: Dict[str, Any]) -> Dict[str, float]:
+        """Pesos efetivos da campanha: da requisição, do objetivo ou WEIGHTS"""
+        return resolve_weights(campaign_data, self.WEIGHTS)
     
     def calculate_tags_score(self, creator_tags: List[str], required_tags: List[str]) -> float:
         """
@@ -48,7 +81,31 @@ class RecommendationEngine:
         
         return intersection / union
     
-    def calculate_audience_score(self, creator_age: List[int], creator_location: List[str],
+    def _tag_query(self, required_tags: List[str]) -> Tuple[int, int, Set[int]]:
+        """
+        Prepara (uma vez por conjunto de tags) a bitmask requerida, o número
+        de tags distintas e os criadores que compartilham ao menos uma delas
+        """
+        key = tuple(required_tags)
+        query = self._tag_queries.get(key)
+        if query is None:
+            required = set(required_tags)
+            query = (tag_index.mask(required), len(required), tag_index.creators_with_any(required))
+            self._tag_queries[key] = query
+        return query
+    
+    def calculate_creator_tags_score(self, creator: Creator, required_tags: List[str]) -> float:
+        """
+        Jaccard via bitmasks do TagIndex; criadores fora do índice invertido
+        das tags requeridas recebem 0 sem nenhum cálculo
+        """
+        required_mask, required_count, sharing = self._tag_query(required_tags)
+        if required_count and creator.id not in sharing:
+            return 0.0
+        return tag_index.jaccard(tag_index.creator_mask(creator.id, creator.tags),
+                                 required_mask, required_count)
+    
+    def calculate_audience_score(self, creator_age_cdf: List[int], creator_location: List[str],
                                target_country: str, target_age_range: List[int]) -> float:
         """
         Calcula score de sobreposição de audiência
@@ -59,27 +116,20 @@ class RecommendationEngine:
         
         # Score etário (50% do score de audiência)
         age_score = 0.0
-        if creator_age and target_age_range and len(target_age_range) >= 2:
+        if creator_age_cdf and target_age_range and len(target_age_range) >= 2:
             target_min, target_max = target_age_range[0], target_age_range[1]
             
-            # Calcula quantos % da audiência do criador estão na faixa alvo
-            overlap_count = sum(1 for age in creator_age if target_min <= age <= target_max)
-            age_score = overlap_count / len(creator_age) if creator_age else 0.0
+            # Calcula quantos % da audiência do criador estão na faixa alvo (soma de prefixos)
+            age_score = age_overlap_fraction(creator_age_cdf, target_min, target_max)
         
         return (geo_score + age_score) / 2
     
     def calculate_performance_score(self, creator: Creator) -> float:
         """
         Calcula score de performance histórica
-        Normaliza métricas usando função sigmoid para evitar outliers
+        Lê a feature materializada (sigmoid de views, CTR e CVR; ver features.py)
         """
-        # Normalização das métricas (usando valores típicos do mercado)
-        avg_views_norm = self._sigmoid(creator.avg_views, 100000)  # 100k views = 0.5
-        ctr_norm = self._sigmoid(creator.ctr, 0.03)  # 3% CTR = 0.5
-        cvr_norm = self._sigmoid(creator.cvr, 0.02)  # 2% CVR = 0.5
-        
-        # Média ponderada das métricas
-        return (avg_views_norm * 0.4 + ctr_norm * 0.3 + cvr_norm * 0.3)
+        return creator_features(creator)[0]
     
     def calculate_budget_score(self, creator_min: int, creator_max: int, budget: int) -> float:
         """
@@ -99,11 +149,7 @@ class RecommendationEngine:
         """
         Score de confiabilidade baseado no histórico de entregas
         """
-        return creator.reliability_score
-    
-    def _sigmoid(self, value: float, midpoint: float) -> float:
-        """Função sigmoid para normalização suave"""
-        return 1 / (1 + math.exp(-(value - midpoint) / (midpoint * 0.5)))
+        return creator_features(creator)[1]
     
     def score_creator(self, creator: Creator, campaign_data: Dict[str, Any]) -> Dict[str, float]:
         """
@@ -117,9 +163,9 @@ class RecommendationEngine:
         budget = campaign_data.get('budget_cents', 0)
         
         # Calcular scores individuais
-        tags_score = self.calculate_tags_score(creator.tags or [], required_tags)
+        tags_score = self.calculate_creator_tags_score(creator, required_tags)
         audience_score = self.calculate_audience_score(
-            creator.audience_age or [], 
+            creator.audience_age_cdf or [],
             creator.audience_location or [],
             target_country, 
             target_age_range
@@ -128,13 +174,14 @@ class RecommendationEngine:
         budget_score = self.calculate_budget_score(creator.price_min, creator.price_max, budget)
         reliability_score = self.calculate_reliability_score(creator)
         
-        # Score total ponderado
+        # Score total ponderado (perfil de pesos da campanha)
+        weights = self.weights_for(campaign_data)
         total_score = (
-            tags_score * self.WEIGHTS['tags'] +
-            audience_score * self.WEIGHTS['audience'] +
-            performance_score * self.WEIGHTS['performance'] +
-            budget_score * self.WEIGHTS['budget'] +
-            reliability_score * self.WEIGHTS['reliability']
+            tags_score * weights['tags'] +
+            audience_score * weights['audience'] +
+            performance_score * weights['performance'] +
+            budget_score * weights['budget'] +
+            reliability_score * weights['reliability']
         )
         
         return {
@@ -172,37 +219,512 @@ class RecommendationEngine:
         if scores['performance'] > 0.7:
             explanations.append(f"{creator.avg_views//1000}k views médias")
         
-        # Confiabilidade
-        reliability_pct = int(creator.reliability_score * 10)
+        # Confiabilidade (a mesma feature do score, misturada com o histórico de deals)
+        reliability_pct = int(scores['reliability'] * 10)
         explanations.append(f"{reliability_pct}/10 em confiabilidade")
         
         return "; ".join(explanations) if explanations else "Criador adequado para a campanha"
     
-    def get_recommendations(self, campaign_data: Dict[str, Any], top_k: int = 10) -> List[CreatorRecommendation]:
+    def recommendation_dict(self, creator: Any, scores: Dict[str, float], campaign_data: Dict[str, Any],
+                            fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
         """
-        Gera lista de recomendações ordenada por score
+        Recomendação como dict simples (estrutura de CreatorRecommendation),
+        opcionalmente só com os campos pedidos (a explicação só é gerada se incluída)
         """
-        # Buscar todos os criadores
-        creators = self.db.query(Creator).all()
+        fields = fields or RECOMMENDATION_FIELDS
+        recommendation = {}
+        if 'creator_id' in fields:
+            recommendation['creator_id'] = str(creator.id)
+        if 'score' in fields:
+            recommendation['score'] = round(scores['total'], 3)
+        if 'fit_breakdown' in fields:
+            recommendation['fit_breakdown'] = {
+                'tags': round(scores['tags'], 3),
+                'audience_overlap': round(scores['audience_overlap'], 3),
+                'performance': round(scores['performance'], 3),
+                'budget_fit': round(scores['budget_fit'], 3)
+            }
+        if 'why' in fields:
+            recommendation['why'] = self.generate_explanation(creator, scores, campaign_data)
+        return recommendation
+    
+    def build_recommendation(self, creator: Any, scores: Dict[str, float],
+                             campaign_data: Dict[str, Any]) -> CreatorRecommendation:
+        """
+        Monta o objeto de resposta (com explicação) de um criador selecionado
+        """
+        recommendation = self.recommendation_dict(creator, scores, campaign_data)
+        if self.as_dicts:
+            return recommendation
+        return CreatorRecommendation(
+            creator_id=recommendation['creator_id'],
+            score=recommendation['score'],
+            fit_breakdown=FitBreakdown(**recommendation['fit_breakdown']),
+            why=recommendation['why']
+        )
+    
+    def load_creators(self) -> List[Creator]:
+        """
+        Carrega todos os criadores (ou usa os já carregados pelo chamador)
+        garantindo que estejam no índice de tags
+        """
+        if self.creators is not None:
+            creators = self.creators
+        else:
+            with metrics.span('db_load'):
+                creators = self.db.query(Creator).all()
         
-        recommendations = []
+        if self.db is not None:
+            tag_index.ensure_loaded(self.db)
         for creator in creators:
-            scores = self.score_creator(creator, campaign_data)
-            
-            # Criar recomendação
-            recommendation = CreatorRecommendation(
-                creator_id=str(creator.id),
-                score=round(scores['total'], 3),
-                fit_breakdown=FitBreakdown(
-                    tags=round(scores['tags'], 3),
-                    audience_overlap=round(scores['audience_overlap'], 3),
-                    performance=round(scores['performance'], 3),
-                    budget_fit=round(scores['budget_fit'], 3)
-                ),
-                why=self.generate_explanation(creator, scores, campaign_data)
+            tag_index.creator_mask(creator.id, creator.tags)
+        
+        return creators
+    
+    def load_candidates(self, campaign_data: Dict[str, Any],
+                        filters: Optional[Dict[str, Any]] = None) -> List[Creator]:
+        """
+        Criadores que passam nas restrições rígidas: consulta indexada no banco
+        ou, com criadores já em memória, o mesmo filtro aplicado a eles
+        """
+        if active_filters(filters) is None:
+            return self.load_creators()
+        if self.creators is not None or self.db is None:
+            return [c for c in self.load_creators() if passes_filters(c, campaign_data, filters)]
+
+        with metrics.span('db_load'):
+            creators = self.db.scalars(candidate_query(campaign_data, filters)).all()
+        tag_index.ensure_loaded(self.db)
+        for creator in creators:
+            tag_index.creator_mask(creator.id, creator.tags)
+        return creators
+    
+    def rank_creators(self, creators: List[Creator], campaign_data: Dict[str, Any],
+                      top_k: int, diversity: bool = False) -> List[CreatorRecommendation]:
+        """
+        Pontua os criadores para uma campanha e retorna o top-k
+        (re-ranqueado por diversidade quando solicitado)
+        """
+        # Seleção parcial com heap limitado a top_k: durante o scoring guardamos
+        # apenas (scores, criador); nlargest é estável, então empates mantêm a
+        # ordem do banco como no sort completo
+        with metrics.span('scoring'):
+            winners = heapq.nlargest(
+                max(pool_size(top_k) if diversity else top_k, 0),
+                ((self.score_creator(creator, campaign_data), creator) for creator in creators),
+                key=lambda item: round(item[0]['total'], 3)
             )
-            recommendations.append(recommendation)
         
-        # Ordenar por score decrescente e limitar
-        recommendations.sort(key=lambda x: x.score, reverse=True)
-        return recommendations[:top_k]
\ No newline at end of file
+        if diversity and winners:
+            with metrics.span('diversity'):
+                pool = CreatorCatalog.from_creators([creator for _, creator in winners])
+                relevance = np.array([round(scores['total'], 3) for scores, _ in winners])
+                positions = mmr_rerank(pool, np.arange(len(winners)), relevance, top_k)
+                winners = [winners[p] for p in positions]
+        
+        # Explicações e modelos de resposta só para os vencedores
+        with metrics.span('explanation'):
+            return [self.build_recommendation(creator, scores, campaign_data) for scores, creator in winners]
+    
+    def get_recommendations(self, campaign_data: Dict[str, Any], top_k: int = 10,
+                            filters: Optional[Dict[str, Any]] = None,
+                            diversity: bool = False) -> List[CreatorRecommendation]:
+        """
+        Gera lista de recomendações ordenada por score
+        (apenas entre os candidatos que passam nas restrições rígidas)
+        """
+        creators = self.load_candidates(campaign_data, filters)
+        self.creators_scored = len(creators)
+        return self.rank_creators(creators, campaign_data, top_k, diversity)
+    
+    def get_batch_recommendations(self, campaigns: List[Dict[str, Any]], top_ks: List[int],
+                                  filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+                                  diversity: Optional[List[bool]] = None
+                                  ) -> List[List[CreatorRecommendation]]:
+        """
+        Gera recomendações para várias campanhas carregando o catálogo uma única vez
+        """
+        creators = self.load_creators()
+        self.creators_scored = len(creators)
+        filters = filters or [None] * len(campaigns)
+        diversity = diversity or [False] * len(campaigns)
+        return [
+            self.rank_creators(
+                [c for c in creators if passes_filters(c, campaign_data, campaign_filters)],
+                campaign_data, top_k, campaign_diversity
+            )
+            for campaign_data, top_k, campaign_filters, campaign_diversity
+            in zip(campaigns, top_ks, filters, diversity)
+        ]
+
+    def iter_ranked(self, campaign_data: Dict[str, Any], filters: Optional[Dict[str, Any]] = None,
+                    min_score: Optional[float] = None, chunk_size: int = 1000,
+                    fields: Optional[Tuple[str, ...]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Ranking completo (sem top_k) em blocos de chunk_size recomendações em dict,
+        opcionalmente cortado em min_score e projetado nos campos pedidos
+
+        Como no backend vetorizado, guarda apenas o score total arredondado e a
+        ordem de cada candidato; componentes e explicações são recalculados
+        por bloco (a memória além dos candidatos fica limitada a um bloco).
+        """
+        creators = self.load_candidates(campaign_data, filters)
+        self.creators_scored = len(creators)
+        totals = [round(self.score_creator(creator, campaign_data)['total'], 3) for creator in creators]
+        # Estável: empates mantêm a ordem dos candidatos (como sorted(..., reverse=True))
+        order = sorted(range(len(totals)), key=totals.__getitem__, reverse=True)
+        if min_score is not None:
+            order = list(takewhile(lambda i: totals[i] >= min_score, order))
+        for start in range(0, len(order), chunk_size):
+            chunk = [creators[i] for i in order[start:start + chunk_size]]
+            yield [
+                self.recommendation_dict(creator, self.score_creator(creator, campaign_data), campaign_data, fields)
+                for creator in chunk
+            ]
+
+class VectorizedRecommendationEngine(RecommendationEngine):
+    """
+    Backend de scoring vetorizado
+
+    Mantém os criadores em um CreatorCatalog colunar e calcula os cinco
+    componentes e o score ponderado de todo o catálogo com operações NumPy.
+    Produz o mesmo ranking e os mesmos scores do caminho por criador.
+
+    Modos de ranking (variável RANKING_MODE):
+    - exhaustive: pontua todo o catálogo e faz seleção parcial do top-k
+    - threshold: percorre criadores por limite superior decrescente e para
+      assim que o top-k não pode mais mudar (mesmo resultado, menos scoring)
+    """
+
+    RANKING_MODES = ('exhaustive', 'threshold')
+
+    def __init__(self, db: Optional[Session], catalog: Optional[CreatorCatalog] = None,
+                 ranking: Optional[str] = None, creators: Optional[List[Creator]] = None):
+        super().__init__(db, creators)
+        self.catalog = catalog
+        self.ranking = ranking or os.getenv('RANKING_MODE', 'threshold')
+        if self.ranking not in self.RANKING_MODES:
+            raise ValueError(f"Modo de ranking desconhecido: {self.ranking}")
+
+    def load_catalog(self) -> CreatorCatalog:
+        """Carrega o catálogo do banco se nenhum foi fornecido"""
+        if self.catalog is None:
+            if self.creators is not None:
+                creators = self.creators
+            else:
+                with metrics.span('db_load'):
+                    creators = self.db.query(Creator).all()
+            with metrics.span('hydration'):
+                self.catalog = CreatorCatalog.from_creators(creators)
+        return self.catalog
+
+    def get_recommendations(self, campaign_data: Dict[str, Any], top_k: int = 10,
+                            filters: Optional[Dict[str, Any]] = None,
+                            diversity: bool = False) -> List[CreatorRecommendation]:
+        """
+        Gera lista de recomendações ordenada por score
+        (apenas entre os candidatos que passam nas restrições rígidas)
+        """
+        catalog = self.load_catalog()
+        with metrics.span('candidates'):
+            candidates = catalog.candidate_rows(campaign_data, filters)
+        fetch = pool_size(top_k) if diversity else top_k
+        weights = self.weights_for(campaign_data)
+
+        # Mesma ordenação do caminho por criador: score arredondado decrescente,
+        # empates mantêm a ordem do catálogo
+        if self.ranking == 'threshold':
+            with metrics.span('scoring'):
+                rows, self.creators_scored = catalog.top_k_threshold(
+                    campaign_data, weights, fetch, candidates=candidates
+                )
+                scores = catalog.score(campaign_data, weights, rows)
+        else:
+            pool = slice(None) if candidates is None else candidates
+            with metrics.span('scoring'):
+                # Componentes guardados por campanha: outro perfil de pesos só refaz a soma
+                all_scores = catalog.cached_score(campaign_data, weights, pool)
+            with metrics.span('sorting'):
+                positions = select_top_k(np.round(all_scores['total'], 3), fetch)
+            rows = positions if candidates is None else candidates[positions]
+            scores = {key: values[positions] for key, values in all_scores.items()}
+            self.creators_scored = len(all_scores['total'])
+
+        if diversity:
+            rows, scores = self.diversify(catalog, rows, scores, top_k)
+
+        return self.build_catalog_recommendations(catalog, rows, scores, campaign_data)
+
+    def get_profile_recommendations(self, campaign_data: Dict[str, Any],
+                                    profiles: Dict[str, Dict[str, float]], top_k: int = 10,
+                                    filters: Optional[Dict[str, Any]] = None,
+                                    diversity: bool = False) -> Dict[str, List[CreatorRecommendation]]:
+        """
+        Top-k da mesma campanha sob vários perfis de pesos: os componentes são
+        calculados (ou lidos do cache do catálogo) uma vez; cada perfil custa
+        uma soma ponderada e uma seleção parcial
+        """
+        catalog = self.load_catalog()
+        with metrics.span('candidates'):
+            candidates = catalog.candidate_rows(campaign_data, filters)
+        pool = slice(None) if candidates is None else candidates
+        fetch = pool_size(top_k) if diversity else top_k
+
+        results = {}
+        for name, weights in profiles.items():
+            with metrics.span('scoring'):
+                all_scores = catalog.cached_score(campaign_data, weights, pool)
+            with metrics.span('sorting'):
+                positions = select_top_k(np.round(all_scores['total'], 3), fetch)
+            rows = positions if candidates is None else candidates[positions]
+            scores = {key: values[positions] for key, values in all_scores.items()}
+            if diversity:
+                rows, scores = self.diversify(catalog, rows, scores, top_k)
+            results[name] = self.build_catalog_recommendations(catalog, rows, scores, campaign_data)
+            self.creators_scored = len(all_scores['total'])
+        return results
+
+    def get_portfolio(self, campaign_data: Dict[str, Any], filters: Optional[Dict[str, Any]] = None,
+                      caps: Optional[TagCaps] = None) -> Tuple[List[CreatorRecommendation], Dict[str, Any]]:
+        """
+        Conjunto de criadores de maior score total cujo price_min somado cabe
+        no orçamento da campanha (e nos limites por tag); retorna as
+        recomendações escolhidas e o resumo da solução
+        """
+        catalog = self.load_catalog()
+        budget = int(campaign_data.get('budget_cents', 0))
+        with metrics.span('candidates'):
+            candidates = catalog.candidate_rows(campaign_data, filters)
+        pool = np.arange(len(catalog)) if candidates is None else candidates
+        weights = self.weights_for(campaign_data)
+        with metrics.span('scoring'):
+            totals = np.round(catalog.cached_score(campaign_data, weights, pool)['total'], 3)
+        self.creators_scored = len(pool)
+
+        # Só entra quem soma score e cabe sozinho no orçamento
+        eligible = (totals > 0) & (catalog.price_min[pool] <= budget)
+        rows, values = pool[eligible], totals[eligible]
+        prices = catalog.price_min[rows].astype(np.int64)
+
+        positions = np.full(len(catalog), -1, dtype=np.int64)
+        positions[rows] = np.arange(len(rows))
+
+        def positions_with(tag: str) -> np.ndarray:
+            found = positions[catalog.tag_rows(tag)]
+            return found[found >= 0]
+
+        solver = PortfolioSolver(
+            values, prices, budget, caps,
+            tags_of=lambda position: catalog.row_tags(int(rows[position])),
+            positions_with=positions_with
+        )
+        with metrics.span('portfolio'):
+            chosen = np.array(solver.solve(), dtype=np.int64)
+        selected = rows[chosen]
+        scores = catalog.score(campaign_data, weights, selected)
+
+        total_score = float(values[chosen].sum())
+        upper_bound = solver.upper_bound
+        spent = int(prices[chosen].sum())
+        summary = {
+            'total_score': round(total_score, 3),
+            'total_price_cents': spent,
+            'budget_cents': budget,
+            'remaining_cents': budget - spent,
+            'upper_bound': round(upper_bound, 3),
+            'optimality_gap': round(1 - total_score / upper_bound, 4) if upper_bound > 0 else 0.0,
+            'swaps': solver.swaps
+        }
+        return self.build_catalog_recommendations(catalog, selected, scores, campaign_data), summary
+
+    def diversify(self, catalog: CreatorCatalog, rows: np.ndarray, scores: Dict[str, np.ndarray],
+                  top_k: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Re-ranking MMR das linhas candidatas (scores alinhados a rows)"""
+        with metrics.span('diversity'):
+            positions = mmr_rerank(catalog, rows, np.round(scores['total'], 3), top_k)
+        return rows[positions], {key: values[positions] for key, values in scores.items()}
+
+    def build_catalog_recommendations(self, catalog: CreatorCatalog, rows: np.ndarray,
+                                      scores: Dict[str, np.ndarray],
+                                      campaign_data: Dict[str, Any]) -> List[CreatorRecommendation]:
+        """
+        Monta as recomendações das linhas selecionadas (scores alinhados a rows)
+        """
+        with metrics.span('explanation'):
+            return [
+                self.build_recommendation(
+                    catalog.row(i),
+                    {key: float(values[position]) for key, values in scores.items()},
+                    campaign_data
+                )
+                for position, i in enumerate(rows)
+            ]
+
+    def get_batch_recommendations(self, campaigns: List[Dict[str, Any]], top_ks: List[int],
+                                  filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+                                  diversity: Optional[List[bool]] = None
+                                  ) -> List[List[CreatorRecommendation]]:
+        """
+        Pontua todas as campanhas como uma matriz campanhas × criadores e
+        seleciona o top-k de cada linha (entre os candidatos de cada campanha)
+        """
+        catalog = self.load_catalog()
+        self.creators_scored = len(catalog)
+        filters = filters or [None] * len(campaigns)
+        diversity = diversity or [False] * len(campaigns)
+
+        weights = [self.weights_for(campaign_data) for campaign_data in campaigns]
+        row_totals = (row for block in catalog.iter_score_matrix(campaigns, weights) for row in block)
+        results = []
+        for campaign_data, top_k, campaign_filters, campaign_diversity, campaign_weights, campaign_totals in zip(
+                campaigns, top_ks, filters, diversity, weights, row_totals):
+            fetch = pool_size(top_k) if campaign_diversity else top_k
+            candidates = catalog.candidate_rows(campaign_data, campaign_filters)
+            if candidates is None:
+                rows = select_top_k(np.round(campaign_totals, 3), fetch)
+            else:
+                rows = candidates[select_top_k(np.round(campaign_totals[candidates], 3), fetch)]
+            scores = catalog.score(campaign_data, campaign_weights, rows)
+            if campaign_diversity:
+                rows, scores = self.diversify(catalog, rows, scores, top_k)
+            results.append(self.build_catalog_recommendations(catalog, rows, scores, campaign_data))
+        return results
+
+
+    def iter_ranked(self, campaign_data: Dict[str, Any], filters: Optional[Dict[str, Any]] = None,
+                    min_score: Optional[float] = None, chunk_size: int = 1000,
+                    fields: Optional[Tuple[str, ...]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Ranking completo em blocos: guarda apenas o score total arredondado e a
+        ordem de cada candidato; componentes e explicações são calculados por bloco
+        """
+        rows, _ = self.rank_rows(campaign_data, filters, min_score)
+        for start in range(0, len(rows), chunk_size):
+            yield self.build_page(campaign_data, rows[start:start + chunk_size], fields)
+
+    def rank_rows(self, campaign_data: Dict[str, Any], filters: Optional[Dict[str, Any]] = None,
+                  min_score: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ordem completa dos candidatos: linhas do catálogo e scores totais
+        arredondados, sem componentes nem explicações
+        """
+        catalog = self.load_catalog()
+        candidates = catalog.candidate_rows(campaign_data, filters)
+        rows = np.arange(len(catalog)) if candidates is None else candidates
+        self.creators_scored = len(rows)
+        weights = self.weights_for(campaign_data)
+
+        totals = np.empty(len(rows))
+        for start in range(0, len(rows), RANKING_BLOCK_SIZE):
+            block = rows[start:start + RANKING_BLOCK_SIZE]
+            totals[start:start + len(block)] = catalog.score(campaign_data, weights, block)['total']
+        totals = np.round(totals, 3)
+
+        # Score arredondado decrescente, empates pela posição no catálogo
+        order = np.argsort(-totals, kind='stable')
+        if min_score is not None:
+            order = order[:int(np.count_nonzero(totals >= min_score))]
+        return rows[order], totals[order]
+
+    def build_page(self, campaign_data: Dict[str, Any], rows: np.ndarray,
+                   fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        """Recomendações em dict de um trecho do ranking (componentes só dessas linhas)"""
+        catalog = self.load_catalog()
+        scores = catalog.score(campaign_data, self.weights_for(campaign_data), rows)
+        # Sem a explicação, basta o id: evita montar a linha completa do catálogo
+        needs_row = 'why' in (fields or RECOMMENDATION_FIELDS)
+        creators = [catalog.row(i) for i in rows] if needs_row else \
+            [CreatorRef(creator_id) for creator_id in catalog.ids[rows].tolist()]
+        return [
+            self.recommendation_dict(
+                creator,
+                {key: float(values[position]) for key, values in scores.items()},
+                campaign_data, fields
+            )
+            for position, creator in enumerate(creators)
+        ]
+
+
+class ShardedRecommendationEngine(VectorizedRecommendationEngine):
+    """
+    Backend vetorizado com o catálogo dividido entre processos (ver sharding.py)
+
+    Cada shard devolve seu top-k local e o coordenador os combina; o ranking
+    e os scores são idênticos aos do backend vetorizado em um processo.
+    Catálogos pequenos (um único shard) são pontuados no próprio processo.
+    """
+
+    def __init__(self, db: Optional[Session], catalog: Optional[CreatorCatalog] = None,
+                 ranking: Optional[str] = None, creators: Optional[List[Creator]] = None,
+                 scorer: Optional[ShardedScorer] = None):
+        super().__init__(db, catalog, ranking, creators)
+        self.scorer = scorer or get_shard_scorer()
+
+    def get_recommendations(self, campaign_data: Dict[str, Any], top_k: int = 10,
+                            filters: Optional[Dict[str, Any]] = None,
+                            diversity: bool = False) -> List[CreatorRecommendation]:
+        """
+        Gera lista de recomendações ordenada por score, pontuando os shards em paralelo
+        """
+        catalog = self.load_catalog()
+        if len(self.scorer.shard_bounds(len(catalog))) <= 1:
+            return super().get_recommendations(campaign_data, top_k, filters, diversity)
+
+        fetch = pool_size(top_k) if diversity else top_k
+        weights = self.weights_for(campaign_data)
+        with metrics.span('scoring'):
+            rows, self.creators_scored = self.scorer.top_k(
+                catalog, campaign_data, weights, fetch, filters, self.ranking
+            )
+            scores = catalog.score(campaign_data, weights, rows)
+        if diversity:
+            rows, scores = self.diversify(catalog, rows, scores, top_k)
+
+        return self.build_catalog_recommendations(catalog, rows, scores, campaign_data)
+
+    def get_batch_recommendations(self, campaigns: List[Dict[str, Any]], top_ks: List[int],
+                                  filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+                                  diversity: Optional[List[bool]] = None
+                                  ) -> List[List[CreatorRecommendation]]:
+        """
+        Cada campanha é distribuída entre os shards
+        """
+        filters = filters or [None] * len(campaigns)
+        diversity = diversity or [False] * len(campaigns)
+        results = [
+            self.get_recommendations(campaign_data, top_k, campaign_filters, campaign_diversity)
+            for campaign_data, top_k, campaign_filters, campaign_diversity
+            in zip(campaigns, top_ks, filters, diversity)
+        ]
+        self.creators_scored = len(self.load_catalog())
+        return results
+
+
+SCORING_BACKENDS = {
+    'python': RecommendationEngine,
+    'vectorized': VectorizedRecommendationEngine,
+    'sharded': ShardedRecommendationEngine
+}
+
+
+def create_recommendation_engine(db: Optional[Session], backend: Optional[str] = None,
+                                 creators: Optional[List[Creator]] = None,
+                                 snapshot: Optional[Any] = None, as_dicts: bool = False) -> RecommendationEngine:
+    """
+    Instancia o backend de scoring configurado (variável SCORING_BACKEND),
+    opcionalmente sobre um CatalogSnapshot em memória (sem acesso ao banco)
+    """
+    backend = backend or os.getenv('SCORING_BACKEND', 'vectorized')
+    if backend not in SCORING_BACKENDS:
+        raise ValueError(f"Backend de scoring desconhecido: {backend}")
+    if snapshot is not None:
+        if backend != 'python':
+            engine = SCORING_BACKENDS[backend](db, catalog=snapshot.catalog)
+        else:
+            with metrics.span('hydration'):
+                creators = snapshot.creator_rows()
+            engine = SCORING_BACKENDS[backend](db, creators=creators)
+    else:
+        engine = SCORING_BACKENDS[backend](db, creators=creators)
+    engine.as_dicts = as_dicts
+    return engine
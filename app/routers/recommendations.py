@@ -1,13 +1,60 @@
 # Rotas da API
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
-from ..schemas import RecommendationRequest, RecommendationResponse, RecommendationMetadata
-from ..recommendation_engine import RecommendationEngine
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+from ..database import get_db, get_async_db
+from ..models import Creator, Campaign
+from ..schemas import (
+    Campaign as CampaignSchema, CampaignCreate, CampaignRequest, HardFilters, RecommendationRequest, RecommendationResponse, RecommendationMetadata,
+    BatchRecommendationRequest, BatchRecommendationResponse, StreamRecommendationRequest,
+    PagedRecommendationRequest, RecommendationPage, WeightProfile, WhatIfRequest, WhatIfResponse,
+    PortfolioRequest, PortfolioResponse
+)
+from ..recommendation_engine import VectorizedRecommendationEngine, create_recommendation_engine
+from ..cache import recommendation_cache, campaign_cache_key
+from ..candidates import active_filters
+from ..executor import run_scoring
+from ..snapshot import current_snapshot
+from ..metrics import metrics
+from ..serialization import (
+    FAST_SERIALIZATION, NDJSON_MEDIA_TYPE, JSONBytesResponse, as_response, dumps, ndjson_chunks, response_payload
+)
+from ..campaign_results import campaign_results, materialized_result
+from ..coalescing import Overloaded, single_flight
+from ..weights import normalize_weights
+from ..portfolio import TagCaps
+from ..pagination import InvalidCursor, RankingHandle, decode_cursor, encode_cursor, ranking_cache
 
 router = APIRouter()
 
+def campaign_to_dict(campaign: CampaignRequest) -> Dict[str, Any]:
+    """Converte os dados da campanha para o dict usado pelo engine"""
+    return {
+        'goal': campaign.goal,
+        'tags_required': campaign.tags_required,
+        'audience_target': {
+            'country': campaign.audience_target.country,
+            'age_range': campaign.audience_target.age_range
+        },
+        'budget_cents': campaign.budget_cents,
+        'deadline': campaign.deadline
+    }
+
+def with_weights(campaign_data: Dict[str, Any], weights: Optional[WeightProfile]) -> Dict[str, Any]:
+    """Perfil de pesos da requisição (normalizado) substitui o do objetivo"""
+    if weights is not None:
+        campaign_data['weights'] = normalize_weights(weights.model_dump())
+    return campaign_data
+
+def filters_to_dict(filters: Optional[HardFilters]) -> Optional[Dict[str, Any]]:
+    """Restrições rígidas da requisição (None quando nenhuma está ativa)"""
+    return active_filters(filters.model_dump()) if filters is not None else None
+
 @router.post("/recommendations", response_model=RecommendationResponse)
 async def get_recommendations(
     request: RecommendationRequest,
@@ -16,48 +63,344 @@ async def get_recommendations(
     """
     Endpoint principal para obter recomendações de criadores
     """
+    metrics.inc('requests_total', endpoint='recommendations')
     try:
         # Converter dados da campanha para dict
-        campaign_data = {
-            'goal': request.campaign.goal,
-            'tags_required': request.campaign.tags_required,
-            'audience_target': {
-                'country': request.campaign.audience_target.country,
-                'age_range': request.campaign.audience_target.age_range
-            },
-            'budget_cents': request.campaign.budget_cents,
-            'deadline': request.campaign.deadline
-        }
-        
-        # Inicializar engine de recomendação
-        engine = RecommendationEngine(db)
-        
-        # Gerar recomendações
-        recommendations = engine.get_recommendations(campaign_data, request.top_k)
-        
-        # Contar total de criadores
-        from ..models import Creator
-        total_creators = db.query(Creator).count()
-        
-        # Criar resposta
-        response = RecommendationResponse(
-            recommendations=recommendations,
-            metadata=RecommendationMetadata(
-                total_creators=total_creators,
-                scoring_version="1.0"
+        campaign_data = with_weights(campaign_to_dict(request.campaign), request.weights)
+        filters = filters_to_dict(request.filters)
+        
+        # Snapshot em memória (ou arquivo compilado) que atende a requisição
+        snapshot = await current_snapshot(db)
+        
+        # Resultado em cache para a mesma campanha canônica e versão do catálogo
+        version = snapshot.version
+        cache_key = campaign_cache_key(
+            campaign_data, request.top_k, diversity=request.diversity, **(filters or {})
+        )
+        cached = recommendation_cache.get(cache_key, version)
+        metrics.inc('cache_lookups_total', result='hit' if cached is not None else 'miss')
+        if cached is not None:
+            return as_response(cached)
+        
+        async def compute():
+            # Inicializar engine de recomendação sobre o snapshot
+            # (com a serialização rápida, as recomendações saem como dicts)
+            engine = create_recommendation_engine(None, snapshot=snapshot, as_dicts=FAST_SERIALIZATION)
+            
+            # Gerar recomendações no pool de scoring
+            recommendations = await run_scoring(
+                engine.get_recommendations, campaign_data, request.top_k,
+                filters=filters, diversity=request.diversity
             )
+            
+            metrics.inc('creators_scored_total', engine.creators_scored)
+            
+            # Total de criadores (mesmo catálogo pontuado)
+            total_creators = len(snapshot.catalog)
+            
+            # Criar resposta: bytes JSON direto da saída do engine ou modelo validado
+            with metrics.span('serialization'):
+                if FAST_SERIALIZATION:
+                    response = dumps(response_payload(recommendations, total_creators, engine.creators_scored))
+                else:
+                    response = RecommendationResponse(
+                        recommendations=recommendations,
+                        metadata=RecommendationMetadata(
+                            total_creators=total_creators,
+                            scoring_version="1.0",
+                            creators_scored=engine.creators_scored
+                        )
+                    )
+            
+            recommendation_cache.put(cache_key, response, version)
+            return response
+        
+        # Requisições idênticas simultâneas compartilham um único cálculo
+        return as_response(await single_flight.run((cache_key, version), compute))
+        
+    except Overloaded:
+        raise HTTPException(status_code=503, detail="Servidor sobrecarregado, tente novamente",
+                            headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.post("/recommendations/batch", response_model=BatchRecommendationResponse)
+async def get_batch_recommendations(
+    request: BatchRecommendationRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Recomendações para várias campanhas carregando o catálogo uma única vez
+    """
+    metrics.inc('requests_total', endpoint='batch')
+    try:
+        snapshot = await current_snapshot(db)
+        engine = create_recommendation_engine(None, snapshot=snapshot, as_dicts=FAST_SERIALIZATION)
+        results = await run_scoring(
+            engine.get_batch_recommendations,
+            [with_weights(campaign_to_dict(item.campaign), item.weights) for item in request.requests],
+            [item.top_k for item in request.requests],
+            filters=[filters_to_dict(item.filters) for item in request.requests],
+            diversity=[item.diversity for item in request.requests]
+        )
+        
+        metrics.inc('creators_scored_total', engine.creators_scored * len(results))
+        total_creators = len(snapshot.catalog)
+        
+        with metrics.span('serialization'):
+            if FAST_SERIALIZATION:
+                return as_response(dumps({'results': [
+                    response_payload(recommendations, total_creators, engine.creators_scored)
+                    for recommendations in results
+                ]}))
+            return BatchRecommendationResponse(results=[
+                RecommendationResponse(
+                    recommendations=recommendations,
+                    metadata=RecommendationMetadata(
+                        total_creators=total_creators,
+                        scoring_version="1.0",
+                        creators_scored=engine.creators_scored
+                    )
+                )
+                for recommendations in results
+            ])
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.post("/recommendations/what-if", response_model=WhatIfResponse)
+async def compare_weight_profiles(
+    request: WhatIfRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Compara perfis de pesos para a mesma campanha em uma chamada: os
+    componentes do score são calculados uma vez e cada perfil só refaz a
+    soma ponderada e o top-k
+    """
+    metrics.inc('requests_total', endpoint='what_if')
+    try:
+        snapshot = await current_snapshot(db)
+        # Componentes por campanha ficam no catálogo: sempre o backend vetorizado
+        engine = VectorizedRecommendationEngine(None, catalog=snapshot.catalog)
+        engine.as_dicts = FAST_SERIALIZATION
+        results = await run_scoring(
+            engine.get_profile_recommendations,
+            campaign_to_dict(request.campaign),
+            {name: normalize_weights(profile.model_dump()) for name, profile in request.profiles.items()},
+            request.top_k,
+            filters=filters_to_dict(request.filters),
+            diversity=request.diversity
+        )
+        
+        metrics.inc('creators_scored_total', engine.creators_scored)
+        total_creators = len(snapshot.catalog)
+        
+        with metrics.span('serialization'):
+            if FAST_SERIALIZATION:
+                return as_response(dumps({'results': {
+                    name: response_payload(recommendations, total_creators, engine.creators_scored)
+                    for name, recommendations in results.items()
+                }}))
+            return WhatIfResponse(results={
+                name: RecommendationResponse(
+                    recommendations=recommendations,
+                    metadata=RecommendationMetadata(
+                        total_creators=total_creators,
+                        scoring_version="1.0",
+                        creators_scored=engine.creators_scored
+                    )
+                )
+                for name, recommendations in results.items()
+            })
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.post("/recommendations/portfolio", response_model=PortfolioResponse)
+async def get_portfolio(
+    request: PortfolioRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Conjunto de criadores de maior score total cujo price_min somado cabe
+    em budget_cents, opcionalmente limitando criadores por tag
+    """
+    metrics.inc('requests_total', endpoint='portfolio')
+    try:
+        snapshot = await current_snapshot(db)
+        # Solver opera sobre as colunas do catálogo: sempre o backend vetorizado
+        engine = VectorizedRecommendationEngine(None, catalog=snapshot.catalog)
+        engine.as_dicts = FAST_SERIALIZATION
+        recommendations, summary = await run_scoring(
+            engine.get_portfolio,
+            with_weights(campaign_to_dict(request.campaign), request.weights),
+            filters=filters_to_dict(request.filters),
+            caps=TagCaps(request.tag_caps, request.max_per_tag)
         )
         
-        return response
+        metrics.inc('creators_scored_total', engine.creators_scored)
+        
+        with metrics.span('serialization'):
+            payload = {
+                **response_payload(recommendations, len(snapshot.catalog), engine.creators_scored),
+                'portfolio': summary
+            }
+            return as_response(dumps(payload)) if FAST_SERIALIZATION else payload
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
+@router.post("/recommendations/stream")
+async def stream_recommendations(
+    request: StreamRecommendationRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Ranking completo da campanha (sem top_k) em NDJSON, uma recomendação por
+    linha, enviado em blocos: a memória da resposta fica limitada a um bloco
+    """
+    metrics.inc('requests_total', endpoint='stream')
+    try:
+        snapshot = await current_snapshot(db)
+        engine = create_recommendation_engine(None, snapshot=snapshot)
+        chunks = engine.iter_ranked(
+            with_weights(campaign_to_dict(request.campaign), request.weights),
+            filters=filters_to_dict(request.filters),
+            min_score=request.min_score,
+            chunk_size=request.chunk_size,
+            fields=tuple(request.fields) if request.fields else None
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+    
+    # Iterador síncrono: o Starlette o consome em threadpool, sem bloquear o event loop
+    return StreamingResponse(ndjson_chunks(chunks), media_type=NDJSON_MEDIA_TYPE)
+
+def ranking_page(engine: VectorizedRecommendationEngine, handle: RankingHandle, handle_id: Optional[str],
+                 offset: int) -> Dict[str, Any]:
+    """
+    Página do ranking guardado: componentes e explicações só das linhas da
+    fatia. Sem handle_id (ranking maior que o cache) não há próxima página
+    e a resposta sai marcada como truncada.
+    """
+    recommendations = engine.build_page(handle.campaign_data, handle.page(offset))
+    next_offset = offset + handle.page_size
+    has_more = next_offset < len(handle)
+    return {
+        **response_payload(recommendations, handle.total_creators, handle.creators_scored),
+        'total_results': len(handle),
+        'next_cursor': encode_cursor(handle_id, next_offset) if has_more and handle_id is not None else None,
+        'truncated': has_more and handle_id is None
+    }
+
+def page_response(payload: Dict[str, Any]) -> Any:
+    return as_response(dumps(payload)) if FAST_SERIALIZATION else payload
+
+@router.post("/recommendations/pages", response_model=RecommendationPage)
+async def get_first_page(
+    request: PagedRecommendationRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Primeira página: ordena o catálogo uma vez e guarda o ranking (ids e
+    scores) para as páginas seguintes, servidas por cursor sem novo scoring
+    """
+    metrics.inc('requests_total', endpoint='pages')
+    try:
+        campaign_data = with_weights(campaign_to_dict(request.campaign), request.weights)
+        snapshot = await current_snapshot(db)
+        # Fatias do ranking dependem das linhas do catálogo: sempre o backend vetorizado
+        engine = VectorizedRecommendationEngine(None, catalog=snapshot.catalog)
+        rows, scores = await run_scoring(engine.rank_rows, campaign_data, filters_to_dict(request.filters))
+        metrics.inc('creators_scored_total', engine.creators_scored)
+        handle = RankingHandle(campaign_data, rows, scores, snapshot.version,
+                               len(snapshot.catalog), engine.creators_scored, request.page_size)
+        handle_id = ranking_cache.put(handle)
+        with metrics.span('serialization'):
+            return page_response(ranking_page(engine, handle, handle_id, 0))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.get("/recommendations/pages/{cursor}", response_model=RecommendationPage)
+async def get_next_page(cursor: str, db: Session = Depends(get_db)):
+    """
+    Página seguinte a partir do cursor opaco, em O(tamanho da página);
+    o cursor expira (410) quando o catálogo muda ou o ranking sai do cache
+    """
+    metrics.inc('requests_total', endpoint='pages')
+    try:
+        handle_id, offset = decode_cursor(cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    snapshot = await current_snapshot(db)
+    handle = ranking_cache.get(handle_id, snapshot.version, len(snapshot.catalog))
+    if handle is None:
+        raise HTTPException(status_code=410, detail="Ranking expirado: solicite a primeira página novamente")
+    if offset >= len(handle):
+        raise HTTPException(status_code=404, detail="Página fora do ranking")
+    engine = VectorizedRecommendationEngine(None, catalog=snapshot.catalog)
+    try:
+        with metrics.span('serialization'):
+            return page_response(ranking_page(engine, handle, handle_id, offset))
+    except IndexError:
+        # Linhas fora do catálogo atual: o ranking não corresponde mais a ele
+        raise HTTPException(status_code=410, detail="Ranking expirado: solicite a primeira página novamente")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+def insert_campaign(db: Session, campaign: CampaignCreate) -> Campaign:
+    """Grava a campanha (I/O síncrono do Session, roda no threadpool)"""
+    db_campaign = Campaign(**campaign.model_dump())
+    db.add(db_campaign)
+    db.commit()
+    db.refresh(db_campaign)
+    return db_campaign
+
+@router.post("/campaigns", response_model=CampaignSchema, status_code=201)
+async def create_campaign(campaign: CampaignCreate, db: Session = Depends(get_db)):
+    """
+    Cadastra uma campanha e agenda o cálculo do seu top-k em background
+    """
+    db_campaign = await run_in_threadpool(insert_campaign, db, campaign)
+    # No event loop: schedule acorda o agendador (asyncio.Event não é thread-safe)
+    campaign_results.schedule(db_campaign)
+    return db_campaign
+
+@router.get("/campaigns/{campaign_id}/recommendations", response_model=RecommendationResponse)
+async def get_campaign_recommendations(campaign_id: int, db: Session = Depends(get_db)):
+    """
+    Top-k materializado de uma campanha cadastrada (uma consulta por chave);
+    recalculado em background quando a campanha é criada ou o catálogo muda
+    """
+    metrics.inc('requests_total', endpoint='campaign')
+    result = campaign_results.get(campaign_id)
+    metrics.inc('cache_lookups_total', result='materialized' if result is not None else 'miss')
+    if result is not None:
+        return JSONBytesResponse(result.body)
+    
+    # Fora da agenda deste processo: calcula uma vez e passa a agendar
+    campaign = await run_in_threadpool(db.get, Campaign, campaign_id)
+    if campaign is None or campaign.deadline < datetime.utcnow():
+        raise HTTPException(status_code=404, detail="Campanha não encontrada ou com prazo vencido")
+    result = await materialized_result(campaign, db)
+    return JSONBytesResponse(result.body)
+
 @router.get("/creators/count")
-async def get_creators_count(db: Session = Depends(get_db)):
+async def get_creators_count(db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint para verificar quantos criadores estão cadastrados
     """
-    from ..models import Creator
-    count = db.query(Creator).count()
-    return {"total_creators": count}
\ No newline at end of file
+    count = await db.scalar(select(func.count()).select_from(Creator))
+    return {"total_creators": count}
+
+@router.get("/recommendations/cache/stats")
+async def get_cache_stats():
+    """
+    Estatísticas do cache de recomendações (hits, misses, evictions)
+    """
+    return {
+        **recommendation_cache.stats(),
+        'rankings': ranking_cache.stats(),
+        'single_flight': single_flight.stats()
+    }
@@ -1,6 +1,6 @@
 # Schemas Pydantic para validação de dados
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, model_validator
+from typing import Annotated, List, Literal, Optional, Dict, Any
 from datetime import datetime
 
 class AudienceTarget(BaseModel):
@@ -14,10 +14,62 @@ class CampaignRequest(BaseModel):
     budget_cents: int = Field(..., description="Orçamento em centavos")
     deadline: str = Field(..., description="Prazo no formato YYYY-MM-DD")
 
+class HardFilters(BaseModel):
+    require_country: bool = Field(default=False, description="Apenas criadores com audiência no país alvo")
+    require_tag_match: bool = Field(default=False, description="Apenas criadores com ao menos uma tag obrigatória")
+    max_price_factor: Optional[float] = Field(default=None, gt=0, description="Exige price_min <= orçamento × fator")
+
+class WeightProfile(BaseModel):
+    tags: float = Field(default=0.0, ge=0, description="Peso da compatibilidade de tags")
+    audience: float = Field(default=0.0, ge=0, description="Peso da sobreposição de audiência")
+    performance: float = Field(default=0.0, ge=0, description="Peso da performance histórica")
+    budget: float = Field(default=0.0, ge=0, description="Peso da adequação ao orçamento")
+    reliability: float = Field(default=0.0, ge=0, description="Peso da confiabilidade")
+
+    @model_validator(mode='after')
+    def check_positive(self):
+        if self.tags + self.audience + self.performance + self.budget + self.reliability <= 0:
+            raise ValueError("Perfil de pesos precisa de ao menos um peso positivo")
+        return self
+
 class RecommendationRequest(BaseModel):
     campaign: CampaignRequest
     top_k: int = Field(default=10, description="Número máximo de recomendações")
     diversity: bool = Field(default=True, description="Aplicar filtro de diversidade")
+    filters: Optional[HardFilters] = Field(default=None, description="Restrições rígidas aplicadas antes do scoring")
+    weights: Optional[WeightProfile] = Field(default=None, description="Pesos do scoring (padrão: perfil do objetivo)")
+
+class WhatIfRequest(BaseModel):
+    campaign: CampaignRequest
+    profiles: Dict[str, WeightProfile] = Field(..., min_length=1, max_length=20, description="Perfis de pesos comparados")
+    top_k: int = Field(default=10, gt=0, le=1000, description="Número máximo de recomendações por perfil")
+    diversity: bool = Field(default=False, description="Aplicar filtro de diversidade")
+    filters: Optional[HardFilters] = Field(default=None, description="Restrições rígidas aplicadas antes do scoring")
+
+class StreamRecommendationRequest(BaseModel):
+    campaign: CampaignRequest
+    filters: Optional[HardFilters] = Field(default=None, description="Restrições rígidas aplicadas antes do scoring")
+    min_score: Optional[float] = Field(default=None, ge=0, le=1, description="Interrompe o ranking abaixo deste score")
+    fields: Optional[List[Literal['creator_id', 'score', 'fit_breakdown', 'why']]] = Field(
+        default=None, min_length=1, description="Campos de cada recomendação (padrão: todos)"
+    )
+    chunk_size: int = Field(default=1000, gt=0, le=10000, description="Recomendações por bloco enviado")
+    weights: Optional[WeightProfile] = Field(default=None, description="Pesos do scoring (padrão: perfil do objetivo)")
+
+class PagedRecommendationRequest(BaseModel):
+    campaign: CampaignRequest
+    filters: Optional[HardFilters] = Field(default=None, description="Restrições rígidas aplicadas antes do scoring")
+    page_size: int = Field(default=10, gt=0, le=1000, description="Recomendações por página")
+    weights: Optional[WeightProfile] = Field(default=None, description="Pesos do scoring (padrão: perfil do objetivo)")
+
+class PortfolioRequest(BaseModel):
+    campaign: CampaignRequest
+    filters: Optional[HardFilters] = Field(default=None, description="Restrições rígidas aplicadas antes do scoring")
+    weights: Optional[WeightProfile] = Field(default=None, description="Pesos do scoring (padrão: perfil do objetivo)")
+    max_per_tag: Optional[int] = Field(default=None, ge=1, description="Máximo de criadores com uma mesma tag")
+    tag_caps: Optional[Dict[str, Annotated[int, Field(ge=0)]]] = Field(
+        default=None, description="Máximo de criadores por tag específica (sobrepõe max_per_tag)"
+    )
 
 class FitBreakdown(BaseModel):
     tags: float = Field(..., description="Score de compatibilidade de tags")
@@ -34,11 +86,44 @@ class CreatorRecommendation(BaseModel):
 class RecommendationMetadata(BaseModel):
     total_creators: int = Field(..., description="Total de criadores avaliados")
     scoring_version: str = Field(default="1.0", description="Versão do sistema de scoring")
+    creators_scored: Optional[int] = Field(default=None, description="Criadores efetivamente pontuados (após poda)")
 
 class RecommendationResponse(BaseModel):
     recommendations: List[CreatorRecommendation]
     metadata: RecommendationMetadata
 
+class RecommendationPage(BaseModel):
+    recommendations: List[CreatorRecommendation]
+    metadata: RecommendationMetadata
+    total_results: int = Field(..., description="Tamanho do ranking completo")
+    next_cursor: Optional[str] = Field(default=None, description="Cursor opaco da próxima página (None na última)")
+    truncated: bool = Field(
+        default=False, description="Ranking grande demais para guardar: só a primeira página (use /recommendations/stream)"
+    )
+
+class WhatIfResponse(BaseModel):
+    results: Dict[str, RecommendationResponse] = Field(..., description="Recomendações por perfil de pesos")
+
+class PortfolioSummary(BaseModel):
+    total_score: float = Field(..., description="Soma dos scores dos criadores escolhidos")
+    total_price_cents: int = Field(..., description="Soma dos price_min dos criadores escolhidos")
+    budget_cents: int = Field(..., description="Orçamento da campanha")
+    remaining_cents: int = Field(..., description="Orçamento não utilizado")
+    upper_bound: float = Field(..., description="Limite superior do score total (relaxação linear)")
+    optimality_gap: float = Field(..., description="1 - total_score / upper_bound")
+    swaps: int = Field(..., description="Trocas feitas pela fase de melhoria")
+
+class PortfolioResponse(BaseModel):
+    recommendations: List[CreatorRecommendation]
+    metadata: RecommendationMetadata
+    portfolio: PortfolioSummary
+
+class BatchRecommendationRequest(BaseModel):
+    requests: List[RecommendationRequest] = Field(..., description="Campanhas avaliadas em uma única passada")
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[RecommendationResponse] = Field(..., description="Resultados na mesma ordem das campanhas")
+
 # Schemas para criadores
 class CreatorBase(BaseModel):
     name: str
@@ -0,0 +1,65 @@
+# Serialização rápida das respostas de recomendação (orjson, sem revalidar modelos)
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import orjson
+from fastapi import Response
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Desliga o caminho rápido (volta a validar via response_model) com FAST_SERIALIZATION=false
+FAST_SERIALIZATION = os.getenv('FAST_SERIALIZATION', 'true').lower() not in ('false', '0', 'no')
+
+logger = logging.getLogger(__name__)
+
+
+def metadata_payload(total_creators: int, creators_scored: Optional[int],
+                     scoring_version: str = "1.0") -> Dict[str, Any]:
+    """Mesmos campos e ordem de RecommendationMetadata"""
+    return {
+        'total_creators': total_creators,
+        'scoring_version': scoring_version,
+        'creators_scored': creators_scored
+    }
+
+
+def response_payload(recommendations: List[Dict[str, Any]], total_creators: int,
+                     creators_scored: Optional[int]) -> Dict[str, Any]:
+    """Mesma estrutura de RecommendationResponse a partir das recomendações em dict"""
+    return {
+        'recommendations': recommendations,
+        'metadata': metadata_payload(total_creators, creators_scored)
+    }
+
+
+def dumps(payload: Any) -> bytes:
+    """
+    JSON em bytes para saída já confiável do engine (tipos simples, floats
+    já arredondados): dispensa a construção e validação dos modelos Pydantic
+    """
+    return orjson.dumps(payload)
+
+
+class JSONBytesResponse(Response):
+    """Resposta com corpo já serializado; as rotas mantêm response_model para o OpenAPI"""
+    media_type = "application/json"
+
+
+def as_response(value: Any) -> Any:
+    """Corpo já serializado vira resposta direta; modelos seguem pelo response_model"""
+    return JSONBytesResponse(value) if isinstance(value, bytes) else value
+
+
+def ndjson_chunks(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """
+    Um bloco de bytes por bloco de recomendações, uma recomendação JSON por linha.
+    O status HTTP já foi enviado quando o ranking é calculado: uma falha no
+    meio vira uma linha final {"error": ...} em vez de cortar a resposta.
+    """
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield b"\n".join(map(orjson.dumps, chunk)) + b"\n"
+    except Exception as e:
+        logger.exception("Falha no ranking em streaming")
+        yield orjson.dumps({'error': f"Erro interno: {str(e)}"}) + b"\n"
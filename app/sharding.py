@@ -0,0 +1,153 @@
+# Scoring particionado em vários processos (shards do catálogo)
+import atexit
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .catalog import CreatorCatalog, select_top_k
+from .catalog_file import read_catalog_file, write_catalog_file
+
+# Número de processos de scoring
+SCORING_SHARDS = int(os.getenv('SCORING_SHARDS', str(os.cpu_count() or 1)))
+
+# Abaixo deste número de linhas por shard o custo de despacho supera o ganho
+SHARD_MIN_ROWS = int(os.getenv('SHARD_MIN_ROWS', '50000'))
+
+# Diretório dos catálogos compartilhados (tmpfs: memória compartilhada entre processos)
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+# Estado de cada processo do pool: catálogo mapeado e visões dos shards
+_worker_catalog: Dict[str, Any] = {'path': None, 'catalog': None, 'shards': {}}
+
+
+def _worker_shard(path: str, start: int, stop: int) -> CreatorCatalog:
+    if _worker_catalog['path'] != path:
+        _worker_catalog['catalog'], _ = read_catalog_file(path)
+        _worker_catalog['path'] = path
+        _worker_catalog['shards'] = {}
+    shards = _worker_catalog['shards']
+    if (start, stop) not in shards:
+        shards[(start, stop)] = _worker_catalog['catalog'].shard(start, stop)
+    return shards[(start, stop)]
+
+
+def score_shard(path: str, start: int, stop: int, campaign_data: Dict[str, Any],
+                weights: Dict[str, float], top_k: int, filters: Optional[Dict[str, Any]],
+                ranking: str) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Top-k local de um shard (executado nos processos do pool)
+    Retorna (linhas globais, scores totais arredondados, criadores pontuados)
+    """
+    shard = _worker_shard(path, start, stop)
+    candidates = shard.candidate_rows(campaign_data, filters)
+    if ranking == 'threshold':
+        rows, scored = shard.top_k_threshold(campaign_data, weights, top_k, candidates=candidates)
+        totals = np.round(shard.score(campaign_data, weights, rows)['total'], 3)
+    else:
+        pool = slice(None) if candidates is None else candidates
+        all_totals = np.round(shard.score(campaign_data, weights, pool)['total'], 3)
+        positions = select_top_k(all_totals, top_k)
+        rows = positions if candidates is None else candidates[positions]
+        totals, scored = all_totals[positions], len(all_totals)
+    return rows + start, totals, scored
+
+
+class ShardedScorer:
+    """
+    Pool de processos que divide o catálogo em shards contíguos
+
+    O catálogo é gravado uma vez (por snapshot) no formato de catalog_file
+    em memória compartilhada (tmpfs); cada processo o mapeia e pontua apenas o seu
+    intervalo de linhas. O coordenador junta os top-k locais com o mesmo
+    critério do caminho em um processo (score arredondado decrescente,
+    empates pela posição no catálogo), então o resultado é idêntico.
+    """
+
+    def __init__(self, processes: int = SCORING_SHARDS, min_rows: int = SHARD_MIN_ROWS):
+        self.processes = max(1, processes)
+        self.min_rows = max(1, min_rows)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._catalog: Optional[CreatorCatalog] = None
+        self._path: Optional[str] = None
+        self._retired: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def attach(self, catalog: CreatorCatalog) -> str:
+        """Publica o catálogo para os processos; não faz nada se já for o atual"""
+        with self._lock:
+            if catalog is self._catalog:
+                return self._path
+            path = os.path.join(SHARED_DIR, f"reco-catalog-{os.getpid()}-{uuid.uuid4().hex}.bin")
+            write_catalog_file(catalog, path)
+
+            # O arquivo anterior ainda pode ter tarefas na fila: é removido na troca seguinte
+            # (quem já o mapeou mantém as páginas após o unlink)
+            if self._retired and os.path.exists(self._retired):
+                os.remove(self._retired)
+            self._retired, self._catalog, self._path = self._path, catalog, path
+            return path
+
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def shard_bounds(self, n: int) -> List[Tuple[int, int]]:
+        """Intervalos [start, stop) de tamanhos próximos, respeitando min_rows"""
+        shards = max(1, min(self.processes, n // self.min_rows))
+        edges = np.linspace(0, n, shards + 1).astype(int)
+        return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+    def top_k(self, catalog: CreatorCatalog, campaign_data: Dict[str, Any], weights: Dict[str, float],
+              top_k: int, filters: Optional[Dict[str, Any]] = None,
+              ranking: str = 'threshold') -> Tuple[np.ndarray, int]:
+        """
+        Distribui a campanha entre os shards e junta os top-k locais
+        Retorna (linhas do top-k global em ordem, criadores pontuados)
+        """
+        path = self.attach(catalog)
+        futures = [
+            self.executor().submit(score_shard, path, start, stop, campaign_data, weights,
+                                   top_k, filters, ranking)
+            for start, stop in self.shard_bounds(len(catalog))
+        ]
+        results = [future.result() for future in futures]
+        if not results:
+            return np.zeros(0, dtype=np.int64), 0
+
+        rows = np.concatenate([r[0] for r in results])
+        totals = np.concatenate([r[1] for r in results])
+        keep = np.lexsort((rows, -totals))[:max(top_k, 0)]
+        return rows[keep], sum(r[2] for r in results)
+
+    def shutdown(self):
+        """Encerra os processos e remove o catálogo compartilhado"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+            for path in (self._path, self._retired):
+                if path and os.path.exists(path):
+                    os.remove(path)
+            self._catalog, self._path, self._retired = None, None, None
+
+
+_shard_scorer: Optional[ShardedScorer] = None
+_scorer_lock = threading.Lock()
+
+
+def get_shard_scorer() -> ShardedScorer:
+    """Pool de shards do processo (criado no primeiro uso)"""
+    global _shard_scorer
+    with _scorer_lock:
+        if _shard_scorer is None:
+            _shard_scorer = ShardedScorer()
+            atexit.register(_shard_scorer.shutdown)
+        return _shard_scorer
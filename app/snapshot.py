@@ -0,0 +1,253 @@
+# Snapshot imutável do catálogo de criadores em memória
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from .catalog import CreatorCatalog, CreatorRow
+from .catalog_file import MappedCatalog
+from .catalog_version import catalog_version
+from .metrics import metrics
+from .models import Base, Creator
+from .tag_index import tag_index
+
+# Colunas lidas do banco (sem hidratar objetos ORM)
+SNAPSHOT_COLUMNS = (
+    Creator.id, Creator.tags, Creator.audience_age_cdf, Creator.audience_location,
+    Creator.avg_views, Creator.ctr, Creator.cvr, Creator.price_min, Creator.price_max,
+    Creator.reliability_score, Creator.performance_feature, Creator.reliability_feature,
+    Creator.feature_version, Creator.updated_at
+)
+
+# Intervalo da atualização periódica (captura escritas de outros processos)
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv('SNAPSHOT_REFRESH_SECONDS', '5'))
+
+# Sobreposição aplicada ao watermark: linhas gravadas com timestamp anterior
+# ao commit (transações longas) ainda são relidas na atualização seguinte
+WATERMARK_LAG = timedelta(seconds=float(os.getenv('SNAPSHOT_WATERMARK_LAG', '5')))
+
+# Catálogo compilado (python -m app.catalog_file); quando definido, os
+# workers servem o arquivo memory-mapped em vez de ler o banco
+CATALOG_PATH = os.getenv('CATALOG_PATH')
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """
+    Versão imutável do catálogo usada pelas requisições
+
+    Guarda o CreatorCatalog pré-processado, o watermark (maior updated_at
+    lido) e a versão do catálogo no momento da construção.
+    """
+
+    def __init__(self, catalog: CreatorCatalog, watermark: Optional[datetime], version: int):
+        self.catalog = catalog
+        self.watermark = watermark
+        self.version = version
+        self.built_at = time.time()
+        self._rows: Optional[List[CreatorRow]] = None
+
+    def creator_rows(self) -> List[CreatorRow]:
+        """Linhas do catálogo para o backend por criador (materializadas uma vez)"""
+        if self._rows is None:
+            self._rows = self.catalog.rows()
+        return self._rows
+
+
+class SnapshotStore:
+    """
+    Mantém o snapshot atual e o substitui atomicamente
+
+    A primeira construção lê todo o catálogo; as seguintes leem apenas as
+    linhas com updated_at a partir do watermark e as combinam com o snapshot
+    anterior. Remoções são detectadas comparando a contagem de linhas.
+    Mudanças vindas de outros processos não passam pelo contador de versão
+    deste: quando o catálogo combinado difere do anterior, a versão é
+    incrementada (invalida caches, cursores e resultados materializados).
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self.full_builds = 0
+        self.incremental_refreshes = 0
+
+    @property
+    def current(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    def is_stale(self) -> bool:
+        """Snapshot inexistente ou anterior a uma escrita feita neste processo"""
+        snapshot = self._snapshot
+        return snapshot is None or snapshot.version != catalog_version.value
+
+    def invalidate(self):
+        """Descarta o snapshot (a próxima leitura reconstrói do zero)"""
+        with self._lock:
+            self._snapshot = None
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        """Snapshot atual, atualizado antes se estiver desatualizado"""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != catalog_version.value:
+            snapshot = self.refresh(db, force=False)
+        return snapshot
+
+    def refresh(self, db: Session, force: bool = True) -> CatalogSnapshot:
+        """Atualiza o snapshot (incremental quando já existe um)"""
+        with self._lock:
+            snapshot = self._snapshot
+            version = catalog_version.value
+            if not force and snapshot is not None and snapshot.version == version:
+                return snapshot
+
+            if snapshot is None:
+                snapshot = self._build_full(db, version)
+            else:
+                snapshot = self._build_incremental(db, snapshot, version)
+            self._snapshot = snapshot
+            return snapshot
+
+    def _build_full(self, db: Session, version: int) -> CatalogSnapshot:
+        with metrics.span('db_load'):
+            rows = db.execute(select(*SNAPSHOT_COLUMNS).order_by(Creator.id)).all()
+        with metrics.span('hydration'):
+            for row in rows:
+                tag_index.update_creator(row.id, row.tags)
+            catalog = CreatorCatalog.from_creators(rows)
+        self.full_builds += 1
+        return CatalogSnapshot(catalog, self._watermark(rows, None), version)
+
+    def _build_incremental(self, db: Session, snapshot: CatalogSnapshot, version: int) -> CatalogSnapshot:
+        catalog = snapshot.catalog
+        query = select(*SNAPSHOT_COLUMNS).order_by(Creator.id)
+        if snapshot.watermark is not None:
+            query = query.where(Creator.updated_at >= snapshot.watermark - WATERMARK_LAG)
+        with metrics.span('db_load'):
+            rows = db.execute(query).all()
+
+        changed = False
+        if rows:
+            with metrics.span('hydration'):
+                delta = CreatorCatalog.from_creators(rows, catalog.tag_vocab, catalog.country_vocab)
+                if not catalog.contains(delta):
+                    catalog = catalog.merge(delta)
+                    changed = True
+                    for row in rows:
+                        tag_index.update_creator(row.id, row.tags)
+
+        # Remoções não deixam rastro no watermark: compara a contagem
+        total = db.scalar(select(func.count()).select_from(Creator))
+        if total != len(catalog):
+            existing = np.array(db.scalars(select(Creator.id)).all(), dtype=np.int64)
+            removed = np.setdiff1d(catalog.ids, existing)
+            catalog = catalog.merge(removed_ids=removed)
+            changed = changed or len(removed) > 0
+            for creator_id in removed:
+                tag_index.remove_creator(int(creator_id))
+
+        if changed:
+            version = catalog_version.bump()
+        self.incremental_refreshes += 1
+        return CatalogSnapshot(catalog, self._watermark(rows, snapshot.watermark), version)
+
+    @staticmethod
+    def _watermark(rows, previous: Optional[datetime]) -> Optional[datetime]:
+        stamps = [row.updated_at for row in rows if row.updated_at is not None]
+        if previous is not None:
+            stamps.append(previous)
+        return max(stamps) if stamps else previous
+
+    async def run_periodic_refresh(self, session_factory: Callable[[], Session],
+                                   interval: float = SNAPSHOT_REFRESH_SECONDS):
+        """Atualiza o snapshot em background a cada intervalo (falhas não encerram o laço)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_threadpool(self.refresh_with, session_factory)
+            except Exception:
+                logger.exception("Falha ao atualizar o snapshot do catálogo")
+                metrics.inc('background_errors_total', task='snapshot')
+
+    def refresh_with(self, session_factory: Callable[[], Session]) -> CatalogSnapshot:
+        """Atualiza abrindo uma sessão própria"""
+        db = session_factory()
+        try:
+            return self.refresh(db)
+        finally:
+            db.close()
+
+
+class FileSnapshotStore:
+    """
+    Snapshot servido a partir do arquivo binário do catálogo
+
+    Vários workers mapeiam o mesmo arquivo (uma cópia no page cache). Um
+    novo arquivo renomeado por cima é detectado na verificação seguinte e
+    vira um novo snapshot, com nova versão do catálogo (invalida caches).
+    """
+
+    def __init__(self, path: str):
+        self.mapped = MappedCatalog(path)
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    def get(self, db: Optional[Session] = None) -> CatalogSnapshot:
+        """Snapshot do arquivo atual (remapeia se o arquivo foi trocado)"""
+        with self._lock:
+            if self.mapped.reload_if_changed() or self._snapshot is None:
+                self._snapshot = CatalogSnapshot(self.mapped.catalog, None, catalog_version.bump())
+            return self._snapshot
+
+    async def run_periodic_refresh(self, session_factory: Callable[[], Session],
+                                   interval: float = SNAPSHOT_REFRESH_SECONDS):
+        """Verifica a troca do arquivo em background a cada intervalo (falhas não encerram o laço)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.get()
+            except Exception:
+                logger.exception("Falha ao recarregar o arquivo do catálogo")
+                metrics.inc('background_errors_total', task='snapshot')
+
+    def refresh_with(self, session_factory: Callable[[], Session]) -> CatalogSnapshot:
+        return self.get()
+
+
+snapshot_store = SnapshotStore()
+file_snapshot_store = FileSnapshotStore(CATALOG_PATH) if CATALOG_PATH else None
+
+
+def catalog_store():
+    """Fonte de snapshots em uso: arquivo compilado ou banco"""
+    return file_snapshot_store or snapshot_store
+
+
+# Esquema recriado: o snapshot não pode ser combinado incrementalmente
+@event.listens_for(Base.metadata, 'after_drop')
+def _invalidate_on_drop(target, connection, **kw):
+    snapshot_store.invalidate()
+
+
+async def current_snapshot(db: Session) -> CatalogSnapshot:
+    """
+    Snapshot atual para uma requisição; só consulta o banco quando o
+    catálogo mudou neste processo desde a última construção
+    (com CATALOG_PATH, apenas verifica se o arquivo foi trocado)
+    """
+    if file_snapshot_store is not None:
+        return file_snapshot_store.get()
+    if snapshot_store.is_stale():
+        return await run_in_threadpool(snapshot_store.get, db)
+    return snapshot_store.current
@@ -0,0 +1,156 @@
+# Dicionário de tags, bitmasks por criador e índice invertido tag → criadores
+import threading
+from typing import List, Dict, Set, Optional, Iterable
+from sqlalchemy import event, inspect, select, insert
+from sqlalchemy.orm import Session
+from .models import Creator, creator_tags
+
+
+class TagIndex:
+    """
+    Índice de tags em memória
+
+    - Dicionário: cada tag recebe um id inteiro estável no processo
+    - Bitmask: tags de cada criador como um inteiro (bit i = tag de id i),
+      permitindo Jaccard via popcount
+    - Índice invertido: tag → ids dos criadores que a possuem, para saber
+      de imediato quais criadores não compartilham nenhuma tag requerida
+
+    É carregado da tabela creator_tags e mantido atualizado pelos eventos
+    de escrita de Creator (aplicados somente após o commit).
+    """
+
+    def __init__(self):
+        self.tag_ids: Dict[str, int] = {}
+        self.masks: Dict[int, int] = {}
+        self.postings: Dict[int, Set[int]] = {}
+        self.loaded = False
+        self._lock = threading.RLock()
+
+    def tag_id(self, tag: str) -> int:
+        """Id da tag, registrando-a no dicionário se for nova"""
+        tag_id = self.tag_ids.get(tag)
+        if tag_id is None:
+            with self._lock:
+                tag_id = self.tag_ids.setdefault(tag, len(self.tag_ids))
+        return tag_id
+
+    def mask(self, tags: Iterable[str]) -> int:
+        """Bitmask das tags já conhecidas (tags desconhecidas são ignoradas)"""
+        mask = 0
+        for tag in tags:
+            tag_id = self.tag_ids.get(tag)
+            if tag_id is not None:
+                mask |= 1 << tag_id
+        return mask
+
+    def update_creator(self, creator_id: int, tags: Optional[List[str]]):
+        """Substitui as tags de um criador no índice"""
+        with self._lock:
+            self.remove_creator(creator_id)
+            mask = 0
+            for tag in set(tags or []):
+                tag_id = self.tag_id(tag)
+                mask |= 1 << tag_id
+                self.postings.setdefault(tag_id, set()).add(creator_id)
+            self.masks[creator_id] = mask
+
+    def remove_creator(self, creator_id: int):
+        """Remove um criador do índice"""
+        with self._lock:
+            mask = self.masks.pop(creator_id, 0)
+            while mask:
+                low_bit = mask & -mask
+                self.postings.get(low_bit.bit_length() - 1, set()).discard(creator_id)
+                mask ^= low_bit
+
+    def creator_mask(self, creator_id: int, tags: Optional[List[str]]) -> int:
+        """Bitmask de um criador, indexando-o caso ainda não esteja no índice"""
+        mask = self.masks.get(creator_id)
+        if mask is None:
+            self.update_creator(creator_id, tags)
+            mask = self.masks[creator_id]
+        return mask
+
+    def creators_with_any(self, tags: Iterable[str]) -> Set[int]:
+        """Criadores que possuem ao menos uma das tags (união das posting lists)"""
+        result: Set[int] = set()
+        for tag in set(tags):
+            tag_id = self.tag_ids.get(tag)
+            if tag_id is not None:
+                result |= self.postings.get(tag_id, set())
+        return result
+
+    def ensure_loaded(self, db: Session):
+        """Carrega o índice a partir da tabela creator_tags (uma vez por processo)"""
+        if self.loaded:
+            return
+        rows = db.execute(select(creator_tags.c.creator_id, creator_tags.c.tag)).all()
+        tags_by_creator: Dict[int, List[str]] = {}
+        for creator_id, tag in rows:
+            tags_by_creator.setdefault(creator_id, []).append(tag)
+        with self._lock:
+            for creator_id, tags in tags_by_creator.items():
+                if creator_id not in self.masks:
+                    self.update_creator(creator_id, tags)
+            self.loaded = True
+
+    @staticmethod
+    def jaccard(creator_mask: int, required_mask: int, required_count: int) -> float:
+        """Jaccard via popcount; required_count inclui tags fora do dicionário"""
+        if not required_count:
+            return 1.0
+        intersection = (creator_mask & required_mask).bit_count()
+        if not intersection:
+            return 0.0
+        return intersection / (creator_mask.bit_count() + required_count - intersection)
+
+
+tag_index = TagIndex()
+
+
+# Sincronização com a tabela creator_tags (mesma transação da escrita do criador)
+def _replace_creator_tags(connection, creator: Creator, delete_existing: bool):
+    if delete_existing:
+        connection.execute(creator_tags.delete().where(creator_tags.c.creator_id == creator.id))
+    tags = set(creator.tags or [])
+    if tags:
+        connection.execute(insert(creator_tags), [{'creator_id': creator.id, 'tag': tag} for tag in tags])
+
+    session = Session.object_session(creator)
+    if session is not None:
+        session.info.setdefault('tag_index_pending', {})[creator.id] = list(tags)
+
+
+@event.listens_for(Creator, 'after_insert')
+def _creator_inserted(mapper, connection, target):
+    _replace_creator_tags(connection, target, delete_existing=False)
+
+
+@event.listens_for(Creator, 'after_update')
+def _creator_updated(mapper, connection, target):
+    if inspect(target).attrs.tags.history.has_changes():
+        _replace_creator_tags(connection, target, delete_existing=True)
+
+
+@event.listens_for(Creator, 'after_delete')
+def _creator_deleted(mapper, connection, target):
+    connection.execute(creator_tags.delete().where(creator_tags.c.creator_id == target.id))
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault('tag_index_pending', {})[target.id] = None
+
+
+# O índice em memória só reflete escritas efetivadas
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    for creator_id, tags in session.info.pop('tag_index_pending', {}).items():
+        if tags is None:
+            tag_index.remove_creator(creator_id)
+        else:
+            tag_index.update_creator(creator_id, tags)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('tag_index_pending', None)
@@ -0,0 +1,50 @@
+# Perfis de pesos do scoring (por objetivo da campanha ou por requisição)
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+# Chaves dos pesos e dos componentes do score correspondentes, na ordem da soma
+WEIGHT_KEYS = ('tags', 'audience', 'performance', 'budget', 'reliability')
+COMPONENT_KEYS = ('tags', 'audience_overlap', 'performance', 'budget_fit', 'reliability')
+
+# Perfis por objetivo; objetivos ausentes (ex.: "installs") usam RecommendationEngine.WEIGHTS
+GOAL_WEIGHTS: Dict[str, Dict[str, float]] = {
+    # Alcance: audiência certa pesa mais que conversão histórica
+    'awareness': {'tags': 0.30, 'audience': 0.40, 'performance': 0.15, 'budget': 0.10, 'reliability': 0.05},
+    # Conversão: CTR/CVR históricos pesam mais
+    'sales': {'tags': 0.35, 'audience': 0.20, 'performance': 0.30, 'budget': 0.10, 'reliability': 0.05},
+    # Recorrência: entregas consistentes pesam mais
+    'subscriptions': {'tags': 0.35, 'audience': 0.25, 'performance': 0.20, 'budget': 0.05, 'reliability': 0.15},
+}
+
+
+def normalize_weights(weights: Dict[str, float]) -> Dict[str, float]:
+    """Pesos de um perfil reescalados para somar 1 (scores continuam em 0..1)"""
+    total = sum(weights.get(key, 0.0) for key in WEIGHT_KEYS)
+    if total <= 0:
+        raise ValueError("Perfil de pesos precisa de ao menos um peso positivo")
+    return {key: weights.get(key, 0.0) / total for key in WEIGHT_KEYS}
+
+
+def resolve_weights(campaign_data: Dict[str, Any],
+                    default: Optional[Dict[str, float]] = None) -> Optional[Dict[str, float]]:
+    """Pesos explícitos da requisição, senão o perfil do objetivo, senão default"""
+    return campaign_data.get('weights') or GOAL_WEIGHTS.get(campaign_data.get('goal'), default)
+
+
+def weights_key(weights: Optional[Dict[str, float]]) -> Optional[Tuple[float, ...]]:
+    """Forma canônica de um perfil para chaves de cache"""
+    return None if weights is None else tuple(float(weights[key]) for key in WEIGHT_KEYS)
+
+
+def weighted_total(components: np.ndarray, weights: Dict[str, float]) -> np.ndarray:
+    """
+    Score total a partir da matriz de componentes (linhas em COMPONENT_KEYS):
+    mesma ordem de soma de CreatorCatalog.score, logo os mesmos valores
+    """
+    return (
+        components[0] * weights['tags'] +
+        components[1] * weights['audience'] +
+        components[2] * weights['performance'] +
+        components[3] * weights['budget'] +
+        components[4] * weights['reliability']
+    )
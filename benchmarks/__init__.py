@@ -0,0 +1 @@
+# Benchmarks e testes de carga do sistema de recomendação
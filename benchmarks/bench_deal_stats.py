@@ -0,0 +1,128 @@
+# Benchmark: reconstrução dos agregados de deals e leitura O(1) vs GROUP BY
+"""
+Popula um SQLite temporário com criadores e um histórico grande de deals
+(10M por padrão), mede a reconstrução em lote de creator_deal_stats
+(backfill), o custo por deal do caminho incremental (eventos do ORM) e
+compara a leitura dos agregados de um criador com o GROUP BY equivalente
+sobre past_deals.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_deal_stats
+    python -m benchmarks.bench_deal_stats --deals 1000000 --creators 50000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.deal_stats import DEAL_CHUNK_SIZE, rebuild_deal_stats
+from app.migrations import run_migrations
+from app.models import Base, PastDeal
+from seeds import bulk_seed
+
+
+def insert_deals(target, count: int, creators: int, seed: int, chunk_size: int):
+    """Deals sintéticos inseridos direto pelo DBAPI (sem eventos, como uma carga externa)"""
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow().isoformat(sep=' ')
+    raw = target.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for start in range(0, count, chunk_size):
+            size = min(chunk_size, count - start)
+            cursor.executemany(
+                "INSERT INTO past_deals (creator_id, campaign_id, delivered_on_time, performance_score, created_at) "
+                "VALUES (?, 1, ?, ?, ?)",
+                zip(rng.integers(1, creators + 1, size).tolist(), (rng.random(size) < 0.8).tolist(),
+                    rng.random(size).tolist(), [now] * size)
+            )
+            raw.commit()
+    finally:
+        raw.close()
+
+
+def median_ms(func, creator_ids) -> float:
+    samples = []
+    for creator_id in creator_ids:
+        start = time.perf_counter()
+        func(creator_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill e leitura dos agregados de deals")
+    parser.add_argument("--creators", type=int, default=100000)
+    parser.add_argument("--deals", type=int, default=10000000)
+    parser.add_argument("--chunk-size", type=int, default=DEAL_CHUNK_SIZE)
+    parser.add_argument("--incremental", type=int, default=2000, help="Deals inseridos pelo ORM")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        target = create_engine(f"sqlite:///{os.path.join(directory, 'deals.db')}")
+        Base.metadata.create_all(bind=target)
+        run_migrations(target)
+        bulk_seed(target, creators=args.creators, deals=0, seed=args.seed)
+
+        started = time.perf_counter()
+        insert_deals(target, args.deals, args.creators, args.seed, args.chunk_size)
+        load_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        rows = rebuild_deal_stats(target, args.chunk_size)
+        rebuild_s = time.perf_counter() - started
+
+        # Caminho incremental: um deal por commit, como na aplicação
+        rng = random.Random(args.seed)
+        session = sessionmaker(bind=target)()
+        started = time.perf_counter()
+        for _ in range(args.incremental):
+            session.add(PastDeal(creator_id=rng.randint(1, args.creators), campaign_id=1,
+                                 delivered_on_time=rng.random() < 0.8, performance_score=rng.random()))
+            session.commit()
+        incremental_ms = (time.perf_counter() - started) * 1000 / max(args.incremental, 1)
+        session.close()
+
+        sample = [rng.randint(1, args.creators) for _ in range(args.lookups)]
+        with target.connect() as conn:
+            materialized_ms = median_ms(lambda creator_id: conn.execute(text(
+                "SELECT deal_count, on_time_count, decayed_sum, decayed_weight "
+                "FROM creator_deal_stats WHERE creator_id = :id"), {'id': creator_id}).first(), sample)
+            group_by_ms = median_ms(lambda creator_id: conn.execute(text(
+                "SELECT COUNT(*), SUM(delivered_on_time), AVG(performance_score) "
+                "FROM past_deals WHERE creator_id = :id GROUP BY creator_id"), {'id': creator_id}).first(), sample)
+            started = time.perf_counter()
+            conn.execute(text(
+                "SELECT creator_id, COUNT(*), SUM(delivered_on_time), AVG(performance_score) "
+                "FROM past_deals GROUP BY creator_id")).fetchall()
+            full_group_by_s = time.perf_counter() - started
+        target.dispose()
+
+    print(json.dumps({
+        'creators': args.creators,
+        'deals': args.deals,
+        'load_s': round(load_s, 2),
+        'rebuild': {
+            'seconds': round(rebuild_s, 2),
+            'deals_per_s': round(args.deals / rebuild_s) if rebuild_s else None,
+            'stats_rows': rows
+        },
+        'incremental_ms_per_deal': round(incremental_ms, 3),
+        'lookup_p50_ms': {
+            'materialized': materialized_ms,
+            'group_by_one_creator': group_by_ms
+        },
+        'full_group_by_s': round(full_group_by_s, 2)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Benchmark: custo do re-ranking por diversidade (MMR) sobre um catálogo grande
+"""
+Compara o tempo de recomendação com e sem diversidade em um catálogo
+sintético em memória (sem banco), para o backend vetorizado.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_diversity
+    python -m benchmarks.bench_diversity --creators 100000 --top-k 50 --pool 200
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Dict, List
+from app.catalog import CreatorCatalog, CreatorRow
+from app.diversity import DIVERSITY_LAMBDA
+from app.features import FEATURE_VERSION, build_age_cdf, performance_feature
+from app.recommendation_engine import VectorizedRecommendationEngine
+from app import diversity
+
+TAGS = ["fintech", "investimentos", "fitness", "corrida", "skincare", "beleza", "tech", "games",
+        "culinária", "viagem", "moda", "educação", "música", "pets", "automóveis", "saúde"]
+COUNTRIES = ["BR", "US", "MX", "AR", "CO", "PT", "ES", "CL"]
+
+
+def synthetic_catalog(n: int, seed: int) -> CreatorCatalog:
+    """Catálogo com n criadores aleatórios (determinístico pela seed)"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(1, n + 1):
+        avg_views, ctr, cvr = rng.randint(1000, 500000), rng.uniform(0.005, 0.08), rng.uniform(0.002, 0.05)
+        reliability = rng.uniform(0.3, 1.0)
+        price_min = rng.randint(10000, 500000)
+        center = rng.randint(18, 50)
+        rows.append(CreatorRow(
+            id=i,
+            tags=rng.sample(TAGS, rng.randint(1, 4)),
+            audience_location=rng.sample(COUNTRIES, rng.randint(1, 3)),
+            avg_views=avg_views,
+            reliability_score=reliability,
+            ctr=ctr,
+            cvr=cvr,
+            price_min=price_min,
+            price_max=price_min * rng.randint(2, 5),
+            audience_age_cdf=build_age_cdf([max(13, int(rng.gauss(center, 6))) for _ in range(50)]),
+            performance_feature=performance_feature(avg_views, ctr, cvr),
+            reliability_feature=reliability,
+            feature_version=FEATURE_VERSION
+        ))
+    return CreatorCatalog.from_creators(rows)
+
+
+def random_campaign(rng: random.Random) -> Dict:
+    return {
+        'tags_required': rng.sample(TAGS, 2),
+        'audience_target': {'country': rng.choice(COUNTRIES), 'age_range': [18, rng.randint(25, 50)]},
+        'budget_cents': rng.randint(50000, 2000000)
+    }
+
+
+def timed(engine: VectorizedRecommendationEngine, campaigns: List[Dict], top_k: int,
+          use_diversity: bool) -> List[float]:
+    samples = []
+    for campaign in campaigns:
+        start = time.perf_counter()
+        engine.get_recommendations(campaign, top_k=top_k, diversity=use_diversity)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(ordered), 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 2),
+        'mean_ms': round(statistics.mean(ordered), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead do re-ranking MMR")
+    parser.add_argument("--creators", type=int, default=100000)
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--pool", type=int, default=diversity.DIVERSITY_POOL_SIZE)
+    parser.add_argument("--campaigns", type=int, default=30)
+    parser.add_argument("--ranking", choices=VectorizedRecommendationEngine.RANKING_MODES, default="threshold")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    diversity.DIVERSITY_POOL_SIZE = args.pool
+    start = time.perf_counter()
+    catalog = synthetic_catalog(args.creators, args.seed)
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(args.seed)
+    campaigns = [random_campaign(rng) for _ in range(args.campaigns)]
+    engine = VectorizedRecommendationEngine(None, catalog=catalog, ranking=args.ranking)
+    engine.get_recommendations(campaigns[0], top_k=args.top_k)  # Aquece limites superiores
+
+    plain = timed(engine, campaigns, args.top_k, use_diversity=False)
+    diverse = timed(engine, campaigns, args.top_k, use_diversity=True)
+
+    print(json.dumps({
+        'creators': args.creators,
+        'top_k': args.top_k,
+        'pool_size': max(args.top_k, args.pool),
+        'lambda': DIVERSITY_LAMBDA,
+        'ranking': args.ranking,
+        'catalog_build_s': round(build_seconds, 2),
+        'without_diversity': summary(plain),
+        'with_diversity': summary(diverse),
+        'overhead_p50_ms': round(statistics.median(diverse) - statistics.median(plain), 2)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
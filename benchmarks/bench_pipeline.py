@@ -0,0 +1,286 @@
+# Benchmark do pipeline de recomendação por tamanho de catálogo
+"""
+Gera catálogos determinísticos (seeds.py) de vários tamanhos e mede, em
+processo, cada estágio do pipeline para campanhas de formatos variados:
+
+- db_load: leitura das colunas do catálogo no SQLite
+- catalog_build: construção do CreatorCatalog colunar
+- scoring / ranking / response: componentes do score, seleção do top-k e
+  montagem das respostas com explicação (backend vetorizado)
+- engines: get_recommendations completo por backend e modo de ranking
+- endpoint: POST /recommendations via TestClient (cache desligado)
+
+Reporta mediana/p95, throughput e pico de memória (tracemalloc, medido em
+uma passada separada para não distorcer os tempos). O resultado é salvo
+em JSON; --compare aponta regressões em relação a uma execução anterior.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_pipeline --sizes 1000 10000
+    python -m benchmarks.bench_pipeline --output atual.json --compare anterior.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.catalog import CreatorCatalog, select_top_k
+from app.migrations import run_migrations
+from app.models import Base, Creator
+from app.recommendation_engine import RecommendationEngine, VectorizedRecommendationEngine
+from app.snapshot import SNAPSHOT_COLUMNS
+from seeds import bulk_seed
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Formatos de campanha: quantidade de tags, largura da faixa etária e top_k
+CAMPAIGN_SHAPES = {
+    'few_tags_narrow_age': {
+        'tags_required': ['fintech'],
+        'audience_target': {'country': 'BR', 'age_range': [25, 30]},
+        'budget_cents': 1000000, 'top_k': 10
+    },
+    'many_tags_wide_age': {
+        'tags_required': ['fitness', 'corrida', 'yoga', 'nutrição', 'musculação', 'lifestyle', 'viagem', 'vegano'],
+        'audience_target': {'country': 'BR', 'age_range': [16, 65]},
+        'budget_cents': 2000000, 'top_k': 10
+    },
+    'two_tags_foreign_top100': {
+        'tags_required': ['tech', 'games'],
+        'audience_target': {'country': 'US', 'age_range': [18, 35]},
+        'budget_cents': 500000, 'top_k': 100
+    },
+    'no_tags_top1000': {
+        'tags_required': [],
+        'audience_target': {'country': 'PT', 'age_range': [30, 50]},
+        'budget_cents': 5000000, 'top_k': 1000
+    }
+}
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Mediana/p95 em ms e throughput (operações por segundo pela mediana)"""
+    ordered = sorted(samples)
+    median = statistics.median(ordered)
+    return {
+        'p50_ms': round(median * 1000, 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 3),
+        'ops_per_s': round(1 / median, 2) if median else None
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Tuple[Dict[str, float], Any]:
+    """Tempos de repeat execuções e pico de memória de uma execução extra"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = summarize(samples)
+    stats['peak_mb'] = round(peak / 2 ** 20, 2)
+    return stats, result
+
+
+def prepare_database(size: int, seed: int, data_dir: str) -> str:
+    """Banco com size criadores (reaproveitado entre execuções com a mesma seed)"""
+    path = os.path.join(data_dir, f"bench-{size}-{seed}.db")
+    if not os.path.exists(path):
+        target = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=target)
+        run_migrations(target)
+        bulk_seed(target, creators=size, deals=size // 10, seed=seed)
+        target.dispose()
+    return path
+
+
+def bench_stages(catalog: CreatorCatalog, campaign: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    """Estágios do backend vetorizado medidos separadamente"""
+    weights = RecommendationEngine.WEIGHTS
+    top_k = campaign['top_k']
+    engine = VectorizedRecommendationEngine(None, catalog=catalog, ranking='exhaustive')
+
+    scoring, scores = measure(lambda: catalog.score(campaign, weights), repeat)
+    ranking, rows = measure(lambda: select_top_k(np.round(scores['total'], 3), top_k), repeat)
+    selected = {key: values[rows] for key, values in scores.items()}
+    response, _ = measure(lambda: engine.build_catalog_recommendations(catalog, rows, selected, campaign), repeat)
+    return {'scoring': scoring, 'ranking': ranking, 'response': response}
+
+
+def bench_engines(db, catalog: CreatorCatalog, creator_rows: List[Any], campaign: Dict[str, Any],
+                  repeat: int, python_max: int) -> Dict[str, Any]:
+    """get_recommendations completo por backend"""
+    top_k = campaign['top_k']
+    results = {}
+    for ranking in VectorizedRecommendationEngine.RANKING_MODES:
+        engine = VectorizedRecommendationEngine(None, catalog=catalog, ranking=ranking)
+        stats, _ = measure(lambda: engine.get_recommendations(campaign, top_k=top_k), repeat)
+        stats['creators_scored'] = engine.creators_scored
+        results[f'vectorized_{ranking}'] = stats
+    if len(catalog) <= python_max:
+        engine = RecommendationEngine(db, creators=creator_rows)
+        stats, _ = measure(lambda: engine.get_recommendations(campaign, top_k=top_k), max(1, repeat // 3))
+        results['python'] = stats
+    return results
+
+
+def bench_endpoint(session_factory, campaign: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    """POST /recommendations em processo, com o cache de resultados desligado"""
+    from fastapi.testclient import TestClient
+    from app.cache import recommendation_cache
+    from app.database import get_db
+    from app.main import app
+    from app.snapshot import snapshot_store
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    max_size = recommendation_cache.max_size
+    recommendation_cache.max_size = 0
+    snapshot_store.invalidate()
+    body = {
+        'campaign': {
+            'goal': 'installs',
+            'tags_required': campaign['tags_required'],
+            'audience_target': campaign['audience_target'],
+            'budget_cents': campaign['budget_cents'],
+            'deadline': '2030-12-31'
+        },
+        'top_k': campaign['top_k'],
+        'diversity': False
+    }
+    try:
+        client = TestClient(app)
+        start = time.perf_counter()
+        client.post('/recommendations', json=body).raise_for_status()  # Constrói o snapshot
+        cold_ms = round((time.perf_counter() - start) * 1000, 3)
+        stats, _ = measure(lambda: client.post('/recommendations', json=body).raise_for_status(), repeat)
+        stats['cold_request_ms'] = cold_ms
+        return stats
+    finally:
+        recommendation_cache.max_size = max_size
+        app.dependency_overrides.pop(get_db, None)
+        snapshot_store.invalidate()
+
+
+def bench_size(size: int, args) -> Dict[str, Any]:
+    print(f"Catálogo com {size} criadores...", file=sys.stderr)
+    started = time.perf_counter()
+    path = prepare_database(size, args.seed, args.data_dir)
+    generation_s = round(time.perf_counter() - started, 2)
+
+    target = create_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(bind=target)
+    db = session_factory()
+    try:
+        repeat = max(1, args.repeat if size < 1000000 else args.repeat // 3)
+        db_load, rows = measure(lambda: db.execute(select(*SNAPSHOT_COLUMNS).order_by(Creator.id)).all(), 1)
+        catalog_build, catalog = measure(lambda: CreatorCatalog.from_creators(rows), 1)
+        creator_rows = catalog.rows() if size <= args.python_max else []
+
+        campaigns = {}
+        for name, campaign in CAMPAIGN_SHAPES.items():
+            campaigns[name] = {
+                'top_k': campaign['top_k'],
+                'stages': bench_stages(catalog, campaign, repeat),
+                'engines': bench_engines(db, catalog, creator_rows, campaign, repeat, args.python_max)
+            }
+            if not args.skip_endpoint:
+                campaigns[name]['endpoint'] = bench_endpoint(session_factory, campaign, repeat)
+    finally:
+        db.close()
+        target.dispose()
+
+    return {
+        'creators': size,
+        'generation_s': generation_s,
+        'db_load': db_load,
+        'catalog_build': catalog_build,
+        'campaigns': campaigns
+    }
+
+
+def flatten(report: Dict[str, Any], prefix: str = '') -> Dict[str, float]:
+    """Métricas de tempo (p50_ms) por caminho, para comparação entre execuções"""
+    metrics = {}
+    for key, value in report.items():
+        path = f"{prefix}/{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            metrics.update(flatten(value, path))
+        elif key == 'p50_ms':
+            metrics[path] = value
+    return metrics
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any], tolerance: float) -> List[str]:
+    """Métricas que ficaram mais lentas que a execução anterior além da tolerância"""
+    before = {f"{r['creators']}/{k}": v for r in previous['results'] for k, v in flatten(r).items()}
+    after = {f"{r['creators']}/{k}": v for r in current['results'] for k, v in flatten(r).items()}
+    regressions = []
+    for name, value in sorted(after.items()):
+        old = before.get(name)
+        if old and value > old * (1 + tolerance):
+            regressions.append(f"{name}: {old}ms -> {value}ms (+{(value / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de recomendação")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--python-max", type=int, default=100000,
+                        help="Maior catálogo pontuado também pelo backend por criador")
+    parser.add_argument("--skip-endpoint", action="store_true")
+    parser.add_argument("--data-dir", default=tempfile.gettempdir())
+    parser.add_argument("--output", default=f"bench-pipeline-{datetime.now():%Y%m%d-%H%M%S}.json")
+    parser.add_argument("--compare", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Regressão aceita (fração)")
+    args = parser.parse_args()
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'endpoint_backend': os.getenv('SCORING_BACKEND', 'vectorized'),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'results': [bench_size(size, args) for size in args.sizes]
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados salvos em {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSÃO {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Benchmark: seleção de portfólio sob orçamento (latência e qualidade vs ótimo exato)
+"""
+Latência de VectorizedRecommendationEngine.get_portfolio sobre um catálogo
+sintético em memória (100k criadores por padrão), para vários orçamentos,
+com e sem limite por tag, comparada a um orçamento de latência (p95; com
+milhares de escolhidos o custo passa a ser montar as explicações). Qualidade:
+razão entre o score total do PortfolioSolver e o ótimo exato (branch and
+bound) em instâncias pequenas aleatórias, com e sem limites por tag.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_portfolio
+    python -m benchmarks.bench_portfolio --creators 200000 --budget-ms 150 --instances 500
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import numpy as np
+from app.portfolio import PortfolioSolver, TagCaps, exact_portfolio
+from app.recommendation_engine import VectorizedRecommendationEngine
+from .bench_diversity import random_campaign, synthetic_catalog
+
+BUDGETS = (100000, 1000000, 10000000, 100000000)
+TAGS = ('fintech', 'games', 'fitness', 'beleza', 'viagem', 'culinaria')
+
+
+def latency(catalog, campaign, budget: int, caps: TagCaps, repeat: int, budget_ms: float):
+    engine = VectorizedRecommendationEngine(None, catalog=catalog)
+    data = {**campaign, 'budget_cents': budget}
+    engine.get_portfolio(data, caps=caps)
+    samples = []
+    for _ in range(repeat):
+        catalog.clear_components()
+        start = time.perf_counter()
+        recommendations, summary = engine.get_portfolio(data, caps=caps)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'budget_cents': budget,
+        'max_per_tag': caps.default,
+        'chosen': len(recommendations),
+        'p50_ms': round(statistics.median(samples), 2),
+        'p95_ms': round(samples[int(0.95 * (len(samples) - 1))], 2),
+        'within_budget': samples[int(0.95 * (len(samples) - 1))] <= budget_ms,
+        'optimality_gap': summary['optimality_gap'],
+        'swaps': summary['swaps']
+    }
+
+
+def quality(instances: int, size: int, seed: int, caps: TagCaps):
+    rng = random.Random(seed)
+    ratios = []
+    for _ in range(instances):
+        values = np.round(np.array([rng.random() for _ in range(size)]), 3)
+        prices = np.array([rng.randint(1000, 100000) for _ in range(size)], dtype=np.int64)
+        tags = [rng.sample(TAGS, rng.randint(1, 2)) for _ in range(size)]
+        budget = int(prices.sum() * rng.uniform(0.1, 0.5))
+        positions = {tag: np.array([i for i, t in enumerate(tags) if tag in t], dtype=np.int64) for tag in TAGS}
+
+        solver = PortfolioSolver(values, prices, budget, caps, tags_of=tags.__getitem__,
+                                 positions_with=lambda tag: positions.get(tag, np.zeros(0, dtype=np.int64)))
+        chosen = solver.solve()
+        assert prices[chosen].sum() <= budget
+        for tag in TAGS:
+            assert caps.limit(tag) is None or sum(tag in tags[i] for i in chosen) <= caps.limit(tag)
+        optimum, _ = exact_portfolio(values.tolist(), prices.tolist(), budget, tags, caps)
+        ratios.append(float(values[chosen].sum()) / optimum if optimum else 1.0)
+    return {
+        'instances': instances,
+        'size': size,
+        'max_per_tag': caps.default,
+        'mean_ratio': round(statistics.mean(ratios), 4),
+        'min_ratio': round(min(ratios), 4),
+        'optimal_share': round(sum(r >= 1 - 1e-9 for r in ratios) / len(ratios), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfólio sob orçamento: latência e qualidade")
+    parser.add_argument("--creators", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Orçamento de latência (p95)")
+    parser.add_argument("--instances", type=int, default=200)
+    parser.add_argument("--size", type=int, default=18, help="Criadores por instância do ótimo exato")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    catalog = synthetic_catalog(args.creators, args.seed)
+    campaign = random_campaign(random.Random(args.seed))
+    results = [
+        latency(catalog, campaign, budget, TagCaps(default=cap), args.repeat, args.budget_ms)
+        for budget in BUDGETS for cap in (None, 3)
+    ]
+    print(json.dumps({
+        'creators': args.creators,
+        'latency_budget_ms': args.budget_ms,
+        'latency': results,
+        'quality': [quality(args.instances, args.size, args.seed, TagCaps(default=cap)) for cap in (None, 2)]
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Benchmark: serialização orjson direta vs modelos Pydantic + response_model
+"""
+Mede POST /recommendations em processo (TestClient, cache desligado) com o
+caminho rápido (dicts do engine → orjson) e com o caminho validado
+(CreatorRecommendation/RecommendationResponse + validação do response_model),
+para top_k 10, 100 e 1000 sobre um catálogo sintético em memória. Também
+separa o custo de montar a resposta fora do HTTP.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --creators 200000 --top-k 10 100 1000 5000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from fastapi.testclient import TestClient
+from app.cache import recommendation_cache
+from app.main import app
+from app.recommendation_engine import VectorizedRecommendationEngine
+from app.routers import recommendations as router
+from app.schemas import RecommendationMetadata, RecommendationResponse
+from app.serialization import dumps, response_payload
+from app.snapshot import CatalogSnapshot
+from .bench_diversity import random_campaign, synthetic_catalog
+
+
+def median_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialização rápida vs validada")
+    parser.add_argument("--creators", type=int, default=100000)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    catalog = synthetic_catalog(args.creators, args.seed)
+    campaign = random_campaign(random.Random(args.seed))
+    snapshot = CatalogSnapshot(catalog, None, version=-1)
+
+    async def fixed_snapshot(db):
+        return snapshot
+
+    # Sem banco: o endpoint atende pelo snapshot sintético
+    router.current_snapshot = fixed_snapshot
+    recommendation_cache.max_size = 0
+    client = TestClient(app)
+
+    report = {'creators': args.creators, 'results': []}
+    for top_k in args.top_k:
+        engine = VectorizedRecommendationEngine(None, catalog=catalog, ranking='exhaustive')
+        fast_engine = VectorizedRecommendationEngine(None, catalog=catalog, ranking='exhaustive')
+        fast_engine.as_dicts = True
+
+        def build_validated():
+            response = RecommendationResponse(
+                recommendations=engine.get_recommendations(campaign, top_k),
+                metadata=RecommendationMetadata(total_creators=len(catalog), creators_scored=engine.creators_scored)
+            )
+            return RecommendationResponse.model_validate(response.model_dump()).model_dump_json()
+
+        def build_fast():
+            recommendations = fast_engine.get_recommendations(campaign, top_k)
+            return dumps(response_payload(recommendations, len(catalog), fast_engine.creators_scored))
+
+        body = {
+            'campaign': {**campaign, 'goal': 'installs', 'deadline': '2030-12-31'},
+            'top_k': top_k,
+            'diversity': False
+        }
+
+        def post():
+            client.post('/recommendations', json=body).raise_for_status()
+
+        result = {
+            'top_k': top_k,
+            'engine_only_ms': median_ms(lambda: fast_engine.get_recommendations(campaign, top_k), args.repeat),
+            'build_validated_ms': median_ms(build_validated, args.repeat),
+            'build_fast_ms': median_ms(build_fast, args.repeat)
+        }
+        for fast in (False, True):
+            router.FAST_SERIALIZATION = fast
+            post()
+            result['endpoint_fast_ms' if fast else 'endpoint_validated_ms'] = median_ms(post, args.repeat)
+        result['endpoint_speedup'] = round(result['endpoint_validated_ms'] / result['endpoint_fast_ms'], 2)
+        report['results'].append(result)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Benchmark: latência do scoring particionado por número de processos
+"""
+Compara o backend vetorizado (um processo) com o particionado em 1..N
+processos sobre um catálogo sintético em memória, conferindo que os
+resultados são idênticos.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_sharding
+    python -m benchmarks.bench_sharding --creators 2000000 --processes 1 2 4 8
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from app.recommendation_engine import ShardedRecommendationEngine, VectorizedRecommendationEngine
+from app.sharding import ShardedScorer
+from .bench_diversity import random_campaign, synthetic_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência do scoring particionado")
+    parser.add_argument("--creators", type=int, default=1000000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--campaigns", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ranking", choices=VectorizedRecommendationEngine.RANKING_MODES, default="exhaustive")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    catalog = synthetic_catalog(args.creators, args.seed)
+    rng = random.Random(args.seed)
+    campaigns = [random_campaign(rng) for _ in range(args.campaigns)]
+
+    def run(engine):
+        samples, results = [], []
+        for campaign in campaigns:
+            start = time.perf_counter()
+            results.append(engine.get_recommendations(campaign, top_k=args.top_k))
+            samples.append((time.perf_counter() - start) * 1000)
+        return round(statistics.median(samples), 2), results
+
+    baseline_ms, expected = run(VectorizedRecommendationEngine(None, catalog=catalog, ranking=args.ranking))
+    report = {
+        'creators': args.creators,
+        'ranking': args.ranking,
+        'cpu_count': os.cpu_count(),
+        'single_process_p50_ms': baseline_ms,
+        'sharded': []
+    }
+
+    for processes in sorted(set(args.processes)):
+        scorer = ShardedScorer(processes=processes, min_rows=1)
+        try:
+            engine = ShardedRecommendationEngine(None, catalog=catalog, ranking=args.ranking, scorer=scorer)
+            engine.get_recommendations(campaigns[0], top_k=args.top_k)  # Inicia processos e mapeia o catálogo
+            p50_ms, results = run(engine)
+        finally:
+            scorer.shutdown()
+        report['sharded'].append({
+            'processes': processes,
+            'p50_ms': p50_ms,
+            'speedup': round(baseline_ms / p50_ms, 2) if p50_ms else None,
+            'identical': results == expected
+        })
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# Teste de carga: latência de /health enquanto /recommendations está saturado
+"""
+Mede a latência de GET /health sozinho e depois com N clientes disparando
+POST /recommendations sem parar. Se o event loop não estiver bloqueado, o
+p99 de /health deve permanecer praticamente igual nas duas fases: o
+relatório traz a razão saturado/ocioso e falha (exit 1) acima de
+--max-p99-ratio. Respostas 503 (descarte de carga) são contadas à parte.
+
+Uso (na raiz do projeto, com o banco populado por seeds.py):
+    python -m benchmarks.load_health                          # app em processo
+    python -m benchmarks.load_health --url http://localhost:8000 --output load-health.json
+
+Resultado registrado em benchmarks/results/load_health.json.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import httpx
+
+TAGS = ["fintech", "investimentos", "fitness", "corrida", "skincare", "beleza", "tech", "games"]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max em milissegundos"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        'count': len(ordered),
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': round(ordered[-1] * 1000, 2),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 2)
+    }
+
+
+def random_request() -> dict:
+    """Brief aleatório (orçamento variável para não cair no cache)"""
+    return {
+        "campaign": {
+            "goal": "installs",
+            "tags_required": random.sample(TAGS, 2),
+            "audience_target": {"country": "BR", "age_range": [18, random.randint(25, 50)]},
+            "budget_cents": random.randint(100000, 5000000),
+            "deadline": "2025-12-31"
+        },
+        "top_k": 10
+    }
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> List[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def hammer_recommendations(client: httpx.AsyncClient, stop: asyncio.Event,
+                                 shed: List[int]) -> List[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.post("/recommendations", json=random_request())
+        if response.status_code == 503:
+            shed.append(1)
+            continue
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_phase(client: httpx.AsyncClient, duration: float, concurrency: int,
+                    interval: float) -> Dict[str, Dict[str, float]]:
+    stop = asyncio.Event()
+    shed: List[int] = []
+    health = asyncio.create_task(probe_health(client, stop, interval))
+    workers = [asyncio.create_task(hammer_recommendations(client, stop, shed)) for _ in range(concurrency)]
+
+    await asyncio.sleep(duration)
+    stop.set()
+
+    recommendations = [latency for result in await asyncio.gather(*workers) for latency in result]
+    result = {'health': percentiles(await health)}
+    if concurrency:
+        result['recommendations'] = percentiles(recommendations)
+        result['recommendations']['throughput_rps'] = round(len(recommendations) / duration, 1)
+        result['recommendations']['shed'] = len(shed)
+    return result
+
+
+async def main(url: Optional[str], duration: float, concurrency: int, interval: float,
+               output: Optional[str], max_p99_ratio: float):
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=60)
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=60)
+
+    async with client:
+        idle = await run_phase(client, duration, 0, interval)
+        saturated = await run_phase(client, duration, concurrency, interval)
+
+    ratio = round(saturated['health']['p99_ms'] / max(idle['health']['p99_ms'], 0.01), 2)
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'target': url or 'in-process',
+        'duration_s': duration,
+        'concurrency': concurrency,
+        'idle': idle,
+        'saturated': saturated,
+        'health_p99_ratio': ratio,
+        'max_p99_ratio': max_p99_ratio,
+        'passed': ratio <= max_p99_ratio
+    }
+
+    print(json.dumps(report, indent=2))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados salvos em {output}", file=sys.stderr)
+    if not report['passed']:
+        print(f"REGRESSÃO p99 de /health {ratio}x o ocioso (limite {max_p99_ratio}x)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="URL de um servidor em execução (padrão: app em processo)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Segundos por fase")
+    parser.add_argument('--concurrency', type=int, default=32, help="Clientes simultâneos em /recommendations")
+    parser.add_argument('--interval', type=float, default=0.01, help="Intervalo entre probes de /health")
+    parser.add_argument('--output', help="Grava o relatório JSON neste arquivo")
+    parser.add_argument('--max-p99-ratio', type=float, default=3.0,
+                        help="Razão máxima aceita entre o p99 de /health saturado e ocioso")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.duration, args.concurrency, args.interval, args.output, args.max_p99_ratio))
@@ -1,10 +1,27 @@
 # Script para popular o banco com dados fictícios
+"""
+Uso:
+    python seeds.py                                   # 100 criadores (desenvolvimento)
+    python seeds.py --creators 1000000 --deals 200000 # carga em lotes via Core
+    python seeds.py --creators 5000000 --snapshot catalog.bin   # direto para o arquivo do catálogo
+"""
+import argparse
 import json
 import random
+import time
 from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
-from app.database import SessionLocal, init_db
-from app.models import Creator, Campaign, PastDeal
+from app.catalog import CreatorCatalog, CreatorRow
+from app.catalog_file import write_catalog_file
+from app.database import SessionLocal, engine, init_db
+from app.deal_stats import DealStatsAccumulator, rebuild_deal_stats
+from app.features import AGE_MAX, FEATURE_VERSION, performance_feature, reliability_feature
+from app.migrations import run_migrations
+from app.models import Base, Creator, CreatorDealStats, Campaign, PastDeal, creator_countries, creator_tags
 
 # Dados fictícios para seeds
 TAGS_POOL = [
@@ -41,24 +58,29 @@ CREATOR_SURNAMES = [
     "Correia", "Martins", "Araújo", "Costa", "Nunes", "Castro", "Machado", "Torres"
 ]
 
-def generate_creator_data():
+def unique_name(rng: random.Random, next_suffix: Dict[str, int]) -> str:
+    """
+    Nome + sobrenome; repetições ganham sufixo numérico. next_suffix guarda o
+    próximo sufixo livre de cada nome base, então cada nome custa O(1)
+    (mesmos nomes de antes: "Ana Silva", "Ana Silva 1", "Ana Silva 2", ...)
+    """
+    first_name = rng.choice(CREATOR_BASE_NAMES)
+    surname = rng.choice(CREATOR_SURNAMES)
+    base_name = f"{first_name} {surname}"
+
+    counter = next_suffix.get(base_name, 0)
+    next_suffix[base_name] = counter + 1
+    return f"{base_name} {counter}" if counter else base_name
+
+def generate_creator_data(num_creators: int = 100):
     """Gera dados fictícios para criadores"""
     creators = []
+    used_names: Dict[str, int] = {}
     
-    # Gerar 100 criadores combinando nomes e sobrenomes
-    num_creators = 100
+    # Gerar criadores combinando nomes e sobrenomes
     for i in range(num_creators):
         # Gerar nome único combinando primeiro nome + sobrenome
-        first_name = random.choice(CREATOR_BASE_NAMES)
-        surname = random.choice(CREATOR_SURNAMES)
-        name = f"{first_name} {surname}"
-        
-        # Se já existe, adicionar número
-        base_name = name
-        counter = 1
-        while any(creator.name == name for creator in creators):
-            name = f"{base_name} {counter}"
-            counter += 1
+        name = unique_name(random, used_names)
             
         # Tags (2-5 tags aleatórias)
         num_tags = random.randint(2, 5)
@@ -106,54 +128,54 @@ def generate_creator_data():
     
     return creators
 
+CAMPAIGN_CONFIGS = [
+    {
+        "brand": "NuBank",
+        "goal": "installs",
+        "tags": ["fintech", "investimentos"],
+        "country": "BR",
+        "age_range": [25, 45],
+        "budget": 1000000  # R$ 10.000
+    },
+    {
+        "brand": "Nike",
+        "goal": "awareness",
+        "tags": ["fitness", "corrida"],
+        "country": "BR", 
+        "age_range": [18, 35],
+        "budget": 2000000  # R$ 20.000
+    },
+    {
+        "brand": "Natura",
+        "goal": "sales",
+        "tags": ["skincare", "beleza"],
+        "country": "BR",
+        "age_range": [20, 40],
+        "budget": 800000  # R$ 8.000
+    },
+    {
+        "brand": "Apple",
+        "goal": "awareness",
+        "tags": ["tech", "smartphones"],
+        "country": "BR",
+        "age_range": [22, 50],
+        "budget": 5000000  # R$ 50.000
+    },
+    {
+        "brand": "Netflix", 
+        "goal": "subscriptions",
+        "tags": ["entretenimento", "streaming"],
+        "country": "BR",
+        "age_range": [16, 45],
+        "budget": 1500000  # R$ 15.000
+    }
+]
+
 def generate_campaign_data():
     """Gera dados fictícios para campanhas"""
     campaigns = []
     
-    campaign_configs = [
-        {
-            "brand": "NuBank",
-            "goal": "installs",
-            "tags": ["fintech", "investimentos"],
-            "country": "BR",
-            "age_range": [25, 45],
-            "budget": 1000000  # R$ 10.000
-        },
-        {
-            "brand": "Nike",
-            "goal": "awareness",
-            "tags": ["fitness", "corrida"],
-            "country": "BR", 
-            "age_range": [18, 35],
-            "budget": 2000000  # R$ 20.000
-        },
-        {
-            "brand": "Natura",
-            "goal": "sales",
-            "tags": ["skincare", "beleza"],
-            "country": "BR",
-            "age_range": [20, 40],
-            "budget": 800000  # R$ 8.000
-        },
-        {
-            "brand": "Apple",
-            "goal": "awareness",
-            "tags": ["tech", "smartphones"],
-            "country": "BR",
-            "age_range": [22, 50],
-            "budget": 5000000  # R$ 50.000
-        },
-        {
-            "brand": "Netflix", 
-            "goal": "subscriptions",
-            "tags": ["entretenimento", "streaming"],
-            "country": "BR",
-            "age_range": [16, 45],
-            "budget": 1500000  # R$ 15.000
-        }
-    ]
-    
-    for config in campaign_configs:
+    for config in CAMPAIGN_CONFIGS:
         deadline = datetime.now() + timedelta(days=random.randint(30, 90))
         
         campaign = Campaign(
@@ -209,27 +231,23 @@ def seed_database():
         if existing_creators > 0:
             print(f"Banco já possui {existing_creators} criadores. Limpando dados existentes...")
             db.query(PastDeal).delete()
+            db.query(CreatorDealStats).delete()
             db.query(Campaign).delete()
+            db.execute(creator_tags.delete())  # Exclusão em massa não dispara eventos do ORM
+            db.execute(creator_countries.delete())
             db.query(Creator).delete()
             db.commit()
         
         print("Gerando criadores fictícios...")
         creators = generate_creator_data()
         db.add_all(creators)
-        db.commit()
-        
-        # Refresh para obter IDs
-        for creator in creators:
-            db.refresh(creator)
         
         print("Gerando campanhas fictícias...")
         campaigns = generate_campaign_data()
         db.add_all(campaigns)
-        db.commit()
         
-        # Refresh para obter IDs
-        for campaign in campaigns:
-            db.refresh(campaign)
+        # Flush atribui os IDs sem recarregar cada linha; tudo em uma transação
+        db.flush()
         
         print("Gerando histórico de deals...")
         deals = generate_past_deals(creators, campaigns)
@@ -247,5 +265,205 @@ def seed_database():
     finally:
         db.close()
 
+# Gerador escalável (milhões de linhas): streaming em lotes, sem objetos ORM
+
+# Linhas por transação/executemany
+SEED_CHUNK_SIZE = 50000
+
+EXTRA_COUNTRIES = ["US", "PT", "ES", "AR", "MX"]
+
+def _age_probabilities() -> np.ndarray:
+    """Distribuição de idades da audiência por idade central (normal, desvio 8, truncada em 16-65)"""
+    ages = np.arange(AGE_MAX + 1)
+    table = np.zeros((46, AGE_MAX + 1))
+    for base_age in range(18, 46):
+        weights = np.exp(-0.5 * ((ages - base_age) / 8) ** 2)
+        weights[(ages < 16) | (ages > 65)] = 0
+        table[base_age] = weights / weights.sum()
+    return table
+
+def iter_creator_rows(count: int, seed: int = 42, start_id: int = 1) -> Iterator[Dict[str, Any]]:
+    """
+    Gera criadores determinísticos (mesma seed, mesmas linhas) como dicts
+    prontos para insert em massa. Idades são amostradas como contagens
+    multinomiais direto na distribuição acumulada; as features
+    materializadas são calculadas aqui (inserts Core não disparam eventos).
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    age_probabilities = _age_probabilities()
+    used_names: Dict[str, int] = {}
+    now = datetime.utcnow()
+
+    for creator_id in range(start_id, start_id + count):
+        base_age = rng.randint(18, 45)
+        age_cdf = np.cumsum(np_rng.multinomial(rng.randint(100, 1000), age_probabilities[base_age]))
+
+        locations = ["BR"]
+        if rng.random() < 0.3:
+            locations.extend(rng.sample(EXTRA_COUNTRIES, rng.randint(1, 2)))
+
+        avg_views = rng.randint(5000, 500000)
+        ctr = rng.uniform(0.005, 0.08)
+        cvr = rng.uniform(0.001, 0.05)
+        price_min = rng.randint(50000, 2000000)
+        reliability = rng.uniform(0.6, 1.0)
+
+        yield {
+            'id': creator_id,
+            'name': unique_name(rng, used_names),
+            'tags': rng.sample(TAGS_POOL, rng.randint(2, 5)),
+            'audience_age_cdf': age_cdf.tolist(),
+            'audience_location': locations,
+            'avg_views': avg_views,
+            'ctr': ctr,
+            'cvr': cvr,
+            'price_min': price_min,
+            'price_max': int(price_min * rng.uniform(1.2, 3.0)),
+            'reliability_score': reliability,
+            'performance_feature': performance_feature(avg_views, ctr, cvr),
+            'reliability_feature': reliability_feature(reliability),
+            'feature_version': FEATURE_VERSION,
+            'created_at': now,
+            'updated_at': now
+        }
+
+def iter_deal_rows(count: int, creator_ids: range, campaign_ids: List[int],
+                   seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Gera deals determinísticos distribuídos entre os criadores e campanhas"""
+    rng = random.Random(seed + 1)
+    now = datetime.utcnow()
+    for _ in range(count):
+        yield {
+            'creator_id': rng.choice(creator_ids),
+            'campaign_id': rng.choice(campaign_ids),
+            'delivered_on_time': rng.random() < 0.8,
+            'performance_score': rng.random(),
+            'created_at': now - timedelta(minutes=rng.randint(0, 525600))
+        }
+
+def _chunks(rows: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _report(label: str, rows: int, started: float):
+    elapsed = time.perf_counter() - started
+    print(f"   - {rows} {label} em {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} linhas/s)")
+
+def bulk_seed(target: Engine, creators: int, deals: int, seed: int = 42,
+              chunk_size: int = SEED_CHUNK_SIZE):
+    """
+    Popula o banco com inserts Core (executemany), um lote grande por
+    transação, sem hidratar objetos ORM nem recarregar linhas
+    """
+    with target.begin() as conn:
+        for table in (PastDeal.__table__, CreatorDealStats.__table__, Campaign.__table__,
+                      creator_tags, creator_countries, Creator.__table__):
+            conn.execute(table.delete())
+
+    started = time.perf_counter()
+    for chunk in _chunks(iter_creator_rows(creators, seed), chunk_size):
+        with target.begin() as conn:
+            conn.execute(insert(Creator.__table__), chunk)
+            conn.execute(insert(creator_tags), [
+                {'creator_id': row['id'], 'tag': tag} for row in chunk for tag in row['tags']
+            ])
+            conn.execute(insert(creator_countries), [
+                {'creator_id': row['id'], 'country': country} for row in chunk for country in row['audience_location']
+            ])
+    _report("criadores", creators, started)
+
+    rng = random.Random(seed)
+    with target.begin() as conn:
+        campaign_ids = [
+            conn.execute(insert(Campaign.__table__).values(
+                brand=config["brand"], goal=config["goal"], tags_required=config["tags"],
+                audience_target={"country": config["country"], "age_range": config["age_range"]},
+                budget_cents=config["budget"], deadline=datetime.utcnow() + timedelta(days=rng.randint(30, 90)),
+                created_at=datetime.utcnow()
+            )).inserted_primary_key[0]
+            for config in CAMPAIGN_CONFIGS
+        ]
+
+    started = time.perf_counter()
+    if creators:
+        for chunk in _chunks(iter_deal_rows(deals, range(1, creators + 1), campaign_ids, seed), chunk_size):
+            with target.begin() as conn:
+                conn.execute(insert(PastDeal.__table__), chunk)
+        _report("deals", deals, started)
+
+        # Inserts Core não disparam os eventos: agregados de deals em lote
+        started = time.perf_counter()
+        rebuild_deal_stats(target, chunk_size)
+        _report("deals agregados", deals, started)
+
+def write_snapshot(path: str, creators: int, seed: int = 42, chunk_size: int = SEED_CHUNK_SIZE,
+                   deals: int = 0):
+    """
+    Gera os criadores direto no arquivo binário do catálogo (sem banco);
+    com deals, a confiabilidade inclui o mesmo histórico gerado por bulk_seed
+    """
+    started = time.perf_counter()
+    history = DealStatsAccumulator(creators + 1)
+    if creators:
+        campaign_ids = list(range(1, len(CAMPAIGN_CONFIGS) + 1))
+        for chunk in _chunks(iter_deal_rows(deals, range(1, creators + 1), campaign_ids, seed), chunk_size):
+            history.add(
+                np.array([row['creator_id'] for row in chunk]),
+                np.array([row['delivered_on_time'] for row in chunk]),
+                np.array([row['performance_score'] for row in chunk])
+            )
+
+    fields = CreatorRow._fields
+    parts: List[CreatorCatalog] = []
+    tag_vocab: Optional[Dict[str, int]] = None
+    country_vocab: Optional[Dict[str, int]] = None
+    for chunk in _chunks(iter_creator_rows(creators, seed), chunk_size):
+        for row in chunk:
+            row['reliability_feature'] = reliability_feature(row['reliability_score'], *history.history(row['id']))
+        rows = [CreatorRow(**{name: row[name] for name in fields}) for row in chunk]
+        part = CreatorCatalog.from_creators(rows, tag_vocab, country_vocab)
+        tag_vocab, country_vocab = part.tag_vocab, part.country_vocab
+        parts.append(part)
+    if parts:
+        write_catalog_file(CreatorCatalog.concatenate(parts), path, {'seed': seed})
+    _report(f"criadores gravados em {path}", creators, started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula o banco (ou o arquivo do catálogo) com dados fictícios")
+    parser.add_argument("--creators", type=int, help="Número de criadores (gerador em lotes)")
+    parser.add_argument("--deals", type=int, default=0, help="Número de deals históricos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=SEED_CHUNK_SIZE)
+    parser.add_argument("--database-url", help="Banco de destino (padrão: o da aplicação)")
+    parser.add_argument("--snapshot", help="Grava o arquivo do catálogo em vez do banco")
+    args = parser.parse_args()
+
+    if args.creators is None and not args.snapshot:
+        seed_database()
+        return
+
+    creators = args.creators if args.creators is not None else 100
+    print(f"Gerando {creators} criadores (seed {args.seed})...")
+    if args.snapshot:
+        write_snapshot(args.snapshot, creators, args.seed, args.chunk_size, args.deals)
+        return
+
+    if args.database_url:
+        target = create_engine(args.database_url)
+        Base.metadata.create_all(bind=target)
+        run_migrations(target)
+    else:
+        init_db()
+        target = engine
+    bulk_seed(target, creators, args.deals, args.seed, args.chunk_size)
+    print("✅ Banco populado com sucesso!")
+
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    main()
\ No newline at end of file
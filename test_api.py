@@ -3,10 +3,13 @@ import pytest
 import json
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models import Base, Creator, Campaign
+from app.recommendation_engine import RecommendationEngine, VectorizedRecommendationEngine
 import tempfile
 import os
 
@@ -22,7 +25,16 @@ def override_get_db():
     finally:
         db.close()
 
+# NullPool: o TestClient cria um event loop por requisição
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 
 client = TestClient(app)
 
@@ -149,5 +161,940 @@ def test_recommendations_empty_tags(setup_database):
     data = response.json()
     assert len(data["recommendations"]) == 1  # Deve retornar o criador mesmo sem tags
 
+@pytest.fixture(scope="function")
+def seeded_database():
+    """Banco de teste com o catálogo fictício de seeds.py"""
+    import random
+    from seeds import generate_creator_data
+
+    Base.metadata.create_all(bind=engine)
+    random.seed(42)
+    db = TestingSessionLocal()
+    db.add_all(generate_creator_data())
+    db.commit()
+
+    yield db
+
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+CAMPAIGNS = [
+    {
+        'tags_required': ['fintech', 'investimentos'],
+        'audience_target': {'country': 'BR', 'age_range': [25, 45]},
+        'budget_cents': 1000000
+    },
+    {
+        'tags_required': ['fitness', 'corrida', 'tag-inexistente'],
+        'audience_target': {'country': 'US', 'age_range': [18, 35]},
+        'budget_cents': 30000
+    },
+    {
+        'tags_required': [],
+        'audience_target': {'country': 'XX', 'age_range': [60, 200]},
+        'budget_cents': 5000000
+    }
+]
+
+@pytest.mark.parametrize("campaign_data", CAMPAIGNS)
+def test_vectorized_engine_matches_python_engine(seeded_database, campaign_data):
+    """Backend vetorizado deve produzir o mesmo ranking, scores e explicações do caminho por criador"""
+    from datetime import datetime
+    from app.models import PastDeal
+
+    # Histórico de deals ruim: a confiabilidade do score se afasta da cadastrada
+    campaign = Campaign(brand="Marca", goal="installs", tags_required=[], audience_target={},
+                        budget_cents=1000, deadline=datetime(2030, 1, 1))
+    seeded_database.add(campaign)
+    seeded_database.commit()
+    creators = seeded_database.query(Creator).order_by(Creator.id).limit(30).all()
+    seeded_database.add_all([
+        PastDeal(creator_id=creator.id, campaign_id=campaign.id, delivered_on_time=False, performance_score=0.1)
+        for creator in creators for _ in range(5)
+    ])
+    seeded_database.commit()
+
+    expected = RecommendationEngine(seeded_database).get_recommendations(campaign_data, top_k=100)
+    actual = VectorizedRecommendationEngine(seeded_database).get_recommendations(campaign_data, top_k=100)
+    top_5 = VectorizedRecommendationEngine(seeded_database).get_recommendations(campaign_data, top_k=5)
+
+    assert [r.creator_id for r in actual] == [r.creator_id for r in expected]
+    for got, want in zip(actual, expected):
+        assert got.score == pytest.approx(want.score, abs=1e-9)
+        assert got.fit_breakdown == want.fit_breakdown
+        assert got.why == want.why
+    assert [r.creator_id for r in top_5] == [r.creator_id for r in expected[:5]]
+    stored = {str(c.id): c.reliability_score for c in creators}
+    assert any(not r.why.endswith(f"{int(stored[r.creator_id] * 10)}/10 em confiabilidade")
+               for r in expected if r.creator_id in stored)
+
+@pytest.mark.parametrize("campaign_data", CAMPAIGNS)
+@pytest.mark.parametrize("ranking", ["exhaustive", "threshold"])
+def test_hard_filters_match_filtered_full_ranking(seeded_database, campaign_data, ranking):
+    """Candidatos do banco e do catálogo equivalem a filtrar o ranking completo"""
+    filters = {'require_country': True, 'require_tag_match': True, 'max_price_factor': 1.5}
+    budget_limit = campaign_data['budget_cents'] * 1.5
+    creators = {str(c.id): c for c in seeded_database.query(Creator).all()}
+
+    def viable(creator):
+        required = set(campaign_data['tags_required'])
+        return (campaign_data['audience_target']['country'] in creator.audience_location and
+                (not required or required & set(creator.tags)) and creator.price_min <= budget_limit)
+
+    full = RecommendationEngine(seeded_database).get_recommendations(campaign_data, top_k=100)
+    expected = [r.creator_id for r in full if viable(creators[r.creator_id])][:5]
+
+    sql_engine = RecommendationEngine(seeded_database)
+    from_sql = sql_engine.get_recommendations(campaign_data, top_k=5, filters=filters)
+    vectorized = VectorizedRecommendationEngine(seeded_database, ranking=ranking)
+    from_catalog = vectorized.get_recommendations(campaign_data, top_k=5, filters=filters)
+
+    assert [r.creator_id for r in from_sql] == expected
+    assert [r.creator_id for r in from_catalog] == expected
+    assert sql_engine.creators_scored == sum(1 for c in creators.values() if viable(c))
+    assert vectorized.creators_scored <= sql_engine.creators_scored
+
+@pytest.mark.parametrize("campaign_data", CAMPAIGNS)
+def test_diversity_rerank_matches_naive_mmr(seeded_database, campaign_data):
+    """MMR incremental equivale ao MMR ingênuo e é igual nos dois backends"""
+    import numpy as np
+    from app.catalog import CreatorCatalog
+    from app.diversity import SimilarityPool, mmr_rerank
+
+    catalog = CreatorCatalog.from_creators(seeded_database.query(Creator).all())
+    relevance = np.round(catalog.score(campaign_data, RecommendationEngine.WEIGHTS)['total'], 3)
+    rows = np.argsort(-relevance, kind='stable')[:40]
+    pool = SimilarityPool(catalog, rows)
+
+    expected = []
+    for _ in range(10):
+        best, best_value = None, -np.inf
+        for j in range(len(rows)):
+            if j in expected:
+                continue
+            penalty = max((pool.similarity_to(i)[j] for i in expected), default=0.0)
+            value = 0.7 * relevance[rows[j]] - 0.3 * penalty
+            if value > best_value:
+                best, best_value = j, value
+        expected.append(best)
+
+    assert mmr_rerank(catalog, rows, relevance[rows], 10, lam=0.7).tolist() == expected
+    assert mmr_rerank(catalog, rows, relevance[rows], 10, lam=1.0).tolist() == list(range(10))
+
+    python = RecommendationEngine(seeded_database).get_recommendations(campaign_data, top_k=10, diversity=True)
+    vectorized = VectorizedRecommendationEngine(seeded_database).get_recommendations(
+        campaign_data, top_k=10, diversity=True
+    )
+    assert [r.creator_id for r in vectorized] == [r.creator_id for r in python]
+
+def test_catalog_file_roundtrip_and_atomic_swap(seeded_database, tmp_path):
+    """Arquivo compilado reproduz o catálogo via mmap e é trocado sem reiniciar"""
+    import numpy as np
+    from app.catalog import CreatorCatalog
+    from app.catalog_file import write_catalog_file
+    from app.snapshot import FileSnapshotStore
+
+    creators = seeded_database.query(Creator).all()
+    catalog = CreatorCatalog.from_creators(creators)
+    path = str(tmp_path / "catalog.bin")
+    write_catalog_file(catalog, path)
+
+    store = FileSnapshotStore(path)
+    first = store.get()
+    for name in CreatorCatalog.COLUMNS:
+        np.testing.assert_array_equal(getattr(first.catalog, name), getattr(catalog, name))
+    assert not first.catalog.ids.flags.writeable
+    assert first.catalog.tag_vocab == catalog.tag_vocab
+    assert store.get() is first
+
+    expected = VectorizedRecommendationEngine(None, catalog=catalog).get_recommendations(CAMPAIGNS[0], top_k=10)
+    actual = VectorizedRecommendationEngine(None, catalog=first.catalog).get_recommendations(CAMPAIGNS[0], top_k=10)
+    assert actual == expected
+
+    write_catalog_file(CreatorCatalog.from_creators(creators[:10]), path)
+    second = store.get()
+    assert len(second.catalog) == 10 and second.version > first.version
+    assert len(first.catalog) == 100 and first.catalog.ids[-1] == catalog.ids[-1]  # Mapeamento antigo segue válido
+    assert [p.name for p in tmp_path.iterdir()] == ["catalog.bin"]
+
+def test_sharded_engine_matches_single_process(seeded_database):
+    """Top-k combinado dos shards é idêntico ao do backend vetorizado em um processo"""
+    from app.catalog import CreatorCatalog
+    from app.recommendation_engine import ShardedRecommendationEngine
+    from app.sharding import ShardedScorer
+
+    catalog = CreatorCatalog.from_creators(seeded_database.query(Creator).all())
+    scorer = ShardedScorer(processes=3, min_rows=10)
+    assert len(scorer.shard_bounds(len(catalog))) == 3
+    try:
+        for ranking in VectorizedRecommendationEngine.RANKING_MODES:
+            for campaign_data in CAMPAIGNS:
+                for options in ({}, {'filters': {'max_price_factor': 1.0}}, {'diversity': True}):
+                    expected = VectorizedRecommendationEngine(None, catalog=catalog, ranking=ranking) \
+                        .get_recommendations(campaign_data, top_k=7, **options)
+                    actual = ShardedRecommendationEngine(None, catalog=catalog, ranking=ranking, scorer=scorer) \
+                        .get_recommendations(campaign_data, top_k=7, **options)
+                    assert actual == expected
+    finally:
+        scorer.shutdown()
+
+def test_bulk_seed_is_deterministic_and_matches_snapshot_file(tmp_path):
+    """Gerador em lotes: mesma seed gera o mesmo catálogo no banco e no arquivo"""
+    import numpy as np
+    from sqlalchemy import func, select
+    from app.catalog import CreatorCatalog
+    from app.catalog_file import read_catalog_file
+    from app.features import FEATURE_VERSION
+    from app.migrations import run_migrations
+    from app.models import PastDeal, creator_countries
+    from seeds import bulk_seed, write_snapshot
+
+    load_engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    Base.metadata.create_all(bind=load_engine)
+    run_migrations(load_engine)
+    bulk_seed(load_engine, creators=300, deals=50, seed=7, chunk_size=64)
+
+    session = sessionmaker(bind=load_engine)()
+    creators = session.query(Creator).order_by(Creator.id).all()
+    assert len(creators) == 300 and len({c.name for c in creators}) == 300
+    assert all(c.feature_version == FEATURE_VERSION for c in creators)
+    assert session.scalar(select(func.count()).select_from(PastDeal)) == 50
+    assert session.scalar(select(func.count()).select_from(creator_countries)) == \
+        sum(len(c.audience_location) for c in creators)
+    from_db = CreatorCatalog.from_creators(creators)
+    session.close()
+
+    path = str(tmp_path / "catalog.bin")
+    write_snapshot(path, creators=300, seed=7, chunk_size=64, deals=50)
+    from_file, _ = read_catalog_file(path)
+    for name in CreatorCatalog.COLUMNS:
+        if name not in ('tag_bits', 'country_bits'):
+            np.testing.assert_allclose(getattr(from_file, name), getattr(from_db, name))
+    assert [from_file.row(i).tags for i in range(300)] == [sorted(c.tags, key=from_file.tag_vocab.get) for c in creators]
+
+def test_age_cdf_overlap_matches_raw_ages():
+    """Consulta por soma de prefixos deve igualar a contagem sobre as idades brutas"""
+    from app.features import build_age_cdf, age_overlap_fraction
+
+    ages = [16, 18, 25, 25, 30, 34, 41, 65, 65]
+    cdf = build_age_cdf(ages)
+
+    for age_min, age_max in [(18, 34), (0, 200), (25, 25), (40, 20), (66, 90)]:
+        expected = sum(1 for age in ages if age_min <= age <= age_max) / len(ages)
+        assert age_overlap_fraction(cdf, age_min, age_max) == pytest.approx(expected)
+
+def test_migrate_audience_age_to_cdf(tmp_path):
+    """Migração converte a coluna legada audience_age e a remove"""
+    from sqlalchemy import inspect, text
+    from app.migrations import migrate_audience_age_to_cdf
+
+    legacy_engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE creators (id INTEGER PRIMARY KEY, name VARCHAR(100), audience_age JSON)"))
+        conn.execute(text("INSERT INTO creators VALUES (1, 'A', '[20, 30, 30]'), (2, 'B', NULL)"))
+
+    assert migrate_audience_age_to_cdf(legacy_engine) == 1
+
+    columns = {c['name'] for c in inspect(legacy_engine).get_columns('creators')}
+    assert 'audience_age' not in columns
+    with legacy_engine.connect() as conn:
+        cdf = json.loads(conn.execute(text("SELECT audience_age_cdf FROM creators WHERE id = 1")).scalar())
+    assert cdf[19] == 0 and cdf[20] == 1 and cdf[30] == 3 and cdf[-1] == 3
+
+def test_creator_tags_index_follows_creator_writes(setup_database):
+    """creator_tags e o índice invertido acompanham inserção, alteração e remoção"""
+    from sqlalchemy import select
+    from app.models import creator_tags
+    from app.tag_index import tag_index
+
+    db = TestingSessionLocal()
+    creator = db.query(Creator).first()
+
+    def stored_tags():
+        rows = db.execute(select(creator_tags.c.tag).where(creator_tags.c.creator_id == creator.id))
+        return {tag for (tag,) in rows}
+
+    assert stored_tags() == {"fintech", "investimentos"}
+    assert creator.id in tag_index.creators_with_any(["fintech"])
+
+    creator.tags = ["fitness"]
+    db.commit()
+    assert stored_tags() == {"fitness"}
+    assert creator.id not in tag_index.creators_with_any(["fintech", "investimentos"])
+    assert tag_index.jaccard(tag_index.masks[creator.id], tag_index.mask(["fitness", "yoga"]), 2) == 0.5
+
+    creator_id = creator.id
+    db.delete(creator)
+    db.commit()
+    assert creator_id not in tag_index.masks
+    assert not db.execute(select(creator_tags).where(creator_tags.c.creator_id == creator_id)).first()
+    db.close()
+
+def test_creator_features_materialized_and_recomputed(setup_database):
+    """Features são gravadas na escrita, lidas no scoring e recalculadas em lote quando a versão muda"""
+    from sqlalchemy import text
+    from app.feature_store import recompute_features
+    from app.features import FEATURE_VERSION, performance_feature
+
+    db = TestingSessionLocal()
+    creator = db.query(Creator).first()
+    expected = performance_feature(creator.avg_views, creator.ctr, creator.cvr)
+    assert creator.feature_version == FEATURE_VERSION
+    assert creator.performance_feature == expected
+    assert creator.reliability_feature == creator.reliability_score
+
+    creator.avg_views = 1000
+    db.commit()
+    assert creator.performance_feature == performance_feature(1000, creator.ctr, creator.cvr)
+
+    # Scoring só lê o valor materializado
+    creator.performance_feature = 0.123
+    assert RecommendationEngine(db).calculate_performance_score(creator) == 0.123
+    db.rollback()
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE creators SET feature_version = 'v0', performance_feature = 0"))
+    assert recompute_features(engine) == 1
+    assert recompute_features(engine) == 0
+
+    db.expire_all()
+    creator = db.query(Creator).first()
+    assert creator.feature_version == FEATURE_VERSION
+    assert creator.performance_feature == performance_feature(1000, creator.ctr, creator.cvr)
+    db.close()
+
+def test_deal_stats_maintained_incrementally_and_rebuilt(setup_database):
+    """Agregados de deals acompanham cada insert, batem com a reconstrução em lote e entram na confiabilidade"""
+    from datetime import datetime
+    from app.deal_stats import rebuild_deal_stats
+    from app.features import DEAL_DECAY, reliability_feature
+    from app.models import CreatorDealStats, PastDeal
+
+    db = TestingSessionLocal()
+    creator = db.query(Creator).first()
+    idle = Creator(name="Sem deals", tags=["fintech"], audience_age=[30], audience_location=["BR"],
+                   avg_views=1000, ctr=0.01, cvr=0.01, price_min=100, price_max=200, reliability_score=0.7)
+    campaign = Campaign(brand="Marca", goal="installs", tags_required=["fintech"],
+                        audience_target={"country": "BR", "age_range": [18, 40]},
+                        budget_cents=100000, deadline=datetime(2030, 1, 1))
+    db.add_all([idle, campaign])
+    db.commit()
+
+    history = [(True, 0.9), (False, 0.2), (True, 0.6), (True, 0.4)]
+    for on_time, performance in history:
+        db.add(PastDeal(creator_id=creator.id, campaign_id=campaign.id,
+                        delivered_on_time=on_time, performance_score=performance))
+        db.commit()
+
+    weights = [DEAL_DECAY ** (len(history) - 1 - i) for i in range(len(history))]
+    decayed = sum(w * p for w, (_, p) in zip(weights, history)) / sum(weights)
+    expected = reliability_feature(0.9, 4, 3, decayed)
+
+    stats = db.get(CreatorDealStats, creator.id)
+    assert (stats.deal_count, stats.on_time_count) == (4, 3)
+    assert stats.decayed_performance == pytest.approx(decayed)
+    db.expire_all()
+    assert db.get(Creator, creator.id).reliability_feature == pytest.approx(expected)
+    assert db.get(Creator, idle.id).reliability_feature == 0.7
+    assert db.get(CreatorDealStats, idle.id) is None
+
+    incremental = (stats.deal_count, stats.on_time_count, stats.decayed_sum, stats.decayed_weight)
+    assert rebuild_deal_stats(engine, chunk_size=3) == 1
+    db.expire_all()
+    stats = db.get(CreatorDealStats, creator.id)
+    assert (stats.deal_count, stats.on_time_count) == incremental[:2]
+    assert (stats.decayed_sum, stats.decayed_weight) == pytest.approx(incremental[2:])
+    assert db.get(Creator, creator.id).reliability_feature == pytest.approx(expected)
+
+    # Remover um deal recalcula os agregados do criador
+    db.delete(db.query(PastDeal).order_by(PastDeal.id.desc()).first())
+    db.commit()
+    db.expire_all()
+    assert db.get(CreatorDealStats, creator.id).deal_count == 3
+    db.close()
+
+@pytest.mark.parametrize("top_k", [0, 1, 7, 50, 500])
+def test_select_top_k_matches_stable_sort(top_k):
+    """Seleção parcial deve equivaler ao sort estável completo, inclusive em empates"""
+    import numpy as np
+    from app.catalog import select_top_k
+
+    values = np.random.default_rng(7).integers(0, 20, size=200) / 10
+    expected = sorted(range(len(values)), key=lambda i: values[i], reverse=True)[:top_k]
+    assert select_top_k(values, top_k).tolist() == expected
+
+@pytest.mark.parametrize("campaign_data", CAMPAIGNS)
+@pytest.mark.parametrize("top_k", [1, 5, 30])
+def test_threshold_ranking_matches_exhaustive(seeded_database, campaign_data, top_k):
+    """Poda por limite superior deve retornar exatamente o top-k da varredura completa"""
+    from app.catalog import CreatorCatalog
+
+    catalog = CreatorCatalog.from_creators(seeded_database.query(Creator).all())
+    exhaustive = VectorizedRecommendationEngine(seeded_database, catalog, ranking='exhaustive')
+    expected = exhaustive.get_recommendations(campaign_data, top_k)
+
+    rows, scored = catalog.top_k_threshold(campaign_data, RecommendationEngine.WEIGHTS, top_k, block_size=4)
+    assert [str(catalog.ids[i]) for i in rows] == [r.creator_id for r in expected]
+    assert scored <= len(catalog)
+
+def test_threshold_ranking_prunes_creators(seeded_database):
+    """Com tags requeridas, criadores sem tags em comum raramente precisam ser pontuados"""
+    engine = VectorizedRecommendationEngine(seeded_database, ranking='threshold')
+    engine.get_recommendations(CAMPAIGNS[0], top_k=3)
+    assert 0 < engine.creators_scored < 100
+
+def test_batch_recommendations_match_individual_requests(seeded_database):
+    """Batch deve retornar, por campanha, o mesmo resultado de requests individuais"""
+    requests = [
+        {
+            "campaign": {
+                "goal": "installs",
+                "tags_required": campaign["tags_required"],
+                "audience_target": campaign["audience_target"],
+                "budget_cents": campaign["budget_cents"],
+                "deadline": "2025-12-31"
+            },
+            "top_k": top_k
+        }
+        for campaign, top_k in zip(CAMPAIGNS, [3, 10, 1])
+    ]
+
+    response = client.post("/recommendations/batch", json={"requests": requests})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == len(requests)
+
+    for request_data, result in zip(requests, results):
+        single = client.post("/recommendations", json=request_data).json()
+        assert result["recommendations"] == single["recommendations"]
+        assert result["metadata"]["total_creators"] == 100
+
+def test_recommendation_cache_hits_and_invalidation(setup_database):
+    """Brief repetido (só muda o prazo) vem do cache; escrita em Creator invalida"""
+    from app.cache import recommendation_cache
+
+    recommendation_cache.clear()
+    request_data = {
+        "campaign": {
+            "goal": "installs",
+            "tags_required": ["investimentos", "fintech"],
+            "audience_target": {"country": "BR", "age_range": [25, 45]},
+            "budget_cents": 1000000,
+            "deadline": "2025-12-31"
+        },
+        "top_k": 5
+    }
+
+    before = client.get("/recommendations/cache/stats").json()
+    first = client.post("/recommendations", json=request_data).json()
+
+    request_data["campaign"]["deadline"] = "2026-01-31"
+    request_data["campaign"]["tags_required"] = ["fintech", "investimentos"]
+    second = client.post("/recommendations", json=request_data).json()
+    assert second == first
+
+    stats = client.get("/recommendations/cache/stats").json()
+    assert stats["hits"] == before["hits"] + 1
+    assert stats["misses"] == before["misses"] + 1
+
+    db = TestingSessionLocal()
+    db.query(Creator).first().reliability_score = 0.1
+    db.commit()
+    db.close()
+
+    third = client.post("/recommendations", json=request_data).json()
+    assert third["recommendations"][0]["score"] < first["recommendations"][0]["score"]
+    assert client.get("/recommendations/cache/stats").json()["invalidations"] == stats["invalidations"] + 1
+
+def test_recommendation_cache_lru_eviction():
+    """Cache respeita o tamanho máximo descartando a entrada menos usada"""
+    from app.cache import RecommendationCache
+
+    cache = RecommendationCache(max_size=2, ttl_seconds=60)
+    cache.put("a", 1, version=0)
+    cache.put("b", 2, version=0)
+    assert cache.get("a", version=0) == 1
+    cache.put("c", 3, version=0)
+
+    assert cache.get("b", version=0) is None
+    assert cache.get("a", version=0) == 1
+    assert cache.stats()["evictions"] == 1
+
+@pytest.mark.parametrize("campaign_data", CAMPAIGNS)
+def test_fast_serialization_matches_validated_response(seeded_database, campaign_data):
+    """Caminho orjson gera o mesmo JSON do modelo validado e mantém o schema publicado no OpenAPI"""
+    from app.schemas import RecommendationMetadata, RecommendationResponse
+    from app.serialization import dumps, response_payload
+
+    for backend in (RecommendationEngine, VectorizedRecommendationEngine):
+        fast_engine = backend(seeded_database)
+        fast_engine.as_dicts = True
+        fast = fast_engine.get_recommendations(campaign_data, top_k=50, diversity=True)
+        validated = backend(seeded_database).get_recommendations(campaign_data, top_k=50, diversity=True)
+
+        expected = RecommendationResponse(
+            recommendations=validated,
+            metadata=RecommendationMetadata(total_creators=100, creators_scored=fast_engine.creators_scored)
+        ).model_dump(mode="json")
+        assert json.loads(dumps(response_payload(fast, 100, fast_engine.creators_scored))) == expected
+
+    responses = app.openapi()["paths"]["/recommendations"]["post"]["responses"]
+    assert responses["200"]["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/RecommendationResponse"
+    }
+
+def test_stream_endpoint_exports_full_ranking_as_ndjson(seeded_database, monkeypatch):
+    """Streaming NDJSON entrega o ranking completo em blocos, com corte por score e projeção de campos"""
+    campaign = {**CAMPAIGNS[0], "goal": "installs", "deadline": "2025-12-31"}
+    expected = [
+        r.model_dump() for r in
+        VectorizedRecommendationEngine(seeded_database).get_recommendations(CAMPAIGNS[0], top_k=100)
+    ]
+
+    response = client.post("/recommendations/stream", json={"campaign": campaign, "chunk_size": 7})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == expected
+
+    response = client.post("/recommendations/stream", json={
+        "campaign": campaign, "min_score": 0.5, "fields": ["creator_id", "score"], "chunk_size": 3
+    })
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    cut = [{"creator_id": r["creator_id"], "score": r["score"]} for r in expected if r["score"] >= 0.5]
+    assert lines == cut and 0 < len(lines) < len(expected)
+
+    python_engine = RecommendationEngine(seeded_database)
+    python_engine_ranked = [r for chunk in python_engine.iter_ranked(CAMPAIGNS[0], chunk_size=10) for r in chunk]
+    assert python_engine_ranked == expected
+    python_engine_cut = [r for chunk in python_engine.iter_ranked(CAMPAIGNS[0], min_score=0.5,
+                                                                  fields=("creator_id", "score")) for r in chunk]
+    assert python_engine_cut == cut
+
+    # Falha no meio do ranking: blocos já enviados seguidos de uma linha final de erro
+    build_page = VectorizedRecommendationEngine.build_page
+
+    def failing_build_page(self, campaign_data, rows, fields=None):
+        if failing_build_page.calls:
+            raise RuntimeError("falha no bloco")
+        failing_build_page.calls += 1
+        return build_page(self, campaign_data, rows, fields)
+
+    failing_build_page.calls = 0
+    monkeypatch.setattr(VectorizedRecommendationEngine, "build_page", failing_build_page)
+    response = client.post("/recommendations/stream", json={"campaign": campaign, "chunk_size": 7})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[:-1] == expected[:7]
+    assert lines[-1] == {"error": "Erro interno: falha no bloco"}
+
+def test_cursor_pages_slice_cached_ranking(seeded_database):
+    """Páginas por cursor reproduzem o ranking completo sem novo scoring e expiram com o catálogo"""
+    campaign = {**CAMPAIGNS[0], "goal": "installs", "deadline": "2025-12-31"}
+    expected = client.post("/recommendations/stream", json={"campaign": campaign}).text.splitlines()
+    expected = [json.loads(line) for line in expected]
+
+    page = client.post("/recommendations/pages", json={"campaign": campaign, "page_size": 7}).json()
+    assert page["total_results"] == len(expected)
+    pages = [page]
+    while page["next_cursor"]:
+        page = client.get(f"/recommendations/pages/{page['next_cursor']}").json()
+        pages.append(page)
+    assert [r for p in pages for r in p["recommendations"]] == expected
+    assert len(pages) == -(-len(expected) // 7)
+
+    # O tamanho da página vem do ranking guardado: cursor forjado pedindo tudo é recusado
+    import base64
+    from app.pagination import ranking_cache
+    handle_id = base64.urlsafe_b64decode(pages[0]["next_cursor"] + "==").decode().split(":")[0]
+    forged = base64.urlsafe_b64encode(f"{handle_id}:0:{len(expected)}".encode()).decode()
+    assert client.get(f"/recommendations/pages/{forged}").status_code == 400
+
+    # Ranking maior que o cache: primeira página sem cursor, marcada como truncada
+    max_bytes = ranking_cache.max_bytes
+    ranking_cache.max_bytes = 8
+    try:
+        truncated = client.post("/recommendations/pages", json={"campaign": campaign, "page_size": 7}).json()
+    finally:
+        ranking_cache.max_bytes = max_bytes
+    assert truncated["truncated"] and truncated["next_cursor"] is None
+    assert truncated["recommendations"] == pages[0]["recommendations"]
+    assert not any(p["truncated"] for p in pages)
+
+    cursor = pages[0]["next_cursor"]
+    assert client.get("/recommendations/pages/nao-e-um-cursor").status_code == 400
+    beyond = base64.urlsafe_b64encode(f"{handle_id}:{len(expected)}".encode()).decode()
+    assert client.get(f"/recommendations/pages/{beyond}").status_code == 404
+
+    # Mesma versão com outro tamanho de catálogo: as linhas não valem mais
+    from app.snapshot import snapshot_store
+    snapshot = snapshot_store.current
+    assert ranking_cache.get(handle_id, snapshot.version, len(snapshot.catalog)) is not None
+    assert ranking_cache.get(handle_id, snapshot.version, len(snapshot.catalog) - 1) is None
+    assert client.get(f"/recommendations/pages/{cursor}").status_code == 410
+
+    cursor = client.post("/recommendations/pages", json={"campaign": campaign, "page_size": 7}).json()["next_cursor"]
+    assert client.get(f"/recommendations/pages/{cursor}").status_code == 200
+    seeded_database.add(Creator(name="Novo", tags=["fintech"], audience_age=[30], audience_location=["BR"],
+                                avg_views=1000, ctr=0.01, cvr=0.01, price_min=100, price_max=200,
+                                reliability_score=0.5))
+    seeded_database.commit()
+    assert client.get(f"/recommendations/pages/{cursor}").status_code == 410
+
+def test_single_flight_coalesces_identical_requests_and_sheds_load(setup_database):
+    """Campanhas idênticas simultâneas compartilham um cálculo; fila cheia responde 503"""
+    import asyncio
+    from app.cache import recommendation_cache
+    from app.coalescing import Overloaded, SingleFlight, single_flight
+    from app.metrics import metrics
+
+    flight = SingleFlight(max_in_flight=1)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "resultado"
+
+    async def scenario():
+        results = await asyncio.gather(*[flight.run("campanha", compute) for _ in range(5)])
+        assert flight.in_flight == 0
+        pending = asyncio.ensure_future(flight.run("campanha", compute))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await flight.run("outra campanha", compute)
+        return results + [await pending]
+
+    assert asyncio.run(scenario()) == ["resultado"] * 6
+    assert len(calls) == 2
+    assert (flight.coalesced, flight.shed) == (4, 1)
+
+    recommendation_cache.clear()
+    metrics.reset()
+    max_in_flight = single_flight.max_in_flight
+    single_flight.max_in_flight = 0
+    try:
+        response = client.post("/recommendations", json={
+            "campaign": {
+                "goal": "installs",
+                "tags_required": ["fintech"],
+                "audience_target": {"country": "BR", "age_range": [25, 45]},
+                "budget_cents": 1000000,
+                "deadline": "2025-12-31"
+            }
+        })
+    finally:
+        single_flight.max_in_flight = max_in_flight
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert "reco_shed_requests_total 1" in client.get("/metrics").text
+
+def test_weight_profiles_by_goal_and_what_if(seeded_database):
+    """Objetivo e pesos da requisição mudam o ranking; what-if reaproveita os componentes da campanha"""
+    from app.snapshot import snapshot_store
+    from app.weights import GOAL_WEIGHTS
+
+    campaign = {**CAMPAIGNS[0], "goal": "installs", "deadline": "2025-12-31"}
+    sales = {**campaign, "goal": "sales"}
+    profile = {"tags": 1, "audience": 1, "performance": 1, "budget": 1, "reliability": 1}
+
+    def recommend(campaign, **options):
+        return client.post("/recommendations", json={"campaign": campaign, "diversity": False, **options}).json()
+
+    installs_result, sales_result = recommend(campaign), recommend(sales)
+    assert installs_result != sales_result
+    python_sales = RecommendationEngine(seeded_database).get_recommendations(
+        {**CAMPAIGNS[0], "goal": "sales"}, top_k=10
+    )
+    assert [r.model_dump() for r in python_sales] == sales_result["recommendations"]
+
+    response = client.post("/recommendations/what-if", json={
+        "campaign": campaign,
+        "profiles": {"sales": GOAL_WEIGHTS["sales"], "flat": profile, "tags_only": {"tags": 2}}
+    })
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results["sales"] == sales_result
+    assert results["flat"] == recommend(campaign, weights=profile)
+
+    # Streaming e paginação aplicam o mesmo perfil da requisição
+    flat = recommend(campaign, weights=profile)["recommendations"]
+    streamed = client.post("/recommendations/stream", json={"campaign": campaign, "weights": profile}).text
+    assert [json.loads(line) for line in streamed.splitlines()][:len(flat)] == flat
+    page = client.post("/recommendations/pages", json={"campaign": campaign, "weights": profile, "page_size": len(flat)})
+    assert page.json()["recommendations"] == flat
+    assert page.json()["recommendations"] != client.post(
+        "/recommendations/pages", json={"campaign": campaign, "page_size": len(flat)}
+    ).json()["recommendations"]
+    assert all(r["score"] == r["fit_breakdown"]["tags"] for r in results["tags_only"]["recommendations"])
+    assert len(snapshot_store.current.catalog._components) == 1
+
+    # Matrizes de componentes limitadas pela memória (não pela quantidade de campanhas)
+    import app.catalog as catalog_module
+    catalog = snapshot_store.current.catalog
+    one_matrix = next(iter(catalog._components.values())).nbytes
+    component_cache_mb = catalog_module.COMPONENT_CACHE_MB
+    catalog_module.COMPONENT_CACHE_MB = 2 * one_matrix / (1024 * 1024)
+    try:
+        for budget in (1000, 2000, 3000):
+            client.post("/recommendations/what-if", json={
+                "campaign": {**campaign, "budget_cents": budget}, "profiles": {"flat": profile}
+            })
+    finally:
+        catalog_module.COMPONENT_CACHE_MB = component_cache_mb
+    assert len(catalog._components) == 2
+    assert catalog._components_bytes == sum(m.nbytes for m in catalog._components.values()) <= 2 * one_matrix
+
+    # Perfis ad-hoc distintos não crescem o cache de limites superiores sem limite
+    from app.catalog import BOUND_CACHE_SIZE
+    for step in range(BOUND_CACHE_SIZE + 3):
+        recommend(campaign, weights={**profile, "tags": 1 + step / 100})
+    assert 0 < len(snapshot_store.current.catalog._bounds) <= BOUND_CACHE_SIZE
+
+    response = client.post("/recommendations/what-if", json={"campaign": campaign, "profiles": {"zero": {}}})
+    assert response.status_code == 422
+
+def test_portfolio_fits_budget_and_tag_caps_near_exact_optimum(seeded_database):
+    """Portfólio respeita orçamento e limites por tag e fica perto do ótimo exato em instâncias pequenas"""
+    import random
+    import numpy as np
+    from app.portfolio import PortfolioSolver, TagCaps, exact_portfolio
+
+    rng = random.Random(7)
+    tag_names = ["fintech", "games", "fitness", "beleza"]
+    for caps in (TagCaps(), TagCaps(default=2), TagCaps({"games": 0}, default=3)):
+        for _ in range(20):
+            values = np.round(np.array([rng.random() for _ in range(14)]), 3)
+            prices = np.array([rng.randint(1000, 50000) for _ in range(14)], dtype=np.int64)
+            tags = [rng.sample(tag_names, rng.randint(1, 2)) for _ in range(14)]
+            budget = int(prices.sum() * rng.uniform(0.1, 0.5))
+            solver = PortfolioSolver(values, prices, budget, caps, tags_of=tags.__getitem__,
+                                     positions_with=lambda tag: np.array(
+                                         [i for i, t in enumerate(tags) if tag in t], dtype=np.int64))
+            chosen = solver.solve()
+            optimum, _ = exact_portfolio(values.tolist(), prices.tolist(), budget, tags, caps)
+            assert prices[chosen].sum() <= budget
+            assert all(sum(tag in tags[i] for i in chosen) <= caps.limit(tag)
+                       for tag in tag_names if caps.limit(tag) is not None)
+            assert optimum * 0.75 <= values[chosen].sum() <= optimum + 1e-9 <= solver.upper_bound + 1e-9
+
+    campaign = {**CAMPAIGNS[0], "goal": "installs", "deadline": "2025-12-31", "budget_cents": 2000000}
+    response = client.post("/recommendations/portfolio", json={"campaign": campaign, "max_per_tag": 2})
+    assert response.status_code == 200
+    data = response.json()
+    chosen = {c.id: c for c in seeded_database.query(Creator).filter(
+        Creator.id.in_([int(r["creator_id"]) for r in data["recommendations"]]))}
+    summary = data["portfolio"]
+    assert summary["total_price_cents"] == sum(c.price_min for c in chosen.values()) <= 2000000
+    assert all(sum(tag in c.tags for c in chosen.values()) <= 2 for c in chosen.values() for tag in c.tags)
+    assert summary["total_score"] == pytest.approx(sum(r["score"] for r in data["recommendations"]), abs=1e-6)
+    assert summary["total_score"] <= summary["upper_bound"]
+
+def test_metrics_endpoint_exposes_stage_histograms_and_counters(setup_database):
+    """/metrics exporta spans por estágio, latência HTTP e contadores no formato do Prometheus"""
+    from app.cache import recommendation_cache
+    from app.metrics import metrics
+
+    recommendation_cache.clear()
+    metrics.reset()
+    request_data = {
+        "campaign": {
+            "goal": "installs",
+            "tags_required": ["fintech"],
+            "audience_target": {"country": "BR", "age_range": [25, 45]},
+            "budget_cents": 1000000,
+            "deadline": "2025-12-31"
+        },
+        "top_k": 5
+    }
+    assert client.post("/recommendations", json=request_data).status_code == 200
+    assert client.post("/recommendations", json=request_data).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'reco_requests_total{endpoint="recommendations"} 2' in text
+    assert 'reco_cache_lookups_total{result="hit"} 1' in text
+    assert 'reco_cache_lookups_total{result="miss"} 1' in text
+    assert 'reco_creators_scored_total 1' in text
+    for stage in ("db_load", "hydration", "scoring", "explanation", "serialization"):
+        assert f'reco_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert 'reco_stage_duration_seconds_bucket{stage="scoring",le="+Inf"} 1' in text
+    assert 'reco_http_request_duration_seconds_count{handler="get_recommendations",status="200"} 2' in text
+
+def test_recommendations_served_from_snapshot_without_queries(setup_database):
+    """Com o snapshot pronto, recomendações não consultam o banco; escritas o atualizam incrementalmente"""
+    from sqlalchemy import event
+    from app.snapshot import snapshot_store
+
+    def request_with_budget(budget):
+        return {
+            "campaign": {
+                "goal": "installs",
+                "tags_required": ["fintech"],
+                "audience_target": {"country": "BR", "age_range": [25, 45]},
+                "budget_cents": budget,
+                "deadline": "2025-12-31"
+            },
+            "top_k": 5
+        }
+
+    assert client.post("/recommendations", json=request_with_budget(1000001)).status_code == 200
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.post("/recommendations", json=request_with_budget(1000002))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.status_code == 200
+    assert statements == []
+
+    full_builds = snapshot_store.full_builds
+    db = TestingSessionLocal()
+    db.add(Creator(name="Novo", tags=["fintech"], audience_age=[30], audience_location=["BR"],
+                   avg_views=1000, ctr=0.01, cvr=0.01, price_min=100, price_max=200, reliability_score=0.5))
+    db.commit()
+    db.close()
+
+    data = client.post("/recommendations", json=request_with_budget(1000003)).json()
+    assert data["metadata"]["total_creators"] == 2
+    assert len(data["recommendations"]) == 2
+    assert snapshot_store.full_builds == full_builds
+
+def test_out_of_process_writes_bump_version_and_invalidate_cache(setup_database):
+    """Escritas de outro processo (engine próprio, Core) chegam pelo refresh com nova versão do catálogo"""
+    from sqlalchemy import delete, select
+    from app.catalog_version import catalog_version
+    from app.snapshot import snapshot_store
+
+    request = {
+        "campaign": {
+            "goal": "installs",
+            "tags_required": ["fintech"],
+            "audience_target": {"country": "BR", "age_range": [25, 45]},
+            "budget_cents": 1000000,
+            "deadline": "2025-12-31"
+        }
+    }
+    db = TestingSessionLocal()
+    db.add(Creator(name="Outro", tags=["fintech"], audience_age=[30], audience_location=["BR"],
+                   avg_views=1000, ctr=0.01, cvr=0.01, price_min=100, price_max=200, reliability_score=0.5))
+    db.commit()
+    removed_id = db.scalar(select(Creator.id).where(Creator.name == "Outro"))
+    db.close()
+    before = client.post("/recommendations", json=request).json()
+    assert before["metadata"]["total_creators"] == 2
+    assert str(removed_id) in [r["creator_id"] for r in before["recommendations"]]
+
+    # Releitura sem mudança real não troca a versão
+    version = catalog_version.value
+    assert snapshot_store.refresh_with(TestingSessionLocal).version == version
+
+    other_process = create_engine(SQLALCHEMY_DATABASE_URL)
+    with other_process.begin() as connection:
+        connection.execute(delete(Creator).where(Creator.id == removed_id))
+    other_process.dispose()
+    assert catalog_version.value == version
+
+    assert snapshot_store.refresh_with(TestingSessionLocal).version == catalog_version.value > version
+    after = client.post("/recommendations", json=request).json()
+    assert after["metadata"]["total_creators"] == 1
+    assert str(removed_id) not in [r["creator_id"] for r in after["recommendations"]]
+
+def test_periodic_refresh_survives_failures(setup_database, monkeypatch):
+    """Uma falha transitória no refresh é registrada e o laço continua"""
+    import asyncio
+    from app.metrics import metrics
+    from app.snapshot import snapshot_store
+
+    metrics.reset()
+    calls = []
+
+    def flaky_refresh(session_factory):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+
+    async def scenario():
+        task = asyncio.create_task(snapshot_store.run_periodic_refresh(TestingSessionLocal, interval=0))
+        while len(calls) < 3:
+            await asyncio.sleep(0.001)
+        task.cancel()
+
+    monkeypatch.setattr(snapshot_store, "refresh_with", flaky_refresh)
+    asyncio.run(scenario())
+    assert metrics.counter_value('background_errors_total', task='snapshot') == 1
+    assert 'reco_background_errors_total{task="snapshot"} 1' in metrics.render()
+
+def test_campaign_recommendations_materialized_and_rescheduled(seeded_database):
+    """Top-k da campanha cadastrada vem da memória e é recalculado quando o catálogo muda"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import event
+    from app.campaign_results import campaign_results
+
+    campaign = {**CAMPAIGNS[0], "brand": "Marca", "goal": "installs", "deadline": "2030-12-31T00:00:00"}
+    response = client.post("/campaigns", json=campaign)
+    assert response.status_code == 201
+    campaign_id = response.json()["id"]
+    assert campaign_results.refresh_with(TestingSessionLocal) == 1
+
+    expected = client.post("/recommendations", json={
+        "campaign": {**campaign, "deadline": "2030-12-31"}, "top_k": campaign_results.top_k
+    }).json()
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(f"/campaigns/{campaign_id}/recommendations")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.json() == expected
+    assert statements == []
+    assert campaign_results.refresh_with(TestingSessionLocal) == 0
+
+    # Nova versão do catálogo: a passada seguinte recalcula a campanha
+    seeded_database.add(Creator(name="Novo", tags=["fintech"], audience_age=[30], audience_location=["BR"],
+                                avg_views=1000, ctr=0.01, cvr=0.01, price_min=100, price_max=200,
+                                reliability_score=0.5))
+    seeded_database.commit()
+    assert campaign_results.refresh_with(TestingSessionLocal) == 1
+    data = client.get(f"/campaigns/{campaign_id}/recommendations").json()
+    assert data["metadata"]["total_creators"] == expected["metadata"]["total_creators"] + 1
+
+    # Escrita de outro processo: o refresh do snapshot muda a versão e a campanha é recalculada;
+    # uma falha no cálculo é contada e a campanha volta na passada seguinte
+    from sqlalchemy import delete
+    from app.metrics import metrics
+    from app.snapshot import snapshot_store
+    other_process = create_engine(SQLALCHEMY_DATABASE_URL)
+    with other_process.begin() as connection:
+        connection.execute(delete(Creator).where(Creator.name == "Novo"))
+    other_process.dispose()
+    snapshot_store.refresh_with(TestingSessionLocal)
+    metrics.reset()
+
+    def failing_compute(*args):
+        raise RuntimeError("falha transitória")
+
+    campaign_results.compute = failing_compute
+    try:
+        assert campaign_results.refresh_with(TestingSessionLocal) == 0
+    finally:
+        del campaign_results.compute
+    assert metrics.counter_value('background_errors_total', task='campaigns') == 1
+    assert campaign_results.refresh_with(TestingSessionLocal) == 1
+    assert client.get(f"/campaigns/{campaign_id}/recommendations").json() == expected
+
+    # Prazo vencido: sai da agenda e deixa de ser servida
+    assert campaign_results.drop_expired(datetime(2031, 1, 1)) == 1
+    assert campaign_results.get(campaign_id) is None
+    expired = Campaign(brand="Marca", goal="installs", tags_required=[], audience_target={},
+                       budget_cents=1000, deadline=datetime.utcnow() - timedelta(days=1))
+    seeded_database.add(expired)
+    seeded_database.commit()
+    assert client.get(f"/campaigns/{expired.id}/recommendations").status_code == 404
+    assert client.get("/campaigns/999999/recommendations").status_code == 404
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file